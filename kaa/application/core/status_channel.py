@@ -0,0 +1,157 @@
+"""
+UI 状态推送通道。
+
+任务状态、暂停状态、配置等发生变化时调用 `StatusChannel.notify()`，
+UI 通过 `StatusChannel.stream()` / `StatusChannel.astream()` 长连接等待变化，只在有变化时重新计算状态并推送差异，
+没有变化时按心跳间隔刷新一次（用于运行时间等随时间变化的内容，以及发现已断开的连接）。
+"""
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar('K')
+Heartbeat = float | Callable[[], float]
+"""心跳间隔（秒），或每次等待前调用、返回心跳间隔的函数。"""
+
+
+class StatusChannel:
+    """
+    状态变化的通知通道。
+
+    例：
+    ```python
+    channel = StatusChannel()
+    task_service.subscribe(channel.notify)
+
+    for diff in channel.stream(get_snapshot):
+        render(diff)  # 第一次为完整状态，之后只包含变化的键
+    ```
+
+    在事件循环中（如 Gradio 的异步生成器）使用 `astream()`，等待时不占用线程。
+    """
+
+    def __init__(self, *, heartbeat: float = 5, coalesce: float = 0.05):
+        """
+        :param heartbeat: 没有通知时，`stream()` 最长多久重新计算一次状态。单位秒。
+        :param coalesce: 收到通知后等待多久再计算状态，使短时间内的多次通知只推送一次。单位秒。
+        """
+        self.heartbeat = heartbeat
+        self.coalesce = coalesce
+        self.version = 0
+        """通知次数。"""
+        self.__cond = threading.Condition()
+        self.__waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def notify(self, *_: Any):
+        """
+        通知状态已变化。可以在任何线程中调用，参数被忽略，便于直接作为事件回调。
+        """
+        with self.__cond:
+            self.version += 1
+            self.__cond.notify_all()
+            for loop, event in list(self.__waiters):
+                try:
+                    loop.call_soon_threadsafe(event.set)
+                except RuntimeError:
+                    # 事件循环已关闭
+                    self.__waiters.discard((loop, event))
+
+    def wait(self, version: int, timeout: float | None = None) -> int:
+        """
+        等待 `version` 之后的通知。
+
+        :param version: 上次看到的版本号。
+        :param timeout: 最长等待时间。单位秒。
+        :return: 当前版本号。与 `version` 相同表示超时。
+        """
+        with self.__cond:
+            self.__cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    async def async_wait(self, version: int, timeout: float | None = None) -> int:
+        """
+        `wait()` 的异步版本。在事件循环中等待，不占用线程。
+
+        :param version: 上次看到的版本号。
+        :param timeout: 最长等待时间。单位秒。
+        :return: 当前版本号。与 `version` 相同表示超时。
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.__cond:
+            if self.version != version:
+                return self.version
+            self.__waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.__cond:
+                self.__waiters.discard(waiter)
+        return self.version
+
+    def stream(
+        self,
+        snapshot: Callable[[], dict[K, Any]],
+        *,
+        heartbeat: Heartbeat | None = None,
+    ) -> Iterator[dict[K, Any]]:
+        """
+        持续产出状态的差异。
+
+        第一次产出完整状态；之后每次收到通知或心跳时重新调用 `snapshot`，
+        只产出与上次不同（`!=`）的键。心跳时即使没有变化也产出空字典，
+        使调用方有机会发现连接已断开。
+
+        :param snapshot: 返回当前状态。值须可以用 `==` 比较。
+        :param heartbeat: 心跳间隔。默认为构造时指定的值。
+        """
+        last: dict[K, Any] = {}
+        version = self.version
+        while True:
+            diff, last = self.__diff(snapshot, last)
+            yield diff
+            new_version = self.wait(version, self.__interval(heartbeat))
+            if new_version != version and self.coalesce > 0:
+                time.sleep(self.coalesce)
+                new_version = self.version
+            version = new_version
+
+    async def astream(
+        self,
+        snapshot: Callable[[], dict[K, Any]],
+        *,
+        heartbeat: Heartbeat | None = None,
+    ) -> AsyncIterator[dict[K, Any]]:
+        """
+        `stream()` 的异步版本。`snapshot` 在事件循环中调用，须能快速返回。
+        """
+        last: dict[K, Any] = {}
+        version = self.version
+        while True:
+            diff, last = self.__diff(snapshot, last)
+            yield diff
+            new_version = await self.async_wait(version, self.__interval(heartbeat))
+            if new_version != version and self.coalesce > 0:
+                await asyncio.sleep(self.coalesce)
+                new_version = self.version
+            version = new_version
+
+    def __interval(self, heartbeat: Heartbeat | None) -> float:
+        if heartbeat is None:
+            heartbeat = self.heartbeat
+        return heartbeat() if callable(heartbeat) else heartbeat
+
+    @staticmethod
+    def __diff(snapshot: Callable[[], dict[K, Any]], last: dict[K, Any]) -> tuple[dict[K, Any], dict[K, Any]]:
+        try:
+            current = snapshot()
+        except Exception:
+            logger.exception('Failed to get status snapshot.')
+            current = last
+        diff = {k: v for k, v in current.items() if k not in last or last[k] != v}
+        return diff, current
@@ -0,0 +1,319 @@
+"""
+任务运行历史。
+
+任务的每次状态转换（排队、开始、暂停、恢复、结束）都作为事件追加到日志中（可选地持久化为 JSONL），
+当前运行的状态由这些事件增量维护，读取不需要重新遍历，也没有副作用。
+历史事件可以按时间、任务查询，并按天汇总每个任务的运行次数与耗时。
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from dataclasses import dataclass, asdict
+from typing import Literal, get_args
+
+logger = logging.getLogger(__name__)
+
+TaskEventKind = Literal['queued', 'started', 'paused', 'resumed', 'finished', 'failed', 'cancelled', 'stopped']
+TaskState = Literal['pending', 'running', 'paused', 'finished', 'error', 'cancelled', 'stopped']
+
+_STATE_OF: dict[TaskEventKind, TaskState] = {
+    'queued': 'pending',
+    'started': 'running',
+    'paused': 'paused',
+    'resumed': 'running',
+    'finished': 'finished',
+    'failed': 'error',
+    'cancelled': 'cancelled',
+    'stopped': 'stopped',
+}
+_TERMINAL: tuple[TaskEventKind, ...] = ('finished', 'failed', 'cancelled', 'stopped')
+
+
+@dataclass(frozen=True)
+class TaskEvent:
+    run: int
+    """运行序号。同一次启动中的任务序号相同。"""
+    task: str
+    """任务名称。"""
+    kind: TaskEventKind
+    at: float
+    """发生时间（`time.time()`）。"""
+    duration: float | None = None
+    """结束事件中，任务实际运行的秒数（不含暂停的时间）。"""
+
+
+@dataclass
+class TaskStatus:
+    """当前运行中某个任务的状态。"""
+    name: str
+    state: TaskState = 'pending'
+    started_at: float | None = None
+    ended_at: float | None = None
+    active: float = 0
+    """已运行的秒数（不含暂停的时间），截至最近一次开始、暂停或结束。"""
+    resumed_at: float | None = None
+    """最近一次开始或恢复的时间。暂停或结束后为 None。"""
+
+
+@dataclass
+class TaskDurationStats:
+    count: int = 0
+    """结束的次数。"""
+    failed: int = 0
+    """其中出错的次数。"""
+    total: float = 0
+    """总运行秒数。"""
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+
+class TaskHistory:
+    """
+    事件溯源的任务状态。
+
+    例：
+    ```python
+    history = TaskHistory(paths.cache('task_history.jsonl'))
+    history.start_run()
+    history.record('商店购买', 'queued')
+    history.record('商店购买', 'started')
+    history.record('商店购买', 'finished')
+    history.end_run()
+    history.statuses()   # (('商店购买', 'finished'),)
+    history.durations(days=7)
+    ```
+    """
+
+    def __init__(self, path: str | None = None, *, retention_days: float = 90):
+        """
+        :param path: 事件日志文件。为 None 时只保存在内存中。
+        :param retention_days: 载入时丢弃早于此天数的事件。
+        """
+        self.path = path
+        self.retention_days = retention_days
+        self.__lock = threading.RLock()
+        self.__events: list[TaskEvent] = []
+        self.__run = 0
+        self.__running = False
+        self.__run_started_at: float | None = None
+        self.__tasks: dict[str, TaskStatus] = {}
+        self.__current: str | None = None
+        self.__statuses: tuple[tuple[str, TaskState], ...] = ()
+        if path is not None:
+            self.__load()
+
+    @property
+    def run(self) -> int:
+        """最近一次运行的序号。尚未运行过时为 0。"""
+        return self.__run
+
+    @property
+    def running(self) -> bool:
+        return self.__running
+
+    @property
+    def run_started_at(self) -> float | None:
+        """当前运行开始的时间（`time.time()`）。没有正在进行的运行时为 None。"""
+        return self.__run_started_at
+
+    @property
+    def current_task(self) -> str | None:
+        """正在运行（或已暂停）的任务。"""
+        return self.__current
+
+    def statuses(self) -> tuple[tuple[str, TaskState], ...]:
+        """最近一次运行中每个任务的名称与状态，按排队顺序排列。"""
+        return self.__statuses
+
+    def task(self, name: str) -> TaskStatus | None:
+        """最近一次运行中指定任务的状态。"""
+        with self.__lock:
+            status = self.__tasks.get(name)
+            return None if status is None else TaskStatus(**asdict(status))
+
+    def start_run(self) -> int:
+        """
+        开始新的一次运行。上一次运行中的状态被清空，历史事件保留。
+
+        :return: 运行序号。
+        """
+        with self.__lock:
+            self.__run += 1
+            self.__running = True
+            self.__run_started_at = time.time()
+            self.__tasks = {}
+            self.__current = None
+            self.__refresh()
+            return self.__run
+
+    def end_run(self):
+        """
+        结束当前运行。仍在运行的任务记为出错（任务线程没有报告结果），
+        尚未开始的任务记为取消。
+        """
+        with self.__lock:
+            if not self.__running:
+                return
+            for status in list(self.__tasks.values()):
+                if status.state in ('running', 'paused'):
+                    self.record(status.name, 'failed')
+                elif status.state == 'pending':
+                    self.record(status.name, 'cancelled')
+            self.__running = False
+            self.__run_started_at = None
+
+    def record(self, task: str, kind: TaskEventKind, at: float | None = None) -> TaskEvent:
+        """
+        记录一次状态转换，并更新当前状态。
+
+        :param task: 任务名称。
+        :param kind: 转换类型。
+        :param at: 发生时间。默认为当前时间。
+        """
+        at = time.time() if at is None else at
+        with self.__lock:
+            if kind == 'started' and self.__current is not None and self.__current != task:
+                # 上一个任务没有报告结果就开始了下一个任务
+                self.record(self.__current, 'failed', at)
+            status = self.__tasks.get(task)
+            if status is None:
+                status = self.__tasks[task] = TaskStatus(task)
+            duration = None
+            if status.resumed_at is not None and kind in ('paused', *_TERMINAL):
+                status.active += at - status.resumed_at
+                status.resumed_at = None
+            if kind == 'started':
+                status.started_at = at
+                status.ended_at = None
+                status.active = 0
+                status.resumed_at = at
+                self.__current = task
+            elif kind == 'resumed':
+                status.resumed_at = at
+            elif kind in _TERMINAL:
+                status.ended_at = at
+                if status.started_at is not None:
+                    duration = round(status.active, 3)
+                if self.__current == task:
+                    self.__current = None
+            status.state = _STATE_OF[kind]
+            event = TaskEvent(self.__run, task, kind, at, duration)
+            self.__events.append(event)
+            self.__refresh()
+            self.__append(event)
+            return event
+
+    def pause(self):
+        """暂停当前任务。"""
+        with self.__lock:
+            current = self.__current
+            if current is not None and self.__tasks[current].state == 'running':
+                self.record(current, 'paused')
+
+    def resume(self):
+        """恢复当前任务。"""
+        with self.__lock:
+            current = self.__current
+            if current is not None and self.__tasks[current].state == 'paused':
+                self.record(current, 'resumed')
+
+    def events(
+        self,
+        *,
+        since: float | None = None,
+        until: float | None = None,
+        task: str | None = None,
+        run: int | None = None,
+    ) -> list[TaskEvent]:
+        """
+        查询历史事件，按发生顺序排列。
+
+        :param since: 只返回此时间（`time.time()`）及之后的事件。
+        :param until: 只返回此时间之前的事件。
+        :param task: 只返回指定任务的事件。
+        :param run: 只返回指定运行序号的事件。
+        """
+        with self.__lock:
+            events = list(self.__events)
+        return [
+            e for e in events
+            if (since is None or e.at >= since)
+            and (until is None or e.at < until)
+            and (task is None or e.task == task)
+            and (run is None or e.run == run)
+        ]
+
+    def durations(self, *, days: float = 7, now: float | None = None) -> dict[str, dict[str, TaskDurationStats]]:
+        """
+        按天汇总每个任务的运行次数与耗时。
+
+        :param days: 汇总最近多少天。
+        :param now: 当前时间。默认为 `time.time()`。
+        :return: `{日期（YYYY-MM-DD）: {任务名称: 统计}}`，按日期排列。
+        """
+        now = time.time() if now is None else now
+        result: dict[str, dict[str, TaskDurationStats]] = {}
+        for e in self.events(since=now - days * 86400):
+            if e.kind not in _TERMINAL or e.duration is None:
+                continue
+            day = datetime.fromtimestamp(e.at).strftime('%Y-%m-%d')
+            stats = result.setdefault(day, {}).setdefault(e.task, TaskDurationStats())
+            stats.count += 1
+            stats.total += e.duration
+            if e.kind == 'failed':
+                stats.failed += 1
+        return dict(sorted(result.items()))
+
+    def __refresh(self):
+        # 读取频繁而变化很少，变化时重建一次，读取直接返回
+        self.__statuses = tuple((s.name, s.state) for s in self.__tasks.values())
+
+    def __append(self, event: TaskEvent):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(asdict(event), ensure_ascii=False) + '\n')
+        except OSError:
+            logger.exception('Failed to append task history to %s.', self.path)
+
+    def __load(self):
+        assert self.path is not None
+        if not os.path.exists(self.path):
+            return
+        kinds = get_args(TaskEventKind)
+        since = time.time() - self.retention_days * 86400
+        events: list[TaskEvent] = []
+        dropped = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = TaskEvent(**json.loads(line))
+                except (ValueError, TypeError):
+                    dropped += 1
+                    continue
+                if event.kind not in kinds or event.at < since:
+                    dropped += 1
+                    continue
+                events.append(event)
+        self.__events = events
+        self.__run = max((e.run for e in events), default=0)
+        if dropped:
+            self.__compact()
+
+    def __compact(self):
+        """丢弃过期或无效的行，重写日志文件。"""
+        assert self.path is not None
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for event in self.__events:
+                    f.write(json.dumps(asdict(event), ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.exception('Failed to compact task history %s.', self.path)
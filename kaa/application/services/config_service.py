@@ -1,9 +1,12 @@
 import logging
 from typing import Any
 
+from pydantic import ValidationError
+
 from kaa.config.schema import BaseConfig
 from kotonebot.config.base_config import BackendConfig, UserConfig
-from kotonebot.config.manager import load_config, save_config, RootConfig
+from kotonebot.config.manager import RootConfig
+from kaa.config.store import ConfigChangeEvent, config_store
 
 logger = logging.getLogger(__name__)
 
@@ -16,20 +19,24 @@ class ConfigValidationError(ValueError):
 class ConfigService:
     """
     Manages application configuration, including loading, saving, and validation.
+
+    The configuration objects are shared with the running Kaa instance through
+    `ConfigStore`, so the file is parsed only once per process.
     """
 
     def __init__(self, config_path: str = "config.json"):
         self.config_path = config_path
+        self.store = config_store(config_path)
         self._root_config: RootConfig[BaseConfig] | None = None
         self._current_user_config: UserConfig[BaseConfig] | None = None
         self.load()
 
     def load(self):
         """
-        Loads the configuration from the specified config file.
+        Loads the configuration from the shared config store.
         It populates the root configuration and sets the current user config.
         """
-        self._root_config = load_config(self.config_path, type=BaseConfig)
+        self._root_config = self.store.root
         if self._root_config and self._root_config.user_configs:
             self._current_user_config = self._root_config.user_configs[0]
         else:
@@ -37,6 +44,7 @@ class ConfigService:
 
     def reload(self):
         """Reloads configuration from disk."""
+        self.store.load()
         self.load()
         logger.info("Configuration reloaded from disk.")
 
@@ -58,16 +66,35 @@ class ConfigService:
             raise RuntimeError("User config not loaded.")
         return self._current_user_config.options
 
-    def save(self):
+    def save(self, *, defer: bool = False) -> ConfigChangeEvent | None:
         """
         Validates and saves the current configuration state to disk.
+        Invalid changes are discarded so that running tasks never see them.
+
+        :param defer: Apply the changes now but write them to disk in the background,
+            coalescing with other deferred saves made shortly after.
+        :return: The changes that were saved, or None if nothing changed.
         """
         if not self._root_config or not self._current_user_config:
             raise RuntimeError("Config not loaded, cannot save.")
 
-        self._validate(self._current_user_config.backend, self._current_user_config.options)
-        save_config(self._root_config, self.config_path)
-        logger.info("Configuration saved successfully to %s", self.config_path)
+        try:
+            self._validate(self._current_user_config.backend, self._current_user_config.options)
+        except ConfigValidationError:
+            self.store.discard()
+            raise
+        try:
+            event = self.store.commit(source=self, defer=defer)
+        except ValidationError as e:
+            # The store has already rolled the shared config back
+            raise ConfigValidationError(str(e)) from e
+        if event is not None and not defer:
+            logger.info("Configuration saved successfully to %s (v%d)", self.config_path, event.version)
+        return event
+
+    def flush(self) -> bool:
+        """Writes pending deferred saves to disk immediately."""
+        return self.store.flush()
 
     def _validate(self, backend_config: BackendConfig, options: BaseConfig):
         """
@@ -1,14 +1,26 @@
+import time
 import logging
 from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 
 from kaa.main.kaa import Kaa
-from kotonebot.backend.context import task_registry, vars as context_vars
-from kotonebot.backend.bot import RunStatus
+from kaa.util import paths
+from kaa.application.core.task_history import TaskEvent, TaskEventKind, TaskDurationStats, TaskHistory
+from kotonebot.backend.context import Task, task_registry, vars as context_vars
+from kotonebot.backend.bot import RunStatus, TaskStatusValue
 from kotonebot.errors import ContextNotInitializedError
 
 logger = logging.getLogger(__name__)
 
+_EVENT_OF: Dict[TaskStatusValue, TaskEventKind] = {
+    'pending': 'queued',
+    'running': 'started',
+    'finished': 'finished',
+    'error': 'failed',
+    'cancelled': 'cancelled',
+    'stopped': 'stopped',
+}
+
 
 class TaskService:
     """
@@ -16,13 +28,59 @@ class TaskService:
     and pausing. It encapsulates the state related to task execution.
     """
 
-    def __init__(self, kaa_instance: Kaa):
+    def __init__(self, kaa_instance: Kaa, history: TaskHistory | None = None):
+        """
+        :param kaa_instance: The Kaa instance that runs the tasks.
+        :param history: Where task lifecycle events are recorded. Defaults to a log persisted in the cache directory.
+        """
         self._kaa = kaa_instance
         self.run_status: RunStatus | None = None
         self.is_running_all: bool = False
         self.is_running_single: bool = False
         self.is_stopping: bool = False
-        self.task_start_time: Optional[datetime] = None
+        self.history = history if history is not None else TaskHistory(paths.cache('task_history.jsonl'))
+        self._listeners: List[Callable[[], None]] = []
+        # Registered once here so that these run before the per-run listeners added by Kaa.start()
+        self._kaa.events.task_status_changed += self._on_task_status_changed
+        self._kaa.events.finished += self._on_finished
+
+    def subscribe(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """
+        Subscribes to state transitions: tasks started, stopping, paused/resumed,
+        a task changing status, and the run finishing.
+
+        :param listener: Called without arguments on the thread that caused the transition.
+        :return: A function that unsubscribes the listener.
+        """
+        self._listeners.append(listener)
+        def unsubscribe():
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+        return unsubscribe
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener()
+            except Exception:
+                logger.exception("Task status listener %r failed.", listener)
+
+    def _on_task_status_changed(self, task: Task, status: TaskStatusValue) -> None:
+        self.history.record(task.name, _EVENT_OF[status])
+        self._notify()
+
+    def _on_finished(self) -> None:
+        self.history.end_run()
+        self.is_running_all = False
+        self.is_running_single = False
+        self.is_stopping = False
+        self._notify()
+
+    @property
+    def task_start_time(self) -> Optional[datetime]:
+        """When the current run started, or None if nothing is running."""
+        started_at = self.history.run_started_at
+        return None if started_at is None else datetime.fromtimestamp(started_at)
 
     def is_running(self) -> bool:
         """Checks if any task (either all or single) is currently running."""
@@ -37,8 +95,9 @@ class TaskService:
         logger.info("Starting all tasks...")
         self.is_running_all = True
         self.is_stopping = False
-        self.task_start_time = datetime.now()
+        self.history.start_run()
         self.run_status = self._kaa.start_all()
+        self._notify()
 
     def start_single_task(self, task_name: str) -> None:
         """
@@ -58,8 +117,9 @@ class TaskService:
         logger.info(f"Starting single task: {task_name}")
         self.is_running_single = True
         self.is_stopping = False
-        self.task_start_time = datetime.now()
+        self.history.start_run()
         self.run_status = self._kaa.start([task])
+        self._notify()
 
     def stop_tasks(self) -> None:
         """Stops the currently running tasks."""
@@ -78,27 +138,39 @@ class TaskService:
 
         if self.run_status:
             self.run_status.interrupt()
+        self._notify()
+
+    def get_task_statuses(self) -> Tuple[Tuple[str, str], ...]:
+        """
+        Gets the status of each task in the latest run, in queue order.
+        Before the first run, all registered tasks are reported as pending.
+
+        The statuses are maintained incrementally from task events, so this is a cheap read
+        without side effects.
 
-    def get_task_statuses(self) -> List[Tuple[str, str]]:
+        :return: A tuple of (task name, status) pairs.
         """
-        Gets the current status of all registered tasks.
+        if self.history.run == 0 or (self.history.running and not self.history.statuses()):
+            return tuple((task.name, "pending") for task in task_registry.values())
+        return self.history.statuses()
 
-        :return: A list of tuples, where each tuple contains the task name and its status.
+    def get_task_history(self, since: Optional[datetime] = None, task_name: Optional[str] = None) -> List[TaskEvent]:
         """
-        if not self.run_status:
-            return [(task.name, "pending") for task in task_registry.values()]
+        Gets recorded task lifecycle events.
 
-        # Reset running flags if the underlying run_status is no longer running
-        if not self.run_status.running:
-            self.is_running_all = False
-            self.is_running_single = False
-            self.is_stopping = False
-            self.task_start_time = None
+        :param since: Only return events at or after this time.
+        :param task_name: Only return events of this task.
+        """
+        return self.history.events(since=since.timestamp() if since else None, task=task_name)
+
+    def get_task_durations(self, days: int = 7) -> Dict[str, Dict[str, TaskDurationStats]]:
+        """
+        Aggregates run counts and durations per task and day.
 
-        status_list: List[Tuple[str, str]] = []
-        for task_status in self.run_status.tasks:
-            status_list.append((task_status.task.name, task_status.status))
-        return status_list
+        :param days: How many days to look back.
+        :return: ``{'YYYY-MM-DD': {task name: stats}}``.
+        """
+        return self.history.durations(days=days)
 
     def toggle_pause(self) -> bool | None:
         """
@@ -110,10 +182,14 @@ class TaskService:
             if context_vars.flow.is_paused:
                 context_vars.flow.request_resume()
                 logger.info("Tasks resumed.")
+                self.history.resume()
+                self._notify()
                 return False
             else:
                 context_vars.flow.request_pause()
                 logger.info("Tasks paused.")
+                self.history.pause()
+                self._notify()
                 return True
         except ContextNotInitializedError:
             logger.warning("Cannot toggle pause, context not initialized.")
@@ -140,6 +216,7 @@ class TaskService:
 
         :return: A timedelta object representing the runtime, or None if no task is running.
         """
-        if self.task_start_time is None:
+        started_at = self.history.run_started_at
+        if started_at is None:
             return None
-        return datetime.now() - self.task_start_time
+        return timedelta(seconds=max(0.0, time.time() - started_at))
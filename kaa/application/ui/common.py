@@ -62,6 +62,7 @@ ConfigKey = Literal[
     
     # misc
     'check_update', 'auto_install_update', 'expose_to_lan', 'update_channel', 'log_level',
+    'screenshot_prefetch', 'flight_recorder',
 
     # idle
     'idle_enabled', 'idle_seconds', 'idle_minimize_on_pause',
@@ -87,6 +88,14 @@ class GradioComponents:
     quick_checkboxes: List[gr.Checkbox] = field(default_factory=list)
     task_runtime_text: Optional[gr.Textbox] = None
     task_status_df: Optional[gr.Dataframe] = None
+
+    # Task tab components
+    task_buttons: List[gr.Button] = field(default_factory=list)
+    task_result: Optional[gr.Markdown] = None
+    task_pause_btn: Optional[gr.Button] = None
+
+    # Settings tab components
+    config_status_text: Optional[gr.Markdown] = None
     
     # Update tab components
     update_info_md: Optional[gr.Markdown] = None
@@ -1,16 +1,18 @@
 import logging
 import os
-import zipfile
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
-from kaa.main.kaa import Kaa
+from kaa.main.kaa import Kaa, log_buffer, log_pipeline
+from kaa.util.log_files import log_index
+from kaa.util.report import ProgressCallback, ReportBuilder, ReportJob
 from kaa.application.services.config_service import ConfigService, ConfigValidationError
 from kaa.application.services.produce_solution_service import ProduceSolutionService
 from kaa.application.services.task_service import TaskService
 from kaa.application.services.update_service import UpdateService
 from kaa.application.services.feedback_service import FeedbackService
 from kaa.application.core.idle_mode import IdleModeManager
+from kaa.application.core.status_channel import StatusChannel
 from kaa.config.produce import ProduceSolution
 from kotonebot.errors import ContextNotInitializedError
 
@@ -25,7 +27,7 @@ class KaaFacade:
 
     def __init__(self, kaa_instance: Kaa):
         # Core services
-        self.config_service = ConfigService()
+        self.config_service = ConfigService(kaa_instance.config_path)
         self.produce_solution_service = ProduceSolutionService()
         self.task_service = TaskService(kaa_instance)
 
@@ -36,6 +38,12 @@ class KaaFacade:
 
         self._kaa = kaa_instance
 
+        # Every open page waits on this channel instead of polling on a timer
+        self.status_channel = StatusChannel()
+        self.task_service.subscribe(self.status_channel.notify)
+        self.config_service.store.subscribe(self.status_channel.notify)
+        self.config_service.store.subscribe_status(self.status_channel.notify)
+
     def _setup_idle_manager(self) -> IdleModeManager:
         """Initializes and configures the IdleModeManager."""
 
@@ -82,7 +90,7 @@ class KaaFacade:
             return {"text": "停止中...", "interactive": False}
         return {"text": "停止", "interactive": True}
 
-    def get_task_statuses(self) -> List[Tuple[str, str]]:
+    def get_task_statuses(self) -> Tuple[Tuple[str, str], ...]:
         """Gets a list of all tasks and their current statuses."""
         return self.task_service.get_task_statuses()
 
@@ -121,6 +129,78 @@ class KaaFacade:
         seconds = total_seconds % 60
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
+    def get_single_task_status(self) -> Dict[str, Any]:
+        """
+        Gets the status of a single task started from the task tab.
+        :return: A dictionary with 'state' ('idle', 'running' or 'stopping') and a display 'message'.
+        """
+        tcs = self.task_service
+        history = tcs.history
+        message = ""
+        if tcs.is_running_single:
+            if history.current_task is not None:
+                message = f"正在执行任务: {history.current_task}"
+        elif not history.running and history.statuses():
+            # Task finished, show its final status
+            name, status = history.statuses()[0]
+            status_map = {'finished': '已完成', 'error': '出错', 'cancelled': '已取消'}
+            message = f"任务 {name} {status_map.get(status, '已结束')}"
+
+        if tcs.is_stopping:
+            state = 'stopping'
+        elif tcs.is_running_single:
+            state = 'running'
+        else:
+            state = 'idle'
+        return {"state": state, "message": message}
+
+    def get_status_snapshot(self) -> Dict[str, Any]:
+        """
+        Gets everything the UI displays about the current run as plain, comparable values.
+        """
+        opts = self.config_service.get_options()
+        end_game_opts = opts.end_game
+        if end_game_opts.shutdown:
+            end_action = "完成后关机"
+        elif end_game_opts.hibernate:
+            end_action = "完成后休眠"
+        else:
+            end_action = "完成后什么都不做"
+        return {
+            'run_button': self.get_run_status(),
+            'pause_button': self.get_pause_button_status(),
+            'task_statuses': self.get_task_statuses(),
+            'task_runtime': self.get_task_runtime(),
+            'single_task': self.get_single_task_status(),
+            'quick_settings': (
+                opts.purchase.enabled,
+                opts.assignment.enabled,
+                opts.contest.enabled,
+                opts.produce.enabled,
+                opts.mission_reward.enabled,
+                opts.club_reward.enabled,
+                opts.activity_funds.enabled,
+                opts.presents.enabled,
+                opts.capsule_toys.enabled,
+                opts.upgrade_support_card.enabled,
+            ),
+            'end_action': end_action,
+            'config_save_status': self.get_config_save_status(),
+        }
+
+    def stream_status(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields the status snapshot once, then only the keys that changed, whenever a task
+        or config transition happens (plus a heartbeat). See `StatusChannel.astream`.
+
+        Waits on the event loop, so open pages don't hold worker threads.
+        """
+        return self.status_channel.astream(self.get_status_snapshot, heartbeat=self._status_heartbeat)
+
+    def _status_heartbeat(self) -> float:
+        # Tick every second while a task is running so the runtime display keeps counting
+        return 1 if self.task_service.is_running() else self.status_channel.heartbeat
+
     # --- Configuration ---
 
     def get_all_configs(self) -> Tuple[Any, Any]:
@@ -130,14 +210,18 @@ class KaaFacade:
         """
         return self.config_service.get_root_config(), self.config_service.get_current_user_config()
 
-    def save_configs(self):
+    def save_configs(self, *, defer: bool = False):
         """
-        Saves the current configuration and re-initializes Kaa.
+        Saves the current configuration. Running tasks see the new values immediately;
+        backend changes take effect on the next run.
         The UI is responsible for updating the config object in ConfigService before calling this.
+
+        :param defer: Write to disk in the background, coalescing rapid successive edits into one write.
         """
         try:
-            self.config_service.save()
-            logger.info("Configuration saved and Kaa re-initialized.")
+            event = self.config_service.save(defer=defer)
+            if event is not None and event.touches('backend') and self.task_service.is_running():
+                return "设置已保存！模拟器相关设置将在下次启动时生效。"
             return "设置已保存并应用！"
         except ConfigValidationError as e:
             logger.warning(f"Configuration validation failed: {e}")
@@ -146,6 +230,21 @@ class KaaFacade:
             logger.error(f"Failed to save or reload config: {e}", exc_info=True)
             raise RuntimeError("设置已保存，但重新加载失败，请重启程序。") from e
 
+    def get_config_save_status(self) -> str:
+        """
+        Gets the disk persistence status of the configuration as display text.
+        """
+        store = self.config_service.store
+        status = store.status
+        if status == 'pending':
+            return "*正在保存...*"
+        if status == 'error':
+            return f"*保存失败，将在下次修改时重试: {store.last_error}*"
+        if store.last_saved_at is None:
+            return "*设置修改后将自动保存并即时生效。*"
+        time_str = datetime.fromtimestamp(store.last_saved_at).strftime("%H:%M:%S")
+        return f"*设置已保存: {time_str}*"
+
     # --- Produce Solutions ---
 
     def list_produce_solutions(self) -> List[ProduceSolution]:
@@ -173,17 +272,34 @@ class KaaFacade:
         self.produce_solution_service.save_solution(solution)
 
     # --- Misc ---
-    def export_logs_as_zip(self) -> str:
-        # This logic was in gr.py, moving it here.
-        # It doesn't neatly fit a service, but facade is ok for now.
-        if not os.path.exists('logs'):
+    def export_logs_as_zip(self, on_progress: ProgressCallback | None = None) -> str:
+        """Exports the logs to a zip file. Same as `start_export_logs()`, but waits for it to finish."""
+        if not os.path.exists('logs') and not log_buffer.text():
             return "logs 文件夹不存在"
+        path = self.start_export_logs(on_progress).wait()
+        return f"已导出到 {path}"
+
+    def start_export_logs(self, on_progress: ProgressCallback | None = None) -> ReportJob[str]:
+        """
+        Packs the log segments and the in-memory logs into a zip file in a background thread.
+        Segments that are already compressed (`.log.gz`) are stored as-is.
+
+        :param on_progress: Progress callback, called from the background thread.
+        :return: The job handle. `wait()` returns the path of the zip file.
+        """
         timestamp = datetime.now().strftime('%y-%m-%d-%H-%M-%S')
-        zip_filename = f'logs-{timestamp}.zip'
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as zipf:
-            for root, _, files in os.walk('logs'):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, 'logs')
-                    zipf.write(file_path, arcname)
-        return f"已导出到 {zip_filename}"
+
+        def log_files():
+            # Log records are written to files in the background; wait for them first
+            log_pipeline.flush()
+            if not os.path.exists('logs'):
+                return []
+            # Only export the indexed segments, without walking the directory
+            index = log_index('logs')
+            return [(index.path_of(s), s.file) for s in index.segments()]
+
+        builder = ReportBuilder()
+        builder.add_files('日志', log_files)
+        # Without file logging (e.g. when run from the command line), only in-memory logs exist
+        builder.add_text('memory.log', log_buffer.text, label='内存中的日志')
+        return builder.start(f'logs-{timestamp}.zip', on_progress=on_progress)
@@ -1,4 +1,6 @@
 import logging
+from typing import Any
+
 import gradio as gr
 
 from kaa.application.ui.facade import KaaFacade
@@ -54,82 +56,72 @@ class KaaGradioView:
                 # Update tab is created inside the view itself because it's a single tab
                 self.update_view.create_ui()
 
-            self._setup_timers()
+            self._setup_status_stream(blocks)
         return blocks
 
     
     def _create_header(self):
         gr.Markdown(f"# 琴音小助手 v{self.facade._kaa.version}")
 
-    def _setup_timers(self):
-        """Sets up all the UI polling timers."""
-
-        # Timer for run/pause buttons
-        def update_run_buttons():
-            run_status = self.facade.get_run_status()
-            pause_status = self.facade.get_pause_button_status()
-            return {
-                self.components.run_btn: gr.Button(value=run_status['text'], interactive=run_status['interactive']),
-                self.components.pause_btn: gr.Button(value=pause_status['text'], interactive=pause_status['interactive']),
-            }
-        gr.Timer(1.0).tick(
-            fn=update_run_buttons,
-            outputs=[self.components.run_btn, self.components.pause_btn]
-        )
-
-        # Timer for task status dataframe
-        def update_task_status_df():
-            statuses = self.facade.get_task_statuses()
-            # Convert status keys to display text
-            status_map = {
-                'pending': '等待中', 'running': '运行中', 'finished': '已完成',
-                'error': '出错', 'cancelled': '已取消'
-            }
-            display_statuses = [[name, status_map.get(status, '未知')] for name, status in statuses]
-            return gr.Dataframe(value=display_statuses)
-
-        gr.Timer(1.0).tick(
-            fn=update_task_status_df,
-            outputs=[self.components.task_status_df]
-        )
-
-        # Timer for task runtime
-        def update_task_runtime():
-            runtime_str = self.facade.get_task_runtime()
-            return gr.Textbox(value=runtime_str)
-
-        gr.Timer(1.0).tick(
-            fn=update_task_runtime,
-            outputs=[self.components.task_runtime_text]
-        )
-        
-        # Timer for quick-setting checkboxes
-        def update_quick_checkboxes():
-            opts = self.facade.config_service.get_options()
-            
-            end_game_opts = opts.end_game
-            if end_game_opts.shutdown:
-                end_action_val = "完成后关机"
-            elif end_game_opts.hibernate:
-                end_action_val = "完成后休眠"
-            else:
-                end_action_val = "完成后什么都不做"
-
-            return {
-                self.components.quick_checkboxes[0]: gr.Checkbox(value=opts.purchase.enabled),
-                self.components.quick_checkboxes[1]: gr.Checkbox(value=opts.assignment.enabled),
-                self.components.quick_checkboxes[2]: gr.Checkbox(value=opts.contest.enabled),
-                self.components.quick_checkboxes[3]: gr.Checkbox(value=opts.produce.enabled),
-                self.components.quick_checkboxes[4]: gr.Checkbox(value=opts.mission_reward.enabled),
-                self.components.quick_checkboxes[5]: gr.Checkbox(value=opts.club_reward.enabled),
-                self.components.quick_checkboxes[6]: gr.Checkbox(value=opts.activity_funds.enabled),
-                self.components.quick_checkboxes[7]: gr.Checkbox(value=opts.presents.enabled),
-                self.components.quick_checkboxes[8]: gr.Checkbox(value=opts.capsule_toys.enabled),
-                self.components.quick_checkboxes[9]: gr.Checkbox(value=opts.upgrade_support_card.enabled),
-                self.components.end_action_dropdown: gr.Dropdown(value=end_action_val),
-            }
+    def _setup_status_stream(self, blocks: gr.Blocks):
+        """
+        Pushes status updates to the page instead of polling on timers.
 
-        gr.Timer(2.0).tick(
-            fn=update_quick_checkboxes,
-            outputs=self.components.quick_checkboxes + [self.components.end_action_dropdown]
-        )
+        One long-lived async generator per page waits on the facade's status channel and only
+        sends the components whose values changed. See `KaaFacade.stream_status`.
+        """
+        c = self.components
+        assert c.run_btn and c.pause_btn and c.task_status_df and c.task_runtime_text
+        assert c.end_action_dropdown and c.task_result and c.task_pause_btn and c.config_status_text
+        status_map = {
+            'pending': '等待中', 'running': '运行中', 'paused': '已暂停', 'finished': '已完成',
+            'error': '出错', 'cancelled': '已取消', 'stopped': '已停止'
+        }
+
+        def render(diff: dict[str, Any]) -> dict[Any, Any]:
+            updates: dict[Any, Any] = {}
+            if 'run_button' in diff:
+                run_status = diff['run_button']
+                updates[c.run_btn] = gr.Button(value=run_status['text'], interactive=run_status['interactive'])
+            if 'pause_button' in diff:
+                pause_status = diff['pause_button']
+                updates[c.pause_btn] = gr.Button(value=pause_status['text'], interactive=pause_status['interactive'])
+                updates[c.task_pause_btn] = gr.Button(value=pause_status['text'], interactive=pause_status['interactive'])
+            if 'task_statuses' in diff:
+                display_statuses = [[name, status_map.get(status, '未知')] for name, status in diff['task_statuses']]
+                updates[c.task_status_df] = gr.Dataframe(value=display_statuses)
+            if 'task_runtime' in diff:
+                updates[c.task_runtime_text] = gr.Textbox(value=diff['task_runtime'])
+            if 'single_task' in diff:
+                single = diff['single_task']
+                if single['state'] == 'idle':
+                    button = gr.Button(value="启动", interactive=True)
+                else:
+                    button = gr.Button(value="停止中" if single['state'] == 'stopping' else "运行中", interactive=False)
+                for btn in c.task_buttons:
+                    updates[btn] = button
+                updates[c.task_result] = gr.Markdown(value=single['message'])
+            if 'quick_settings' in diff:
+                for checkbox, value in zip(c.quick_checkboxes, diff['quick_settings']):
+                    updates[checkbox] = gr.Checkbox(value=value)
+            if 'end_action' in diff:
+                updates[c.end_action_dropdown] = gr.Dropdown(value=diff['end_action'])
+            if 'config_save_status' in diff:
+                updates[c.config_status_text] = gr.Markdown(value=diff['config_save_status'])
+            if not updates:
+                # Heartbeat: yield even without changes so Gradio notices closed pages and stops the generator
+                updates[c.run_btn] = gr.skip()
+            return updates
+
+        # Async, so waiting between updates doesn't hold one of Gradio's worker threads per page
+        async def stream():
+            async for diff in self.facade.stream_status():
+                yield render(diff)
+
+        outputs = [
+            c.run_btn, c.pause_btn, c.task_status_df, c.task_runtime_text,
+            *c.task_buttons, c.task_result, c.task_pause_btn,
+            *c.quick_checkboxes, c.end_action_dropdown, c.config_status_text,
+        ]
+        # Each open page holds one stream, so it must not be limited to the default concurrency of 1
+        blocks.load(fn=stream, outputs=outputs, concurrency_limit=None, show_progress='hidden')
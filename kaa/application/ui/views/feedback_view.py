@@ -3,7 +3,7 @@ from typing import Dict, Any
 from functools import partial
 from kaa.application.ui.facade import KaaFacade
 from kaa.application.ui.common import GradioComponents
-from kaa.errors import FeedbackServiceError
+from kaa.errors import FeedbackServiceError, ReportCancelledError
 
 class FeedbackView:
     def __init__(self, facade: KaaFacade, components: GradioComponents):
@@ -20,6 +20,7 @@ class FeedbackView:
             with gr.Row():
                 upload_report_btn = gr.Button("上传")
                 save_local_report_btn = gr.Button("保存至本地")
+                cancel_report_btn = gr.Button("取消", variant="stop")
 
             result_text = gr.Markdown("等待操作\n\n\n")
 
@@ -40,15 +41,24 @@ class FeedbackView:
                     desc = "正在处理..."
                 progress(progress_val, desc=desc)
 
+            # 报告在后台线程中生成，这里只轮询进度，gr.Progress 始终在事件线程中更新
+            job = self.facade.feedback_service.start_report(
+                title=title,
+                description=description,
+                version=self.facade._kaa.version,
+                upload=upload,
+            )
+            last = None
+            while not job.join(0.2):
+                if job.progress is not None and job.progress is not last:
+                    last = job.progress
+                    on_progress(last)
             try:
-                result = self.facade.feedback_service.report(
-                    title=title,
-                    description=description,
-                    version=self.facade._kaa.version,
-                    upload=upload,
-                    on_progress=on_progress
-                )
+                result = job.wait()
+                on_progress(job.progress or {'type': 'done', 'step': 1, 'total_steps': 1})
                 return result.message
+            except ReportCancelledError:
+                return "已取消\n\n\n"
             except FeedbackServiceError as e:
                 gr.Error(str(e))
                 return f"### 操作失败\n\n{e}"
@@ -63,3 +73,8 @@ class FeedbackView:
             inputs=[report_title, report_description],
             outputs=[result_text]
         )
+        cancel_report_btn.click(
+            fn=lambda: self.facade.feedback_service.cancel_report(),
+            inputs=[],
+            outputs=[]
+        )
@@ -1,5 +1,4 @@
 import logging
-import datetime
 from typing import List, Any, Callable, Optional
 
 import gradio as gr
@@ -31,24 +30,20 @@ class SettingsView:
             # 1. 执行具体的修改逻辑
             update_fn()
             
-            # 2. 保存 (持久化)
-            self.facade.save_configs()
+            # 2. 保存。连续的修改在后台合并为一次写入
+            self.facade.save_configs(defer=True)
             
             # 3. 反馈
             if success_msg:
                 gr.Info(success_msg)
             
-            time_str = datetime.datetime.now().strftime("%H:%M:%S")
-            return f"*设置已保存: {time_str}*"
+            return self.facade.get_config_save_status()
             
         except ConfigValidationError as e:
-            # 恢复配置到修改前 (重载磁盘上的配置以覆盖内存中的无效修改)
-            # self.facade.config_service.reload()
+            # 保存时已将内存中的配置恢复到上次提交时的内容
             gr.Warning(f"{str(e)}")
             return "*保存失败*"
         except Exception as e:
-            # 恢复配置
-            # self.facade.config_service.reload()
             logger.exception("Failed to update settings")
             gr.Warning(f"保存失败，已还原: {str(e)}")
             return "*保存失败*"
@@ -79,6 +74,8 @@ class SettingsView:
         """Creates the content for the 'Settings' tab."""
         gr.Markdown("## 设置")
         self.status_text = gr.Markdown("*设置修改后将自动保存并即时生效。*", elem_classes=["text-gray-500", "text-sm"])
+        # 写入在后台进行，保存状态由 KaaGradioView 的状态推送更新
+        self.components.config_status_text = self.status_text
 
         with gr.Tabs():
             with gr.Tab("基本"):
@@ -515,6 +512,12 @@ class SettingsView:
             
             c5 = gr.Radio(label="日志等级", choices=[("普通", "debug"), ("详细", "verbose")], value=opts.misc.log_level, interactive=True)
             self._bind(c5, ref(of(opts).misc.log_level))
+            
+            c6 = gr.Checkbox(label="启用截图预取（实验性）", value=opts.misc.screenshot_prefetch, interactive=True)
+            self._bind(c6, ref(of(opts).misc.screenshot_prefetch))
+
+            c7 = gr.Checkbox(label="在错误报告中附带出错前的截图", value=opts.misc.flight_recorder, interactive=True)
+            self._bind(c7, ref(of(opts).misc.flight_recorder))
 
     def _create_idle_settings(self):
         with gr.Column():
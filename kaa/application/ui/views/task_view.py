@@ -57,46 +57,7 @@ class TaskView:
         stop_all_btn.click(fn=stop_all_tasks, outputs=None)
         pause_btn.click(fn=on_pause_click, outputs=None)
         
-        # --- Timers for status updates ---
-
-        def update_task_ui_status():
-            tcs = self.facade.task_service
-            is_running = tcs.is_running_single
-            is_stopping = tcs.is_stopping
-
-            # Update buttons
-            btn_updates = {}
-            if is_running or is_stopping:
-                btn_text = "停止中" if is_stopping else "运行中"
-                for btn in task_buttons:
-                    btn_updates[btn] = gr.Button(value=btn_text, interactive=False)
-            else:
-                for btn in task_buttons:
-                    btn_updates[btn] = gr.Button(value="启动", interactive=True)
-            
-            # Update status message
-            status_msg = ""
-            if is_running:
-                for name, status in tcs.get_task_statuses():
-                    if status == 'running':
-                        status_msg = f"正在执行任务: {name}"
-                        break
-            elif not tcs.run_status or not tcs.run_status.running:
-                 # Task finished, find final status
-                if tcs.run_status and tcs.run_status.tasks:
-                    final_status = tcs.run_status.tasks[0]
-                    status_map = {'finished': '已完成', 'error': '出错', 'cancelled': '已取消'}
-                    status_msg = f"任务 {final_status.task.name} {status_map.get(final_status.status, '已结束')}"
-
-            btn_updates[task_result] = gr.Markdown(value=status_msg)
-
-            # Update pause button
-            pause_status = self.facade.get_pause_button_status()
-            btn_updates[pause_btn] = gr.Button(value=pause_status['text'], interactive=pause_status['interactive'])
-            
-            return btn_updates
-
-        gr.Timer(1.0).tick(
-            fn=update_task_ui_status,
-            outputs=task_buttons + [task_result, pause_btn]
-        )
+        # Button and message updates are pushed by KaaGradioView._setup_status_stream
+        self.components.task_buttons = task_buttons
+        self.components.task_result = task_result
+        self.components.task_pause_btn = pause_btn
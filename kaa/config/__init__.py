@@ -28,6 +28,7 @@ from .const import (
 
 # 配置升级逻辑
 from .upgrade import upgrade_config
+from .store import ConfigStore, ConfigChange, ConfigChangeEvent, config_store
 from .migrations import MIGRATION_REGISTRY, LATEST_VERSION
 
 __all__ = [
@@ -58,6 +59,11 @@ __all__ = [
     "RecommendCardDetectionMode",
     # upgrade 导出
     "upgrade_config",
+    # store 导出
+    "ConfigStore",
+    "ConfigChange",
+    "ConfigChangeEvent",
+    "config_store",
     "migrations",
     "MIGRATION_REGISTRY",
     "LATEST_VERSION",
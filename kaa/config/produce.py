@@ -1,8 +1,11 @@
 import os
 import json
+import time
 import uuid
 import re
 import logging
+import tempfile
+import threading
 from typing import Literal
 from pydantic import BaseModel, ConfigDict, ValidationError, field_serializer, field_validator
 
@@ -92,6 +95,218 @@ class ProduceSolution(ConfigBaseModel):
     """培育数据"""
 
 
+class FrozenProduceData(ProduceData):
+    """只读的 `ProduceData`。字段不能重新赋值，列表字段以元组保存。"""
+    model_config = ConfigDict(frozen=True)
+    actions_order: tuple[ProduceAction, ...] = tuple(ProduceData.model_fields['actions_order'].default)  # type: ignore[assignment]
+
+
+class FrozenProduceSolution(ProduceSolution):
+    """只读的 `ProduceSolution`。用作培育过程中共享的方案快照。"""
+    model_config = ConfigDict(frozen=True)
+    data: FrozenProduceData  # type: ignore[assignment]
+
+    @staticmethod
+    def of(solution: ProduceSolution) -> 'FrozenProduceSolution':
+        return FrozenProduceSolution.model_validate(solution.model_dump())
+
+
+class _IndexEntry:
+    """索引中的一个方案文件。"""
+    __slots__ = ('path', 'mtime_ns', 'size', 'id', 'model', 'error')
+
+    def __init__(
+        self,
+        path: str,
+        mtime_ns: int,
+        size: int,
+        id: str | None,
+        model: ProduceSolution | None,
+        error: ValidationError | None
+    ):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.id = id
+        """文件中的方案 ID。无法解析时为 None。"""
+        self.model = model
+        """文件索引时校验得到的方案。仅在通过校验时不为 None。不能直接交给调用方。"""
+        self.error = error
+        """校验错误。"""
+
+    def solution(self) -> ProduceSolution | None:
+        """
+        创建一个新的方案对象。
+
+        每次调用都返回独立的对象，调用方修改后不会影响索引。
+        方案只在文件被索引（或 mtime 变化）时校验一次，这里只做深拷贝，不再经过 pydantic 校验。
+        """
+        if self.model is None:
+            return None
+        return self.model.model_copy(deep=True)
+
+
+class _SolutionIndex:
+    """
+    方案目录的内存索引：ID → (路径, mtime, 解析后的方案)。
+
+    文件按 (mtime, 大小) 判断是否变化，只有变化了的文件才会重新解析。
+    目录本身的 mtime 不变时（没有新增、删除、重命名文件）不重新列目录，
+    因此按 ID 查找只需要 stat 一个文件。
+    """
+
+    RACY_SECONDS = 2
+    """
+    目录 mtime 距今小于此秒数时，每次都重新列目录。
+
+    部分文件系统的 mtime 精度较低，同一时间片内的多次修改可能不会改变 mtime。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.__by_path: dict[str, _IndexEntry] = {}
+        self.__by_id: dict[str, _IndexEntry] = {}
+        self.__dir_mtime_ns: int | None = None
+        self.__lock = threading.RLock()
+        self.stats = 0
+        """调用 `os.stat` 的次数。"""
+        self.reads = 0
+        """读取并解析文件的次数。"""
+        self.validations = 0
+        """校验方案的次数。"""
+
+    def entry(self, id: str) -> _IndexEntry | None:
+        """按 ID 查找方案文件。"""
+        with self.__lock:
+            self.__refresh_dir()
+            entry = self.__by_id.get(id)
+            if entry is not None:
+                # 文件可能已被外部删除或修改
+                entry = self.__by_path.get(entry.path) if self.__refresh_file(entry.path) else None
+            if entry is None or entry.id != id:
+                # 文件内容可能被外部修改，ID 已变化。检查所有文件后再查找
+                self.__refresh_files()
+                entry = self.__by_id.get(id)
+            return entry
+
+    def entries(self) -> list[_IndexEntry]:
+        """所有方案文件，按文件名排序。"""
+        with self.__lock:
+            self.__refresh_dir()
+            self.__refresh_files()
+            return [self.__by_path[p] for p in sorted(self.__by_path)]
+
+    def put(self, path: str, solution: ProduceSolution):
+        """
+        记录刚写入的文件，避免重新解析与校验。
+
+        :param path: 文件路径。
+        :param solution: 写入的方案。索引中保存其副本。
+        """
+        with self.__lock:
+            st = os.stat(path)
+            model = solution.model_copy(deep=True)
+            self.__by_path[path] = _IndexEntry(path, st.st_mtime_ns, st.st_size, solution.id, model, None)
+            # 可能覆盖了其他方案的文件，重建 ID 映射
+            self.__rebuild_ids()
+
+    def remove(self, path: str):
+        with self.__lock:
+            entry = self.__by_path.pop(path, None)
+            if entry is not None and entry.id is not None and self.__by_id.get(entry.id) is entry:
+                self.__rebuild_ids()
+
+    def __refresh_files(self):
+        changed = False
+        for path in list(self.__by_path):
+            old = self.__by_path[path]
+            if not self.__refresh_file(path) or self.__by_path[path] is not old:
+                changed = True
+        if changed:
+            self.__rebuild_ids()
+
+    def __refresh_dir(self):
+        self.stats += 1
+        try:
+            st = os.stat(self.directory)
+        except FileNotFoundError:
+            self.__by_path.clear()
+            self.__by_id.clear()
+            self.__dir_mtime_ns = None
+            return
+        racy = time.time_ns() - st.st_mtime_ns < self.RACY_SECONDS * 1_000_000_000
+        if st.st_mtime_ns == self.__dir_mtime_ns and not racy:
+            return
+        self.__dir_mtime_ns = st.st_mtime_ns
+        paths = set()
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith('.json') and item.is_file():
+                    paths.add(item.path)
+        for path in set(self.__by_path) - paths:
+            del self.__by_path[path]
+        for path in paths:
+            self.__refresh_file(path)
+        self.__rebuild_ids()
+
+    def __refresh_file(self, path: str) -> bool:
+        """
+        若文件有变化，重新解析。
+
+        :return: 文件是否仍然存在。
+        """
+        self.stats += 1
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.__by_path.pop(path, None)
+            return False
+        old = self.__by_path.get(path)
+        if old is not None and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+            return True
+        self.reads += 1
+        self.__by_path[path] = self.__parse(path, st)
+        return True
+
+    def __parse(self, path: str, st: os.stat_result) -> _IndexEntry:
+        id = model = error = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get('id'), str):
+                id = data['id']
+            self.validations += 1
+            model = ProduceSolution.model_validate(data)
+            logger.info(f"Loaded produce solution from {path}")
+        except ValidationError as e:
+            error = e
+            logger.warning(f"Failed to load produce solution from {path}")
+        except Exception:
+            logger.warning(f"Failed to load produce solution from {path}")
+        return _IndexEntry(path, st.st_mtime_ns, st.st_size, id, model, error)
+
+    def __rebuild_ids(self):
+        by_id: dict[str, _IndexEntry] = {}
+        # 多个文件 ID 相同时，取文件名排序靠前的
+        for path in sorted(self.__by_path):
+            entry = self.__by_path[path]
+            if entry.id is not None and entry.id not in by_id:
+                by_id[entry.id] = entry
+        self.__by_id = by_id
+
+
+_indexes: dict[str, _SolutionIndex] = {}
+_indexes_lock = threading.Lock()
+
+def _index_of(directory: str) -> _SolutionIndex:
+    """取得目录对应的索引。同一目录的所有 `ProduceSolutionManager` 共享一个索引。"""
+    key = os.path.abspath(directory)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = _SolutionIndex(directory)
+        return _indexes[key]
+
+
 class ProduceSolutionManager:
     """培育方案管理器"""
 
@@ -121,6 +336,10 @@ class ProduceSolutionManager:
         safe_name = self._sanitize_filename(name)
         return os.path.join(self.SOLUTIONS_DIR, f"{safe_name}.json")
 
+    @property
+    def _index(self) -> _SolutionIndex:
+        return _index_of(self.SOLUTIONS_DIR)
+
     def _find_file_path_by_id(self, id: str) -> str | None:
         """
         根据方案ID查找文件路径
@@ -128,20 +347,18 @@ class ProduceSolutionManager:
         :param id: 方案ID
         :return: 文件路径，如果未找到则返回 None
         """
-        if not os.path.exists(self.SOLUTIONS_DIR):
-            return None
+        entry = self._index.entry(id)
+        return entry.path if entry is not None else None
+
+    def version(self, id: str) -> tuple[str, int, int] | None:
+        """
+        方案文件的版本，即 (路径, mtime, 大小)。文件内容变化后版本也会变化。
 
-        for filename in os.listdir(self.SOLUTIONS_DIR):
-            if filename.endswith('.json'):
-                try:
-                    file_path = os.path.join(self.SOLUTIONS_DIR, filename)
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    if data.get('id') == id:
-                        return file_path
-                except Exception:
-                    continue
-        return None
+        :param id: 方案ID
+        :return: 版本。方案不存在时返回 None。
+        """
+        entry = self._index.entry(id)
+        return (entry.path, entry.mtime_ns, entry.size) if entry is not None else None
 
     def new(self, name: str) -> ProduceSolution:
         """
@@ -163,23 +380,11 @@ class ProduceSolutionManager:
 
         :return: 方案列表
         """
-        solutions = []
-        if not os.path.exists(self.SOLUTIONS_DIR):
-            return solutions
-
-        for filename in os.listdir(self.SOLUTIONS_DIR):
-            if filename.endswith('.json'):
-                try:
-                    file_path = os.path.join(self.SOLUTIONS_DIR, filename)
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        solution = ProduceSolution.model_validate_json(f.read())
-                    solutions.append(solution)
-                    logger.info(f"Loaded produce solution from {file_path}")
-                except Exception:
-                    logger.warning(f"Failed to load produce solution from {file_path}")
-                    continue
-
-        return solutions
+        return [
+            solution
+            for entry in self._index.entries()
+            if (solution := entry.solution()) is not None
+        ]
 
     def delete(self, id: str) -> None:
         """
@@ -190,6 +395,7 @@ class ProduceSolutionManager:
         file_path = self._find_file_path_by_id(id)
         if file_path:
             os.remove(file_path)
+            self._index.remove(file_path)
 
     def save(self, id: str, solution: ProduceSolution) -> None:
         """
@@ -201,17 +407,29 @@ class ProduceSolutionManager:
         # 确保ID一致
         solution.id = id
 
-        # 先删除具有相同ID的旧文件（如果存在），避免名称变更时产生重复文件
         old_file_path = self._find_file_path_by_id(id)
-        if old_file_path:
-            os.remove(old_file_path)
 
-        # 保存新文件
+        # 先写入临时文件再替换，避免写入中途出错时损坏方案文件
         file_path = self._get_file_path(solution.name)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            # 使用 model_dump 并指定 mode='json' 来正确序列化枚举
-            data = solution.model_dump(mode='json')
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        # 使用 model_dump 并指定 mode='json' 来正确序列化枚举
+        data = solution.model_dump(mode='json')
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.part', dir=self.SOLUTIONS_DIR)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # 名称变更时删除具有相同ID的旧文件，避免产生重复文件。
+        # 大小写不敏感的文件系统上，新旧路径可能指向同一个文件
+        if old_file_path and old_file_path != file_path and os.path.exists(old_file_path) \
+                and not os.path.samefile(old_file_path, file_path):
+            os.remove(old_file_path)
+            self._index.remove(old_file_path)
+        self._index.put(file_path, solution)
 
     def read(self, id: str) -> ProduceSolution:
         """
@@ -221,15 +439,14 @@ class ProduceSolutionManager:
         :return: 方案对象
         :raises ProduceSloutionNotFoundError: 当方案不存在时
         """
-        file_path = self._find_file_path_by_id(id)
-        if not file_path:
+        entry = self._index.entry(id)
+        if entry is None:
             raise ProduceSolutionNotFoundError(id)
-
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return ProduceSolution.model_validate_json(f.read())
-        except ValidationError as e:
-            raise ProduceSolutionInvalidError(id, file_path, e)
+        solution = entry.solution()
+        if solution is None:
+            assert entry.error is not None
+            raise ProduceSolutionInvalidError(id, entry.path, entry.error)
+        return solution
 
     def duplicate(self, id: str) -> ProduceSolution:
         """
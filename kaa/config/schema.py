@@ -1,8 +1,10 @@
+import threading
+from contextlib import contextmanager
 from typing import TypeVar, Literal, Sequence
 from pydantic import BaseModel, ConfigDict
 
 from kotonebot import config
-from kaa.config.produce import ProduceSolution, ProduceSolutionManager
+from kaa.config.produce import FrozenProduceSolution, ProduceSolutionManager
 from kaa.errors import NoProduceSolutionSelectedError
 from .const import (
     ConfigEnum,
@@ -208,6 +210,19 @@ class MiscConfig(ConfigBaseModel):
     """
     日志等级。
     """
+    screenshot_prefetch: bool = False
+    """
+    是否启用截图预取。
+
+    启用后，后台线程会持续截图，使截图与图像识别同时进行，
+    提高识别循环的帧率，但会增加模拟器的负载。
+    """
+    flight_recorder: bool = True
+    """
+    是否启用截图飞行记录器。
+
+    启用后，内存中保留最近一分钟的截图与操作，随错误报告一起导出。
+    """
 
 class IdleModeConfig(ConfigBaseModel):
     enabled: bool = False
@@ -269,10 +284,91 @@ def conf() -> BaseConfig:
     c = config.to(BaseConfig).current
     return c.options
 
-def produce_solution() -> ProduceSolution:
-    """获取当前培育方案"""
+class ProduceSolutionCache:
+    """
+    当前培育方案的进程级快照。
+
+    快照是只读的 `FrozenProduceSolution`，只有选中的方案 ID 或方案文件变化时才重新加载。
+    检查文件是否变化需要一次 `os.stat`；在 `frozen()` 范围内（即培育过程中）
+    连这一步也省去，直接返回快照，不访问磁盘。
+    """
+
+    def __init__(self):
+        self.hits = 0
+        """直接返回快照（不访问磁盘）的次数。"""
+        self.checks = 0
+        """检查方案文件是否变化的次数。"""
+        self.loads = 0
+        """重新加载快照的次数。"""
+        self.__manager: ProduceSolutionManager | None = None
+        self.__snapshot: FrozenProduceSolution | None = None
+        self.__version: tuple[str, int, int] | None = None
+        self.__frozen = 0
+        self.__lock = threading.RLock()
+
+    @property
+    def manager(self) -> ProduceSolutionManager:
+        if self.__manager is None:
+            self.__manager = ProduceSolutionManager()
+        return self.__manager
+
+    def get(self, id: str) -> FrozenProduceSolution:
+        """
+        获取指定 ID 的方案快照。
+
+        :raises ProduceSolutionNotFoundError: 当方案不存在时
+        """
+        with self.__lock:
+            snapshot = self.__snapshot
+            if snapshot is not None and snapshot.id == id:
+                if self.__frozen:
+                    self.hits += 1
+                    return snapshot
+                self.checks += 1
+                if self.manager.version(id) == self.__version:
+                    return snapshot
+            self.loads += 1
+            solution = self.manager.read(id)
+            self.__version = self.manager.version(id)
+            self.__snapshot = FrozenProduceSolution.of(solution)
+            return self.__snapshot
+
+    def invalidate(self):
+        """丢弃快照。下次获取时重新加载。"""
+        with self.__lock:
+            self.__snapshot = None
+            self.__version = None
+
+    @contextmanager
+    def frozen(self):
+        """
+        在此范围内不检查方案文件的变化，始终返回同一份快照。可以嵌套。
+        """
+        with self.__lock:
+            self.__frozen += 1
+        try:
+            yield
+        finally:
+            with self.__lock:
+                self.__frozen -= 1
+
+
+produce_solution_cache = ProduceSolutionCache()
+
+def produce_solution() -> FrozenProduceSolution:
+    """
+    获取当前培育方案。
+
+    返回的是只读快照，不能修改。见 `ProduceSolutionCache`。
+    """
     id = conf().produce.selected_solution_id
     if id is None:
         raise NoProduceSolutionSelectedError()
-    # TODO: 这里需要缓存，不能每次都从磁盘读取
-    return ProduceSolutionManager().read(id)
+    return produce_solution_cache.get(id)
+
+def produce_solution_frozen():
+    """
+    冻结当前培育方案，直到退出此范围。用于整个培育流程：
+    培育中途修改方案不会生效，每帧识别时读取方案也不再访问磁盘。
+    """
+    return produce_solution_cache.frozen()
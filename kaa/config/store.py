@@ -0,0 +1,450 @@
+"""
+配置的进程级缓存。
+
+配置文件只解析一次，之后 `Kaa`、Context 与 UI 共享同一个内存中的 `RootConfig`。
+每次提交会与上次提交的内容比较，发布精确到字段的变更事件，
+订阅者据此只应用受影响的部分（如日志等级、截图预取），不必重新初始化整个 Context。
+
+UI 中的连续修改可以延迟写入（`commit(defer=True)`）：变更事件立即发布，
+写入磁盘则在后台合并为一次。
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Literal, cast
+
+from pydantic import BaseModel, ValidationError
+
+from kotonebot.config.base_config import RootConfig, UserConfig
+from kotonebot.backend.context.context import ContextConfig
+from .schema import BaseConfig
+from .upgrade import upgrade_root
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class ConfigChange:
+    """单个字段的变更。"""
+    user: int | None
+    """变更所在的用户配置序号。为 None 时表示根配置上的字段（如 `version`、`user_configs` 本身）。"""
+    path: str
+    """字段路径，相对于用户配置，以 `.` 分隔。如 `options.misc.log_level`、`backend.adb_port`。"""
+    old: Any
+    """变更前的值。新增的字段为 None。"""
+    new: Any
+    """变更后的值。删除的字段为 None。"""
+
+
+@dataclass(frozen=True)
+class ConfigChangeEvent:
+    """一次提交产生的所有变更。"""
+    version: int
+    """提交后的配置版本号。"""
+    changes: tuple[ConfigChange, ...]
+    source: Any = None
+    """发起提交的对象。订阅者可据此忽略自己发起的变更。"""
+
+    def touches(self, prefix: str | None = None, user: int = 0) -> bool:
+        """
+        是否有变更涉及指定字段或其子字段。
+
+        :param prefix: 字段路径前缀，如 `backend`、`options.misc.log_level`。为 None 时匹配任意变更。
+        :param user: 用户配置序号。
+        """
+        for change in self.changes:
+            if change.user is None:
+                # 用户配置的增删，视为所有字段都可能变化
+                if change.path == 'user_configs':
+                    return True
+                continue
+            if change.user != user:
+                continue
+            if prefix is None or change.path == prefix or change.path.startswith(prefix + '.'):
+                return True
+        return False
+
+
+ConfigListener = Callable[[ConfigChangeEvent], None]
+SaveStatus = Literal['saved', 'pending', 'error']
+
+
+def _diff(old: Any, new: Any, path: tuple[str, ...], out: list[tuple[tuple[str, ...], Any, Any]]):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old.keys() | new.keys():
+            _diff(old.get(key, _MISSING), new.get(key, _MISSING), path + (str(key),), out)
+    elif (
+        isinstance(old, list) and isinstance(new, list) and len(old) == len(new)
+        and all(isinstance(item, dict) for item in old + new)
+    ):
+        for i, (a, b) in enumerate(zip(old, new)):
+            _diff(a, b, path + (str(i),), out)
+    elif old != new:
+        out.append((
+            path,
+            None if old is _MISSING else old,
+            None if new is _MISSING else new,
+        ))
+
+
+def _assign_in_place(target: BaseModel, source: BaseModel):
+    """把 `source` 的字段值逐个写入 `target`，保留 `target` 及其子模型对象本身。"""
+    for name in type(target).model_fields:
+        current = getattr(target, name)
+        value = getattr(source, name)
+        if isinstance(current, BaseModel) and type(current) is type(value):
+            _assign_in_place(current, value)
+        elif (
+            isinstance(current, list) and isinstance(value, list) and len(current) == len(value)
+            and all(isinstance(a, BaseModel) and type(a) is type(b) for a, b in zip(current, value))
+        ):
+            for a, b in zip(current, value):
+                _assign_in_place(a, b)
+        else:
+            setattr(target, name, value)
+
+
+class ConfigStore:
+    """
+    带版本号的内存配置。
+
+    `root` 是唯一的一份配置对象，可以直接修改，修改在 `commit()` 之后才会写入磁盘并通知订阅者。
+    通常不直接创建，而是通过 `config_store()` 取得与配置文件对应的共享实例。
+    """
+
+    def __init__(
+        self,
+        config_path: str,
+        *,
+        write_delay: float = 0.5,
+        max_write_delay: float = 3,
+    ):
+        """
+        :param config_path: 配置文件路径。
+        :param write_delay: 延迟写入时，最后一次提交后等待多久再写入。单位秒。
+        :param max_write_delay: 延迟写入时，第一次未写入的提交后最多等待多久。单位秒。
+        """
+        self.config_path = config_path
+        self.write_delay = write_delay
+        self.max_write_delay = max_write_delay
+        self.version = 0
+        """配置版本号。每次加载或提交产生变更时递增。"""
+        self.upgrade_msg: str | None = None
+        """加载时若升级了配置，则为迁移提示信息。"""
+        self.loads = 0
+        """从磁盘解析配置的次数。"""
+        self.writes = 0
+        """写入配置文件的次数。"""
+        self.saved_version = 0
+        """已写入磁盘的配置版本号。"""
+        self.last_saved_at: float | None = None
+        """最近一次写入完成的时间（`time.time()`）。"""
+        self.last_error: Exception | None = None
+        """最近一次写入失败的异常。写入成功后清空。"""
+        self.__root: RootConfig[BaseConfig] | None = None
+        self.__snapshot: dict[str, Any] = {}
+        self.__lock = threading.RLock()
+        self.__listeners: list[tuple[ConfigListener, str | None]] = []
+        self.__status_listeners: list[Callable[[SaveStatus], None]] = []
+        self.__write_cond = threading.Condition(self.__lock)
+        self.__write_lock = threading.Lock()
+        self.__writer: threading.Thread | None = None
+        self.__dirty_since: float | None = None
+        self.__write_due = 0.0
+
+    @property
+    def root(self) -> RootConfig[BaseConfig]:
+        """当前配置。首次访问时从磁盘加载。"""
+        with self.__lock:
+            if self.__root is None:
+                self.load()
+            assert self.__root is not None
+            return self.__root
+
+    def user(self, index: int = 0) -> UserConfig[BaseConfig]:
+        """指定序号的用户配置。"""
+        return self.root.user_configs[index]
+
+    def options(self, index: int = 0) -> BaseConfig:
+        """指定序号的用户配置中的 `options`。"""
+        return cast(BaseConfig, self.user(index).options)
+
+    @property
+    def status(self) -> SaveStatus:
+        """
+        写入状态。
+
+        * saved: 所有提交都已写入磁盘。
+        * pending: 有提交正在等待写入。
+        * error: 最近一次写入失败，会在下次提交或 `flush()` 时重试。
+        """
+        with self.__lock:
+            if self.last_error is not None:
+                return 'error'
+            return 'pending' if self.saved_version < self.version else 'saved'
+
+    def load(self) -> ConfigChangeEvent | None:
+        """
+        从磁盘（重新）加载配置。必要时先升级配置文件。
+
+        已加载过时，内存中的配置对象会被原地更新，并发布与磁盘内容的差异。
+        """
+        with self.__lock:
+            root = self.__read()
+            if self.__root is None:
+                self.__root = root
+                self.__snapshot = root.model_dump(mode='json')
+                self.version += 1
+                self.saved_version = self.version
+                return None
+            _assign_in_place(self.__root, root)
+            event = self.__advance(None)
+            # 内存中的配置已与磁盘一致，放弃尚未写入的提交
+            self.saved_version = self.version
+            self.__dirty_since = None
+        if event is not None:
+            self.__publish(event)
+        return event
+
+    def commit(self, *, source: Any = None, defer: bool = False) -> ConfigChangeEvent | None:
+        """
+        校验并保存对 `root` 的修改，然后通知订阅者。
+
+        :param source: 发起提交的对象，会原样放入事件中。
+        :param defer:
+            是否延迟写入。为 True 时立即通知订阅者，但写入磁盘推迟到
+            `write_delay` 内没有新的提交（最长 `max_write_delay`）之后，在后台线程中进行，
+            连续的多次提交只写入一次。
+        :return: 本次提交的变更。没有变更时返回 None，也不会写入磁盘。
+        :raises ValidationError: 修改未通过校验时。此时 `root` 已恢复到最近一次提交时的内容，
+            订阅者不会收到通知。
+        :raises OSError: 不延迟写入且写入失败时。此时订阅者仍会收到通知。
+        """
+        with self.__lock:
+            root = self.root
+            try:
+                # pydantic 不在赋值时校验，无效的值已经写入了共享的 root，
+                # 必须在发布之前校验，失败时立即还原，避免运行中的任务通过 conf() 读到
+                RootConfig[BaseConfig].model_validate(root.model_dump(warnings=False))
+            except ValidationError:
+                self.discard()
+                raise
+            event = self.__advance(source)
+            if event is None:
+                return None
+            if defer:
+                self.__schedule_write()
+        saved = defer or self.flush()
+        self.__publish(event)
+        if not saved:
+            raise cast(Exception, self.last_error)
+        return event
+
+    def flush(self) -> bool:
+        """
+        立即写入尚未写入的提交。
+
+        :return: 是否写入成功。没有需要写入的内容时也返回 True。
+        """
+        # 同一时间只有一个线程写入，避免较旧的内容覆盖较新的内容
+        with self.__write_lock:
+            with self.__lock:
+                if self.saved_version >= self.version and self.last_error is None:
+                    return True
+                version = self.version
+                snapshot = self.__snapshot
+                self.__dirty_since = None
+            try:
+                self.__write(snapshot)
+            except Exception as e:
+                logger.exception('Failed to save config to %s.', self.config_path)
+                with self.__lock:
+                    self.last_error = e
+                self.__publish_status()
+                return False
+            with self.__lock:
+                self.writes += 1
+                self.saved_version = max(self.saved_version, version)
+                self.last_saved_at = time.time()
+                self.last_error = None
+            self.__publish_status()
+            return True
+
+    def discard(self):
+        """丢弃 `root` 上尚未提交的修改，恢复到最近一次提交时的内容。"""
+        with self.__lock:
+            if self.__root is None:
+                return
+            committed = RootConfig[BaseConfig].model_validate(self.__snapshot)
+            _assign_in_place(self.__root, committed)
+
+    def subscribe(self, listener: ConfigListener, prefix: str | None = None) -> Callable[[], None]:
+        """
+        订阅配置变更。
+
+        :param listener: 回调函数，在提交完成后于提交者的线程中调用。
+        :param prefix: 只在涉及此字段（见 `ConfigChangeEvent.touches`）时回调。为 None 时任意变更都回调。
+        :return: 取消订阅的函数。
+        """
+        item = (listener, prefix)
+        with self.__lock:
+            self.__listeners.append(item)
+        def unsubscribe():
+            with self.__lock:
+                if item in self.__listeners:
+                    self.__listeners.remove(item)
+        return unsubscribe
+
+    def subscribe_status(self, listener: Callable[[SaveStatus], None]) -> Callable[[], None]:
+        """
+        订阅写入状态（见 `status`）的变化。
+
+        :param listener: 回调函数，在每次写入完成或失败后于写入线程中调用。
+        :return: 取消订阅的函数。
+        """
+        with self.__lock:
+            self.__status_listeners.append(listener)
+        def unsubscribe():
+            with self.__lock:
+                if listener in self.__status_listeners:
+                    self.__status_listeners.remove(listener)
+        return unsubscribe
+
+    def __read(self) -> RootConfig[BaseConfig]:
+        self.loads += 1
+        if not os.path.exists(self.config_path):
+            return RootConfig[BaseConfig]()
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        data = json.loads(text)
+        msg = upgrade_root(data, self.config_path)
+        if msg is not None:
+            self.upgrade_msg = msg
+        return RootConfig[BaseConfig].model_validate(data)
+
+    def __write(self, snapshot: dict[str, Any]):
+        # 先写入临时文件再替换，避免写入中途出错时损坏配置文件
+        directory = os.path.dirname(os.path.abspath(self.config_path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.part', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self.config_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def __schedule_write(self):
+        now = time.monotonic()
+        if self.__dirty_since is None:
+            self.__dirty_since = now
+        self.__write_due = min(now + self.write_delay, self.__dirty_since + self.max_write_delay)
+        if self.__writer is None:
+            self.__writer = threading.Thread(target=self.__run_writer, name='kaa-config-writer', daemon=True)
+            self.__writer.start()
+        self.__write_cond.notify_all()
+
+    def __run_writer(self):
+        while True:
+            with self.__lock:
+                while self.__dirty_since is None:
+                    self.__write_cond.wait()
+                remaining = self.__write_due - time.monotonic()
+                if remaining > 0:
+                    # 等待期间可能有新的提交推迟写入时间，醒来后重新计算
+                    self.__write_cond.wait(remaining)
+                    continue
+            self.flush()
+
+    def __advance(self, source: Any) -> ConfigChangeEvent | None:
+        assert self.__root is not None
+        snapshot = self.__root.model_dump(mode='json')
+        diffs: list[tuple[tuple[str, ...], Any, Any]] = []
+        _diff(self.__snapshot, snapshot, (), diffs)
+        if not diffs:
+            return None
+        changes = []
+        for path, old, new in diffs:
+            if len(path) >= 2 and path[0] == 'user_configs':
+                changes.append(ConfigChange(int(path[1]), '.'.join(path[2:]), old, new))
+            else:
+                changes.append(ConfigChange(None, '.'.join(path), old, new))
+        self.__snapshot = snapshot
+        self.version += 1
+        return ConfigChangeEvent(self.version, tuple(changes), source)
+
+    def __publish(self, event: ConfigChangeEvent):
+        with self.__lock:
+            listeners = list(self.__listeners)
+        logger.debug(
+            'Config v%d: %s', event.version,
+            ', '.join(f'{c.path or "<root>"}' if c.user is None else f'[{c.user}].{c.path}' for c in event.changes)
+        )
+        for listener, prefix in listeners:
+            if prefix is not None and not event.touches(prefix):
+                continue
+            try:
+                listener(event)
+            except Exception:
+                logger.exception('Config listener %r failed.', listener)
+
+
+    def __publish_status(self):
+        with self.__lock:
+            listeners = list(self.__status_listeners)
+        status = self.status
+        for listener in listeners:
+            try:
+                listener(status)
+            except Exception:
+                logger.exception('Config status listener %r failed.', listener)
+
+
+class StoreContextConfig(ContextConfig[BaseConfig]):
+    """
+    由 `ConfigStore` 提供数据的 `ContextConfig`。
+
+    任务中通过 `conf()` 读取到的即是 `ConfigStore.root`，提交的修改立即对任务可见，
+    `config.save()` 也会经由 `ConfigStore.commit()` 通知订阅者。
+    """
+
+    def __init__(self, context: Any, store: ConfigStore):
+        # 不调用父类的 __init__，避免再次读取配置文件
+        self.context = context
+        self.store = store
+        self.config_path = store.config_path
+        self.current_key = 0
+        self.config_type = BaseConfig
+
+    @property
+    def root(self) -> RootConfig[BaseConfig]:  # type: ignore[override]
+        return self.store.root
+
+    def save(self):
+        self.store.commit(source=self)
+
+    def load(self):
+        self.store.load()
+
+
+_stores: dict[str, ConfigStore] = {}
+_stores_lock = threading.Lock()
+
+def config_store(config_path: str = 'config.json') -> ConfigStore:
+    """取得配置文件对应的 `ConfigStore`。同一文件在进程内共享一个实例。"""
+    key = os.path.abspath(config_path)
+    with _stores_lock:
+        if key not in _stores:
+            store = ConfigStore(config_path)
+            # 退出前写入延迟中的修改
+            atexit.register(store.flush)
+            _stores[key] = store
+        return _stores[key]
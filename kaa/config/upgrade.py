@@ -6,17 +6,11 @@ from typing import Any
 
 logger = logging.getLogger(__name__)
 
-def upgrade_config() -> str | None:
+def upgrade_config(config_path: str = "config.json") -> str | None:
     """检查并升级 `config.json` 到最新版本。
 
     若配置已是最新版本，则返回 ``None``；否则返回合并后的迁移提示信息。
     """
-    # 避免循环依赖，这里再进行本地导入
-    from .migrations import MIGRATION_REGISTRY, LATEST_VERSION  # pylint: disable=import-outside-toplevel
-
-    logger.setLevel(logging.DEBUG)
-    print('1212121212')
-    config_path = "config.json"
     if not os.path.exists(config_path):
         logger.debug("config.json not found. Skip upgrade.")
         return None
@@ -24,6 +18,15 @@ def upgrade_config() -> str | None:
     # 读取配置
     with open(config_path, "r", encoding="utf-8") as f:
         root: dict[str, Any] = json.load(f)
+    return upgrade_root(root, config_path)
+
+def upgrade_root(root: dict[str, Any], config_path: str = "config.json") -> str | None:
+    """原地升级已读取的配置数据，并写回 `config_path`。
+
+    供已经读取过配置文件的调用方使用，避免再次读取。返回值同 `upgrade_config`。
+    """
+    # 避免循环依赖，这里再进行本地导入
+    from .migrations import MIGRATION_REGISTRY, LATEST_VERSION  # pylint: disable=import-outside-toplevel
 
     version: int = root.get("version", 1)
     if version >= LATEST_VERSION:
@@ -42,7 +45,7 @@ def upgrade_config() -> str | None:
             break
 
         # 备份文件
-        backup_path = f"config.v{version}.json"
+        backup_path = os.path.join(os.path.dirname(config_path), f"config.v{version}.json")
         shutil.copy(config_path, backup_path)
         logger.info("Backup saved: %s", backup_path)
 
@@ -54,24 +54,29 @@ class UpdateInstallError(UpdateServiceError):
             'https://www.kdocs.cn/l/cetCY8mGKHLj?linkname=some-link' # TODO
         )
 
-class FeedbackServiceError(ServiceError):
+class FeedbackServiceError(KaaError):
     """Base class for feedback service errors."""
     pass
 
-class ReportCreationError(FeedbackServiceError):
+class ReportCreationError(ServiceError, FeedbackServiceError):
     def __init__(self, reason: str):
         super().__init__(
             f'Failed to create bug report: {reason}',
             'https://www.kdocs.cn/l/cetCY8mGKHLj?linkname=some-link' # TODO
         )
 
-class UploadError(FeedbackServiceError):
+class UploadError(ServiceError, FeedbackServiceError):
     def __init__(self, reason: str):
         super().__init__(
             f'Failed to upload bug report: {reason}',
             'https://www.kdocs.cn/l/cetCY8mGKHLj?linkname=some-link' # TODO
         )
 
+class ReportCancelledError(FeedbackServiceError):
+    """用户取消了错误报告的创建。不是真正的错误，因此没有帮助链接。"""
+    def __init__(self):
+        super().__init__('已取消创建错误报告。')
+
 class ProduceSolutionNotFoundError(KaaUserFriendlyError):
     def __init__(self, solution_id: str):
         self.solution_id = solution_id
@@ -138,4 +143,19 @@ class WindowsOnlyError(KaaUserFriendlyError):
         super().__init__(
             f'此功能（{feature_name}）仅在 Windows 上可用。当前系统为 {platform.system()}。请不要使用此功能，或在 Windows 上运行 kaa。',
             'https://www.kdocs.cn/l/cetCY8mGKHLj?linkname=LbvACPfiCw'
-        )
\ No newline at end of file
+        )
+
+class ReplayError(KaaError):
+    """会话回放相关错误的基类。"""
+    pass
+
+class ReplayDivergedError(ReplayError):
+    """回放中任务的输入与录制不一致。"""
+    pass
+
+class ReplayExhaustedError(ReplayError):
+    """录制的截图已用完，任务仍在继续截图。"""
+    def __init__(self, position: int, total: int):
+        self.position = position
+        self.total = total
+        super().__init__(f'Session replay exhausted at event {position}/{total}.')
@@ -1,12 +1,17 @@
+import threading
+from typing import Sequence
+
 import cv2
 import numpy as np
 from cv2.typing import MatLike
 
 from kotonebot.primitives import Rect
 from kotonebot.backend.core import Image
+from kotonebot.backend.image import TemplateMatchResult
 from kotonebot.backend.color import HsvColor
 from kotonebot import action, color, image, device
-from kotonebot.backend.preprocessor import HsvColorFilter
+from kotonebot.backend.preprocessor import HsvColorFilter, ImageFormat, PreprocessorProtocol
+from kaa.util.frame import Frame
 
 
 def filter_rectangles(
@@ -20,7 +25,7 @@ def filter_rectangles(
     过滤出指定颜色，并执行轮廓查找，返回符合要求的轮廓的 bound box。
     返回结果按照 y 坐标排序。
     """
-    img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    img_hsv = Frame.of(img).hsv()
 
     white_mask = cv2.inRange(img_hsv, np.array(color_ranges[0]), np.array(color_ranges[1]))
     contours, _ = cv2.findContours(white_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -46,6 +51,119 @@ def filter_rectangles(
     result_rects.sort(key=lambda x: x.y1)
     return result_rects
 
+class HsvRectFilter:
+    """
+    多颜色范围的矩形过滤器。
+
+    与多次调用 `filter_rectangles` 相比：
+    * 只对 `rect` 区域做一次 HSV 转换。
+    * 通过查找表一次性计算出每个像素属于哪些颜色范围，
+      结果保存为标签图，第 i 位表示第 i 个颜色范围。
+    * 同一帧上的多次查询复用同一张标签图。
+
+    最多支持 8 个颜色范围。
+
+    例：
+    ```python
+    f = HsvRectFilter([PINK_RANGE, WHITE_RANGE], rect=R.InPurodyuusu.BoxCommuEventButtonsArea)
+    f.update(img)
+    pink_rects = f.rectangles(0, 7, 500)
+    white_rects = f.rectangles(1, 3, 1000)
+    ```
+    """
+    def __init__(
+        self,
+        color_ranges: Sequence[tuple[HsvColor, HsvColor]],
+        rect: Rect | None = None
+    ):
+        """
+        :param color_ranges: 颜色范围列表。每项为 `(lower, upper)`。
+        :param rect: 识别范围。为 None 时使用整张图像。
+        """
+        if len(color_ranges) > 8:
+            raise ValueError('At most 8 color ranges are supported.')
+        self.color_ranges = list(color_ranges)
+        self.rect = rect
+        # 每个通道一张查找表：值 v 对应的位掩码表示 v 落在哪些范围的该通道区间内
+        lut = np.zeros((1, 256, 3), dtype=np.uint8)
+        values = np.arange(256)
+        for i, (lower, upper) in enumerate(self.color_ranges):
+            for ch in range(3):
+                inside = (values >= lower[ch]) & (values <= upper[ch])
+                lut[0, inside, ch] |= np.uint8(1 << i)
+        self.__lut = lut
+        self.__img: MatLike | None = None
+        self.__labels: MatLike | None = None
+        self.__offset = (0, 0)
+
+    def update(self, img: MatLike) -> 'HsvRectFilter':
+        """
+        计算给定图像的标签图。若与上次传入的是同一图像，则直接复用。
+
+        :param img: BGR 格式的图像。
+        """
+        if img is self.__img:
+            return self
+        if self.rect is not None:
+            # 向外多取 1 像素，使贴住识别范围边缘的轮廓保持完整，
+            # 延伸到范围外的轮廓则会越过边缘，之后被排除
+            x, y, w, h = self.rect.xywh
+            x1, y1 = max(0, x - 1), max(0, y - 1)
+            x2, y2 = min(img.shape[1], x + w + 1), min(img.shape[0], y + h + 1)
+            hsv = Frame.of(img).hsv(Rect(x1, y1, x2 - x1, y2 - y1))
+            self.__offset = (x1, y1)
+        else:
+            hsv = Frame.of(img).hsv()
+            self.__offset = (0, 0)
+        h_bits, s_bits, v_bits = cv2.split(cv2.LUT(hsv, self.__lut))
+        labels = cv2.bitwise_and(h_bits, s_bits)
+        cv2.bitwise_and(labels, v_bits, dst=labels)
+        self.__labels = labels
+        self.__img = img
+        return self
+
+    def mask(self, index: int) -> MatLike:
+        """
+        返回第 `index` 个颜色范围的掩码，范围为识别范围。
+        """
+        if self.__labels is None:
+            raise ValueError('update() must be called first.')
+        return cv2.bitwise_and(self.__labels, 1 << index)
+
+    def rectangles(
+        self,
+        index: int,
+        aspect_ratio_threshold: float,
+        area_threshold: int
+    ) -> list[Rect]:
+        """
+        查找第 `index` 个颜色范围中符合要求的轮廓的 bound box。
+        返回结果为屏幕坐标，并按照 y 坐标排序。
+
+        与 `filter_rectangles` 一致，超出识别范围的轮廓会被丢弃。
+        """
+        mask = self.mask(index)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=self.__offset)
+        result_rects: list[Rect] = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            # 如果不在指定范围内，跳过
+            if self.rect is not None:
+                rect_x1, rect_y1, rect_w, rect_h = self.rect.xywh
+                if not (
+                    x >= rect_x1 and
+                    y >= rect_y1 and
+                    x + w <= rect_x1 + rect_w and
+                    y + h <= rect_y1 + rect_h
+                ):
+                    continue
+            aspect_ratio = w / h
+            area = cv2.contourArea(contour)
+            if aspect_ratio >= aspect_ratio_threshold and area >= area_threshold:
+                result_rects.append(Rect(x, y, w, h))
+        result_rects.sort(key=lambda x: x.y1)
+        return result_rects
+
 @action('按钮是否禁用', screenshot_mode='manual-inherit')
 def button_state(*, target: Image | None = None, rect: Rect | None = None) -> bool | None:
     """
@@ -86,6 +204,100 @@ class WhiteFilter(HsvColorFilter):
     def __init__(self):
         super().__init__(WHITE_LOW, WHITE_HIGH)
 
+    def process(self, image: MatLike, *, format: ImageFormat = 'bgr') -> MatLike:
+        if format == 'bgr':
+            # 同一帧的多次查找共用一次 HSV 转换
+            return cv2.inRange(Frame.of(image).hsv(), self.lower, self.upper)
+        return super().process(image, format=format)
+
+
+class PrefilteredTemplates:
+    """
+    预处理后模板的缓存。
+
+    `image.find(..., preprocessors=[...])` 每次调用时都会对模板重新预处理。
+    模板本身是不变的，因此以 (模板, 预处理器参数) 为键，只在第一次使用时计算一次。
+    """
+
+    def __init__(self):
+        self.__items: dict[tuple[str, str], Image] = {}
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(template: Image, preprocessor: PreprocessorProtocol) -> tuple[str, str]:
+        # 预处理器的 repr 中包含了其类型与全部参数
+        return (template.path or f'{template.name}@{id(template)}', repr(preprocessor))
+
+    def get(self, template: Image, preprocessor: PreprocessorProtocol) -> Image:
+        """取得预处理后的模板。"""
+        key = self.key(template, preprocessor)
+        with self.__lock:
+            if key not in self.__items:
+                data = preprocessor.process(template.data)
+                data.flags.writeable = False
+                self.__items[key] = Image(data=data, name=f'{template.name} ({type(preprocessor).__name__})')
+            return self.__items[key]
+
+prefiltered_templates = PrefilteredTemplates()
+"""全局预处理模板缓存。"""
+
+
+class _PrefilteredPreprocessor(PreprocessorProtocol):
+    """
+    配合预处理后的模板使用的预处理器。
+
+    模板已经预处理过，原样返回；截图的预处理结果缓存在 `Frame` 中，
+    同一帧上的多次查找只预处理一次。
+    """
+
+    def __init__(self, preprocessor: PreprocessorProtocol, template: Image):
+        self.preprocessor = preprocessor
+        self.template = template.data
+
+    def process(self, image: MatLike, *, format: ImageFormat = 'bgr') -> MatLike:
+        if image is self.template:
+            return image
+        return Frame.of(image).memo(
+            ('preprocessor', repr(self.preprocessor), format),
+            lambda img: self.preprocessor.process(img, format=format)
+        )
+
+    def __repr__(self) -> str:
+        return f'Prefiltered({self.preprocessor!r})'
+
+
+@action('查找模板（原图或预处理后）', screenshot_mode='manual-inherit')
+def find_prefiltered(
+    template: Image,
+    preprocessor: PreprocessorProtocol,
+    *,
+    threshold: float = 0.8,
+    raw_first: bool = True,
+) -> TemplateMatchResult | None:
+    """
+    在当前截图中查找模板。先尝试原图匹配，失败后再用预处理后的图像匹配。
+
+    等价于
+    ```python
+    image.find(template, threshold=threshold) or \
+        image.find(template, threshold=threshold, preprocessors=[preprocessor])
+    ```
+    但模板只预处理一次并缓存，截图的预处理结果也在同一帧的多次查找间共享。
+
+    :param template: 模板。
+    :param preprocessor: 预处理器。
+    :param threshold: 阈值。
+    :param raw_first: 是否先尝试原图匹配。若为 False，只使用预处理后的图像匹配。
+    """
+    if raw_first and (ret := image.find(template, threshold=threshold)):
+        return ret
+    filtered = prefiltered_templates.get(template, preprocessor)
+    return image.find(
+        filtered,
+        threshold=threshold,
+        preprocessors=[_PrefilteredPreprocessor(preprocessor, filtered)]
+    )
+
 
 if __name__ == '__main__':
     pass
\ No newline at end of file
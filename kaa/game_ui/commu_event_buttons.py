@@ -1,12 +1,21 @@
+import os
+import json
+import logging
 from dataclasses import dataclass
 from typing import Sequence
 
+from cv2.typing import MatLike
+
 from ..tasks import R
 from kotonebot.primitives import Rect, RectTuple
 from kotonebot.backend.core import HintBox
 from kotonebot.backend.color import HsvColor
-from kotonebot import action, device, ocr, sleep
-from .common import filter_rectangles, WHITE_LOW, WHITE_HIGH
+from kotonebot import action, device, ocr, sleep, use_screenshot
+from kaa.util import paths
+from kaa.util.ocr import ocr_batch
+from .common import HsvRectFilter, WHITE_LOW, WHITE_HIGH
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class EventButton:
@@ -41,6 +50,63 @@ DEFAULT_COLORS = [
     ORANGE_RANGE
 ]
 
+class CommuDescriptionStore:
+    """
+    交流事件按钮描述文本的本地缓存。
+
+    画面上没有事件本身的标题，因此用事件中所有按钮的标题（按从上到下的顺序）
+    作为事件的键。同一事件中，按钮标题对应的描述文本是固定的。
+    """
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.events: dict[str, dict[str, str]] = {}
+        self.__dirty = False
+        self.load()
+
+    @staticmethod
+    def event_key(titles: Sequence[str]) -> str:
+        return '\n'.join(titles)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.events = data['events']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning('Failed to load commu description cache: %s', e)
+            self.events = {}
+
+    def save(self):
+        if not self.__dirty:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'events': self.events}, f, ensure_ascii=False, indent=4)
+        os.replace(tmp, self.path)
+        self.__dirty = False
+
+    def get(self, event: str, title: str) -> str | None:
+        return self.events.get(event, {}).get(title)
+
+    def put(self, event: str, title: str, description: str):
+        if self.get(event, title) == description:
+            return
+        self.events.setdefault(event, {})[title] = description
+        self.__dirty = True
+
+_description_store: CommuDescriptionStore | None = None
+
+def description_store() -> CommuDescriptionStore:
+    global _description_store
+    if _description_store is None:
+        _description_store = CommuDescriptionStore(paths.cache('commu_descriptions.json'))
+    return _description_store
+
 # 参考图片：
 # [screenshots/produce/action_study3.png]
 # TODO: CommuEventButtonUI 需要能够识别不可用的按钮
@@ -61,20 +127,44 @@ class CommuEventButtonUI:
         """
         self.color_ranges = selected_colors
         self.rect = rect
+        # 所有选中色与白色共用一个过滤器，同一帧只做一次 HSV 转换
+        self.filter = HsvRectFilter([*selected_colors, (WHITE_LOW, WHITE_HIGH)], rect)
+        self.__white = len(selected_colors)
 
-    @action('交流事件按钮.识别选中', screenshot_mode='manual-inherit')
-    def selected(self, description: bool = True, title: bool = False) -> EventButton | None:
-        img = device.screenshot()
-        for i, color_range in enumerate(self.color_ranges):
-            rects = filter_rectangles(img, color_range, 7, 500, rect=self.rect)
+    def _selected_rect(self, img: MatLike) -> Rect | None:
+        """返回选中按钮的范围。"""
+        self.filter.update(img)
+        for i in range(self.__white):
+            rects = self.filter.rectangles(i, 7, 500)
             if len(rects) > 0:
-                desc_text = self.description() if description else ''
-                title_text = ocr.ocr(rect=rects[0]).squash().text if title else ''
-                return EventButton(rects[0], True, desc_text, title_text)
+                return rects[0]
         return None
 
+    @action('交流事件按钮.识别选中', screenshot_mode='manual-inherit')
+    def selected(
+        self,
+        description: bool = True,
+        title: bool = False,
+        *,
+        img: MatLike | None = None
+    ) -> EventButton | None:
+        """
+        识别当前选中的按钮。
+
+        :param description: 是否识别描述文本。
+        :param title: 是否识别标题。
+        :param img: 截图。若为 None，则重新截图。
+        """
+        img = use_screenshot(img)
+        rect = self._selected_rect(img)
+        if rect is None:
+            return None
+        desc_text = self.description(img) if description else ''
+        title_text = ocr.raw().ocr(img, rect=rect).squash().text if title else ''
+        return EventButton(rect, True, desc_text, title_text)
+
     @action('交流事件按钮.识别按钮', screenshot_mode='manual-inherit')
-    def all(self, description: bool = True, title: bool = False) -> list[EventButton]:
+    def all(self, description: bool = True, title: bool = False, *, cached: bool = False) -> list[EventButton]:
         """
         识别所有按钮的位置以及选中后的描述文本
 
@@ -83,23 +173,30 @@ class CommuEventButtonUI:
 
         :param description: 是否识别描述文本。
         :param title: 是否识别标题。
+        :param cached:
+            是否使用描述文本缓存。若为 True，所有按钮的标题会从同一帧中批量识别，
+            描述文本优先从缓存中读取，只有未见过的按钮才会点击识别。
+            此时 `title` 参数无效，总是识别标题。
         """
+        if cached and description:
+            return self._all_cached()
         img = device.screenshot()
-        rects = filter_rectangles(img, (WHITE_LOW, WHITE_HIGH), 7, 500, rect=self.rect)
+        rects = self.filter.update(img).rectangles(self.__white, 7, 500)
         if not rects:
             return []
-        selected = self.selected()
+        selected = self.selected(img=img)
+        # 所有按钮的标题都在同一帧上，一次批量识别
+        if title:
+            titles = [r.squash().text for r in ocr_batch(img, rects)]
+        else:
+            titles = [''] * len(rects)
         result: list[EventButton] = []
-        for rect in rects:
+        for rect, title_text in zip(rects, titles):
             desc_text = ''
-            title_text = ''
-            if title:
-                title_text = ocr.ocr(rect=rect).squash().text
             if description:
                 device.click(rect)
                 sleep(0.15)
-                device.screenshot()
-                desc_text = self.description()
+                desc_text = self.description(device.screenshot())
             result.append(EventButton(rect, False, desc_text, title_text))
         # 修改最后一次点击的按钮为 selected 状态
         if len(result) > 0:
@@ -110,17 +207,60 @@ class CommuEventButtonUI:
         result.sort(key=lambda x: x.rect.y1)
         return result
 
+    def _all_cached(self) -> list[EventButton]:
+        img = device.screenshot()
+        rects = self.filter.update(img).rectangles(self.__white, 7, 500)
+        selected = self._selected_rect(img)
+        if selected is not None:
+            rects.append(selected)
+        if not rects:
+            return []
+        rects.sort(key=lambda x: x.y1)
+        titles = [r.squash().text for r in ocr_batch(img, rects)]
+        store = description_store()
+        # 有标题识别失败时，事件的键不可靠，不使用缓存
+        usable = all(titles)
+        event = store.event_key(titles)
+
+        buttons = [EventButton(rect, rect is selected, '', title) for rect, title in zip(rects, titles)]
+        current = next((b for b in buttons if b.selected), None)
+        # 当前选中按钮的描述已经显示在画面上，无需点击
+        if current is not None:
+            current.description = self.description(img)
+            if usable:
+                store.put(event, current.title, current.description)
+        for button in buttons:
+            if button is current:
+                continue
+            if usable and (desc := store.get(event, button.title)) is not None:
+                logger.debug('Description of "%s" found in cache.', button.title)
+                button.description = desc
+                continue
+            device.click(button.rect)
+            sleep(0.15)
+            button.description = self.description(device.screenshot())
+            if usable:
+                store.put(event, button.title, button.description)
+            # 点击后选中状态转移到此按钮
+            if current is not None:
+                current.selected = False
+            button.selected = True
+            current = button
+        store.save()
+        return buttons
+
     @action('交流事件按钮.识别描述', screenshot_mode='manual-inherit')
-    def description(self) -> str:
+    def description(self, img: MatLike | None = None) -> str:
         """
         识别当前选中按钮的描述文本
 
         前置条件：有选中按钮\n
         结束状态：-
+
+        :param img: 截图。若为 None，则重新截图。
         """
-        img = device.screenshot()
-        rects = filter_rectangles(img, (WHITE_LOW, WHITE_HIGH), 3, 1000, rect=self.rect)
-        rects.sort(key=lambda x: x.y1)
+        img = use_screenshot(img)
+        rects = self.filter.update(img).rectangles(self.__white, 3, 1000)
         # TODO: 这里 rects 可能为空，需要加入判断重试
         ocr_result = ocr.raw().ocr(img, rect=rects[0])
         return ocr_result.squash().text
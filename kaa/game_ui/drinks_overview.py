@@ -1,4 +1,5 @@
 import logging
+import threading
 from collections import deque
 
 import cv2
@@ -14,6 +15,7 @@ from kaa.image_db import ImageDatabase, HistDescriptor, FileDataSource
 
 logger = logging.getLogger(__name__)
 _db: ImageDatabase | None = None
+_db_lock = threading.Lock()
 
 def preprocess_drink_slot_img(img: MatLike) -> MatLike:
     """预处理饮品图像，使得图像识别结果更正确
@@ -75,11 +77,13 @@ def preprocess_drink_slot_img(img: MatLike) -> MatLike:
 
 def drinks_db() -> ImageDatabase:
     global _db
-    if _db is None:
-        logger.info('Loading drinks database...')
-        path = paths.resource('drinks')
-        db_path = paths.cache('drinks.pkl')
-        _db = ImageDatabase(FileDataSource(str(path)), db_path, HistDescriptor(8), name='drinks')
+    # 启动预热会在后台线程中调用此函数
+    with _db_lock:
+        if _db is None:
+            logger.info('Loading drinks database...')
+            path = paths.resource('drinks')
+            db_path = paths.cache('drinks.pkl')
+            _db = ImageDatabase(FileDataSource(str(path)), db_path, HistDescriptor(8), name='drinks')
     return _db
 
 def match_first_drinks(img: MatLike, delta_threshold: float = 0.7) -> Drink | None:
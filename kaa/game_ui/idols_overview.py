@@ -1,5 +1,8 @@
 import os
+import json
 import logging
+import threading
+from typing import TypedDict
 
 import cv2
 import numpy as np
@@ -9,32 +12,65 @@ from kaa.tasks import R
 from kaa.util import paths
 from kotonebot.primitives import RectTuple, Rect
 from kaa.game_ui import Scrollable
-from kotonebot import device, action
+from kotonebot import action
 from kotonebot.util import cv2_imread
+from kaa.util.frame import Frame
 from kaa.image_db import ImageDatabase, HistDescriptor, FileDataSource, DatabaseQueryResult
-from kotonebot.backend.preprocessor import HsvColorsRemover
 
 logger = logging.getLogger(__name__)
 _db: ImageDatabase | None = None
+_db_lock = threading.Lock()
 
 # OpenCV HSV 颜色范围
 RED_DOT = ((157, 205, 255), (179, 255, 255)) # 红点
 ORANGE_SELECT_BORDER = ((9, 50, 106), (19, 255, 255)) # 当前选中的偶像的橙色边框
 WHITE_BACKGROUND = ((0, 0, 234), (179, 40, 255)) # 白色背景
 
-def extract_idols(img: MatLike) -> list[RectTuple]:
+class _Buffers(threading.local):
+    """`extract_idols` 使用的工作缓冲区。每个线程一份，按 ROI 尺寸复用。"""
+    def __init__(self):
+        self.shape: tuple[int, int] | None = None
+
+    def ensure(self, h: int, w: int):
+        if self.shape == (h, w):
+            return
+        self.shape = (h, w)
+        self.gray = np.empty((h, w), dtype=np.uint8)
+        self.mask = np.empty((h, w), dtype=np.uint8)
+        self.tmp = np.empty((h, w), dtype=np.uint8)
+
+_buffers = _Buffers()
+_REMOVE_COLORS = [
+    (np.array(lower), np.array(upper))
+    for lower, upper in (RED_DOT, ORANGE_SELECT_BORDER, WHITE_BACKGROUND)
+]
+
+def extract_idols(img: MatLike, roi: Rect | None = None) -> list[RectTuple]:
     """
     寻找给定图像中的所有偶像。
 
     :img: 输入图像，格式为 BGR 720x1280。
-    :return: 所有偶像的矩形区域 `(x, y, w, h)`，如果未找到则返回空列表。
+    :param roi: 只在此区域内寻找。为 None 时使用整张图像。
+    :return: 所有偶像的矩形区域 `(x, y, w, h)`，坐标相对于整张图像。如果未找到则返回空列表。
     """
+    ox, oy = (roi.x1, roi.y1) if roi is not None else (0, 0)
+    hsv = Frame.of(img).hsv(roi)
+    h, w = hsv.shape[:2]
+    buf = _buffers
+    buf.ensure(h, w)
     # 移除不需要的颜色
-    remover = HsvColorsRemover([RED_DOT, ORANGE_SELECT_BORDER, WHITE_BACKGROUND])
-    img = remover.process(img)
+    # 等价于 HsvColorsRemover([RED_DOT, ORANGE_SELECT_BORDER, WHITE_BACKGROUND]) 后再转灰度，
+    # 但只做一次 HSV 转换，三个颜色范围合并为一个掩码
+    cv2.inRange(hsv, *_REMOVE_COLORS[0], dst=buf.mask)
+    for lower, upper in _REMOVE_COLORS[1:]:
+        cv2.inRange(hsv, lower, upper, dst=buf.tmp)
+        cv2.bitwise_or(buf.mask, buf.tmp, dst=buf.mask)
+    cv2.bitwise_not(buf.mask, dst=buf.mask)
     # 灰度、查找轮廓
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    contours, _ = cv2.findContours(gray, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # 与原实现一致，对去色后的 HSV 图像直接取灰度
+    cv2.cvtColor(hsv, cv2.COLOR_BGR2GRAY, dst=buf.gray)
+    cv2.bitwise_and(buf.gray, buf.mask, dst=buf.gray)
+    contours, _ = cv2.findContours(buf.gray, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(ox, oy))
     # 筛选面积、比例约为 140x190 的轮廓
     rects = []
     target_ratio = 140 / 190  # 目标宽高比
@@ -100,11 +136,13 @@ def draw_idol_preview(img: MatLike, rects: list[RectTuple], db: ImageDatabase, i
 
 def idols_db() -> ImageDatabase:
     global _db
-    if _db is None:
-        logger.info('Loading idols database...')
-        path = paths.resource('idol_cards')
-        db_path = paths.cache('idols.pkl')
-        _db = ImageDatabase(FileDataSource(str(path)), db_path, HistDescriptor(8), name='idols')
+    # 启动预热会在后台线程中调用此函数
+    with _db_lock:
+        if _db is None:
+            logger.info('Loading idols database...')
+            path = paths.resource('idol_cards')
+            db_path = paths.cache('idols.pkl')
+            _db = ImageDatabase(FileDataSource(str(path)), db_path, HistDescriptor(8), name='idols')
     return _db
 
 def match_idol(skin_id: str, idol_img: MatLike) -> DatabaseQueryResult | None:
@@ -122,6 +160,105 @@ def match_idol(skin_id: str, idol_img: MatLike) -> DatabaseQueryResult | None:
     else:
         return None
 
+class IdolPosition(TypedDict):
+    thumb_top: int
+    """偶像所在页面的滚动条把手上边缘 y 坐标"""
+    slot: RectTuple
+    """偶像在该页面中的位置 (x, y, w, h)"""
+
+class IdolPositionIndex:
+    """
+    偶像总览中各偶像位置的持久化索引。
+
+    偶像总览的排列顺序在多次培育之间基本不变。
+    记录每个偶像上次被找到时的滚动位置与格子位置，下次可以直接滚动过去。
+
+    画面上无法直接读取持有的偶像数量，因此用滚动条的轨道高度与把手高度
+    （取决于总行数）作为指纹。指纹变化时，整个索引失效。
+    """
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fingerprint: tuple[int, int] | None = None
+        self.entries: dict[str, IdolPosition] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.VERSION:
+                return
+            self.fingerprint = tuple(data['fingerprint']) if data['fingerprint'] else None  # type: ignore
+            self.entries = {
+                k: IdolPosition(thumb_top=v['thumb_top'], slot=tuple(v['slot']))  # type: ignore
+                for k, v in data['entries'].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning('Failed to load idol position index: %s', e)
+            self.fingerprint = None
+            self.entries = {}
+
+    def save(self):
+        data = {
+            'version': self.VERSION,
+            'fingerprint': self.fingerprint,
+            'entries': self.entries,
+        }
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(tmp, self.path)
+
+    def validate(self, fingerprint: tuple[int, int]):
+        """检查指纹。若与记录的不一致，则清空索引。"""
+        if self.fingerprint != fingerprint:
+            if self.entries:
+                logger.info('Idol overview changed. Position index invalidated.')
+            self.fingerprint = fingerprint
+            self.entries = {}
+
+    def get(self, skin_id: str) -> IdolPosition | None:
+        return self.entries.get(skin_id)
+
+    def put(self, skin_id: str, thumb_top: int, slot: RectTuple):
+        entry = IdolPosition(thumb_top=thumb_top, slot=tuple(slot))  # type: ignore
+        if self.entries.get(skin_id) == entry:
+            return
+        self.entries[skin_id] = entry
+        self.save()
+
+    def remove(self, skin_id: str):
+        if self.entries.pop(skin_id, None) is not None:
+            self.save()
+
+_position_index: IdolPositionIndex | None = None
+
+def position_index() -> IdolPositionIndex:
+    global _position_index
+    if _position_index is None:
+        _position_index = IdolPositionIndex(paths.cache('idols_position.json'))
+    return _position_index
+
+def row_pitch(rects: list[RectTuple], tolerance: int = 20) -> int | None:
+    """
+    根据偶像的矩形区域计算行距。
+
+    :param rects: `extract_idols` 的结果。
+    :param tolerance: y 坐标相差不超过此值的矩形视为同一行。
+    :return: 相邻两行之间的距离，单位为像素。若不足两行，返回 None。
+    """
+    rows: list[int] = []
+    for ry in sorted(r[1] for r in rects):
+        if not rows or ry - rows[-1] > tolerance:
+            rows.append(ry)
+    if len(rows) < 2:
+        return None
+    return int(np.median(np.diff(rows)))
+
 @action('定位偶像', screenshot_mode='manual-inherit')
 def locate_idol(skin_id: str) -> Rect | None:
     """
@@ -133,35 +270,14 @@ def locate_idol(skin_id: str) -> Rect | None:
     :param skin_id: 目标偶像的 Skin ID
     :return: 若成功，返回目标偶像的范围 (x, y, w, h)，否则返回 None。
     """
-    device.screenshot()
     logger.info('Locating idol %s', skin_id)
-    x, y, w, h = R.Produce.BoxIdolOverviewIdols.xywh
+    h = R.Produce.BoxIdolOverviewIdols.h
     db = idols_db()
-    sc = Scrollable(color_schema='light')
-
-    sc.update()
-    logger.debug('Idol preview pages count: %s', repr(sc.page_count))
+    sc = Scrollable(color_schema='light', content_rect=R.Produce.BoxIdolOverviewIdols)
 
-    if sc.page_count is not None:
-        iterator = sc(4 / (sc.page_count * 12) * 0.8)
-    else:
-        # 没找到ScrollBar的情况，只执行一次for循环
-        logger.warning('Not found ScrollBar in Idol overview page.')
-        iterator = range(1)
-
-    # 1280x720 分辨率下，一行 4 个，一页共 12 个。
-    # 一次只翻 0.8 行。
-    for _ in iterator:
-        img = device.screenshot()
-        # 只保留 BoxIdolOverviewIdols 区域
-        mask = np.zeros_like(img)
-        mask[y:y+h, x:x+w] = img[y:y+h, x:x+w]
-        img = mask
-        # 检测 & 查询
-        rects = extract_idols(img)
-        # cv2.imshow('Detected Idols', cv2.resize(display_rects(img, rects), (0, 0), fx=0.5, fy=0.5))
-        # cv2.imshow('Idols Preview', cv2.resize(draw_idol_preview(img, rects, db, paths.resource('idol_cards')), (0, 0), fx=0.5, fy=0.5))
-        # cv2.waitKey(0)
+    def find_idol(img: MatLike) -> tuple[list[RectTuple], Rect | None]:
+        # 只在 BoxIdolOverviewIdols 区域内检测 & 查询
+        rects = extract_idols(img, R.Produce.BoxIdolOverviewIdols)
         for rect in rects:
             rx, ry, rw, rh = rect
             idol_img = img[ry:ry+rh, rx:rx+rw]
@@ -171,7 +287,70 @@ def locate_idol(skin_id: str) -> Rect | None:
             # 同一张卡升级前后图片不一样，index 分别为 0 和 1
             if match and match.key.startswith(skin_id):
                 logger.info('Found idol %s', skin_id)
+                return rects, Rect(rx, ry, rw, rh)
+        return rects, None
+
+    def verify_idol(img: MatLike, slot: Rect) -> Rect | None:
+        # 只匹配记录的格子，滚动误差在行距以内时不影响结果
+        tiles = [r for r in extract_idols(img, R.Produce.BoxIdolOverviewIdols) if abs(r[1] - slot.y1) < slot.h // 2 and abs(r[0] - slot.x1) < slot.w // 2]
+        for rx, ry, rw, rh in tiles:
+            if match_idol(skin_id, img[ry:ry+rh, rx:rx+rw]) is not None:
                 return Rect(rx, ry, rw, rh)
+        return None
+
+    def remember(found: Rect) -> Rect:
+        if sc.thumb_position is not None:
+            index.put(skin_id, sc.thumb_position[1], found.xywh)
+        return found
+
+    sc.update()
+    assert sc.frame is not None
+    logger.debug('Idol preview pages count: %s', repr(sc.page_count))
+    rects, found = find_idol(sc.frame)
+    if sc.page_count is None or not sc.track_height or not sc.thumb_height:
+        # 没找到ScrollBar的情况，只识别当前画面
+        logger.warning('Not found ScrollBar in Idol overview page.')
+        return found
+    index = position_index()
+    index.validate((sc.track_height, sc.thumb_height))
+    if found is not None:
+        return remember(found)
+
+    # 当前页已经识别过。位于顶部时从下一页开始扫描，不需要滚回顶部再识别一次
+    scan_from_current = sc.at_top
+
+    # 先尝试直接跳到上次找到的位置
+    if (last := index.get(skin_id)) is not None:
+        scan_from_current = False
+        logger.debug('Jumping to last known position of idol %s: %s', skin_id, repr(last))
+        sc.to_thumb(last['thumb_top'])
+        assert sc.frame is not None
+        if (found := verify_idol(sc.frame, Rect(xywh=last['slot']))) is not None:
+            logger.info('Found idol %s at last known position.', skin_id)
+            return remember(found)
+        rects, found = find_idol(sc.frame)
+        if found is not None:
+            return remember(found)
+        logger.info('Idol %s not found at last known position. Falling back to full scan.', skin_id)
+        index.remove(skin_id)
+
+    # 每次滚动的距离由实际行距决定：
+    # 保证每一行都至少有一次完整出现在可视区域内，并留出 10% 的余量
+    pitch = row_pitch(rects)
+    if pitch is not None:
+        tile_height = max(r[3] for r in rects)
+        step = sc.track_pixels(int(min(pitch, h - tile_height) * 0.9), h)
+    else:
+        # 1280x720 分辨率下，一行 4 个，一页共 12 个。
+        # 一次只翻 0.8 行。
+        step = int(sc.track_height * 4 / (sc.page_count * 12) * 0.8)
+    logger.debug('Idol row pitch: %s, scroll step: %d px', repr(pitch), step)
+    if scan_from_current:
+        found = sc.scan(lambda img: find_idol(img)[1], step_pixels=step, start=None, skip_current=True)
+    else:
+        found = sc.scan(lambda img: find_idol(img)[1], step_pixels=step, start=0)
+    if found is not None:
+        return remember(found)
     return None
     # cv2.imshow('Detected Idols', cv2.resize(display_rects(img, rects), (0, 0), fx=0.5, fy=0.5))
 
@@ -4,10 +4,11 @@ from dataclasses import dataclass
 from cv2.typing import MatLike
 
 from kotonebot.primitives import Rect
-from kotonebot import ocr, device, image, action
+from kotonebot import device, image, action
 from kotonebot.backend.core import HintBox
 from kaa.config import ProduceAction
 from kaa.tasks import R
+from kaa.util.ocr import ocr_batch
 
 logger = logging.getLogger(__name__)
 
@@ -108,11 +109,13 @@ class Schedule:
                 da_sp = True
             elif da.position[0] < cur_sp.position[0] < vi.position[0]:
                 vi_sp = True
-        max_value = self.read_number(img, MaxDaValue)
+        max_value, vo_value, da_value, vi_value = self.read_numbers(
+            img, [MaxDaValue, CurVoValue, CurDaValue, CurViValue]
+        )
         lesson_data = [
-            Lesson(vo.rect, vo_sp, ProduceAction.VOCAL, self.read_number(img, CurVoValue), max_value),
-            Lesson(da.rect, da_sp, ProduceAction.DANCE, self.read_number(img, CurDaValue), max_value),
-            Lesson(vi.rect, vi_sp, ProduceAction.VISUAL, self.read_number(img, CurViValue), max_value),
+            Lesson(vo.rect, vo_sp, ProduceAction.VOCAL, vo_value, max_value),
+            Lesson(da.rect, da_sp, ProduceAction.DANCE, da_value, max_value),
+            Lesson(vi.rect, vi_sp, ProduceAction.VISUAL, vi_value, max_value),
         ]
         for lesson in lesson_data:
             logger.info(f'Lesson: {lesson}')
@@ -154,9 +157,18 @@ class Schedule:
         :param box: HintBox 需要读取数值的范围
         :return: int 数值，读取失败返回0
         """
-        all_number = ocr.raw().ocr(img, rect=box)
-        all_number = all_number.squash().numbers()
-        if all_number:
-            return int(all_number[0])
-        else:
-            return 0
+        return self.read_numbers(img, [box])[0]
+
+    def read_numbers(self, img: MatLike, boxes: list[HintBox]) -> list[int]:
+        """
+        一次性读取多个范围内的数值。所有范围会被打包进同一批次识别。
+
+        :param img: MatLike 图像
+        :param boxes: 需要读取数值的范围
+        :return: 与 boxes 顺序相同的数值列表，读取失败的项为0
+        """
+        ret = []
+        for result in ocr_batch(img, boxes):
+            all_number = result.squash().numbers()
+            ret.append(int(all_number[0]) if all_number else 0)
+        return ret
@@ -1,6 +1,7 @@
 import logging
 import time
-from typing import Literal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Callable, TypeVar
 
 import cv2
 import numpy as np
@@ -10,8 +11,10 @@ from kotonebot import device, action
 from kotonebot.primitives import Rect
 from kotonebot.backend.core import HintBox
 from kotonebot.primitives.geometry import RectTuple
+from kaa.util.frame import Frame
 
 logger = logging.getLogger(__name__)
+T = TypeVar('T')
 
 # 暗色系滚动条阈值。bitwise_not = True
 # 例：金币商店、金币扭蛋页面
@@ -23,6 +26,8 @@ THRESHOLD_DARK_FOREGROUND = 190 # 仅滚动条
 THRESHOLD_LIGHT_FULL = 140 # 滚动条+滚动条背景（效果不佳）
 THRESHOLD_LIGHT_FOREGROUND = 220 # 仅滚动条
 
+THUMB_TOLERANCE = 3 # 判断把手是否到达目标位置时允许的误差，单位为像素
+
 def find_scroll_bar(img: MatLike, threshold: int, bitwise_not: bool = False) -> Rect | None:
     """
     寻找给定图像中的滚动条。
@@ -34,8 +39,7 @@ def find_scroll_bar(img: MatLike, threshold: int, bitwise_not: bool = False) ->
     :return: 滚动条的矩形区域 `(x, y, w, h)`，如果未找到则返回 None。
     """
     # 灰度、二值化、查找轮廓
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, binary = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+    binary = Frame.of(img).binary(threshold)
     if bitwise_not:
         binary = cv2.bitwise_not(binary)
     # cv2.imshow('binary', binary)
@@ -57,6 +61,26 @@ def find_scroll_bar(img: MatLike, threshold: int, bitwise_not: bool = False) ->
         return longest_contour[1]
     return None
 
+def frame_diff(a: MatLike, b: MatLike, rect: Rect | None = None, stride: int = 8) -> float:
+    """
+    计算两帧之间的差异程度。
+
+    只对 `rect` 区域按 `stride` 降采样后比较，返回各像素的平均绝对差。
+
+    :param a: 第一帧。
+    :param b: 第二帧。
+    :param rect: 比较区域。为 None 时比较整张图像。
+    :param stride: 采样步长。
+    :return: 平均绝对差，范围 [0, 255]。
+    """
+    if rect is not None:
+        x, y, w, h = rect.xywh
+        a = a[y:y+h, x:x+w]
+        b = b[y:y+h, x:x+w]
+    a = a[::stride, ::stride]
+    b = b[::stride, ::stride]
+    return float(cv2.absdiff(a, b).mean())
+
 def find_scroll_bar2(img: MatLike) -> Rect | None:
     """
     寻找给定图像中的滚动条。
@@ -66,8 +90,7 @@ def find_scroll_bar2(img: MatLike) -> Rect | None:
     :return: 滚动条的矩形区域 `(x, y, w, h)`，如果未找到则返回 None。
     """
     # 高斯模糊、边缘检测
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    gray = cv2.GaussianBlur(Frame.of(img).gray(), (5, 5), 0)
     edges = cv2.Canny(gray, 50, 70)
     # cv2.imshow('edges', cv2.resize(edges, (0, 0), fx=0.5, fy=0.5))
     # 膨胀
@@ -148,10 +171,16 @@ class Scrollable:
         *,
         at_start_threshold: float = 0.01,
         at_end_threshold: float = 0.99,
-        auto_update: bool = True
+        auto_update: bool = True,
+        content_rect: HintBox | None = None,
+        settle_timeout: float = 1,
+        settle_threshold: float = 1
     ):
         """
         :param auto_update: 在每次滑动后是否自动更新滚动数据。
+        :param content_rect: 滚动内容区域。用于判断滚动是否停止。为 None 时使用整个画面。
+        :param settle_timeout: 等待滚动停止的最长时间，单位秒。
+        :param settle_threshold: 相邻两帧差异小于此值时，认为滚动已停止。见 `frame_diff`。
         """
         self.color_schema = color_schema
         self.scrollbar_rect = scrollbar_rect
@@ -171,18 +200,33 @@ class Scrollable:
         """是否自动更新滚动数据"""
         self.at_start_threshold = at_start_threshold
         self.at_end_threshold = at_end_threshold
+        self.content_rect = content_rect
+        self.settle_timeout = settle_timeout
+        self.settle_threshold = settle_threshold
+        self.frame: MatLike | None = None
+        """最近一次滚动停止后的截图"""
 
         if color_schema == 'dark':
             raise NotImplementedError('Dark color schema is not implemented yet.')
 
+    @property
+    def at_top(self) -> bool:
+        """把手是否位于轨道顶端。"""
+        if self.thumb_position is None or self.track_position is None:
+            return False
+        return self.thumb_position[1] - self.track_position[1] <= THUMB_TOLERANCE
+
     @action('滚动.更新数据', screenshot_mode='manual-inherit')
-    def update(self) -> bool:
+    def update(self, img: MatLike | None = None) -> bool:
         """
         立即更新滚动数据。
 
+        :param img: 截图。若为 None，则重新截图。
         :return: 是否更新成功。
         """
-        img = device.screenshot()
+        if img is None:
+            img = device.screenshot()
+        self.frame = img
         if self.scrollbar_rect is None:
             logger.debug('Finding scrollbar rect...')
             self.scrollbar_rect = find_scroll_bar2(img)
@@ -193,10 +237,8 @@ class Scrollable:
         x, y, w, h = self.scrollbar_rect.xywh
         logger.debug(f'Scrollbar rect found. x/y/w/h: {x}/{y}/{w}/{h}')
 
-        scroll_img = img[y:y+h, x:x+w]
         # 灰度、二值化
-        gray = cv2.cvtColor(scroll_img, cv2.COLOR_BGR2GRAY)
-        _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+        binary = Frame.of(img).binary(150, Rect(x, y, w, h))
         # 0 = 滚动条，255 = 背景
 
         # 计算滚动位置
@@ -218,6 +260,138 @@ class Scrollable:
             logger.warning('Unable to find scrollbar. (2)')
             return False
 
+    def wait_settle(self, expected_thumb_top: int | None = None) -> MatLike:
+        """
+        等待滚动停止，并返回停止后的截图。
+
+        若指定了 `expected_thumb_top`，且第一张截图中的把手已经位于该位置，
+        则认为滚动已经停止，只截图一次。拖动把手时内容随把手同步移动，没有惯性。
+
+        否则持续截图，直到相邻两帧在内容区域内的差异小于 `settle_threshold`，
+        或超过 `settle_timeout`。返回的截图可以直接用于更新滚动数据与识别内容，
+        不需要再次截图。
+
+        :param expected_thumb_top: 滚动停止时把手上边缘的 y 坐标。
+        """
+        start = time.time()
+        prev = device.screenshot()
+        if expected_thumb_top is not None and self.update(prev) and self.thumb_position is not None \
+                and abs(self.thumb_position[1] - expected_thumb_top) <= THUMB_TOLERANCE:
+            logger.debug('Scroll settled on first frame.')
+            self.frame = prev
+            return prev
+        while True:
+            img = device.screenshot()
+            diff = frame_diff(prev, img, self.content_rect)
+            if diff < self.settle_threshold:
+                logger.debug('Scroll settled in %.3fs.', time.time() - start)
+                break
+            if time.time() - start > self.settle_timeout:
+                logger.debug('Scroll settle timeout. diff=%.2f', diff)
+                break
+            prev = img
+        self.frame = img
+        return img
+
+    def _expected_thumb_top(self, delta: int) -> int | None:
+        """把手拖动 `delta` 像素后，上边缘的 y 坐标。考虑轨道两端的限制。"""
+        if not self.thumb_position or not self.track_position or not self.track_height or not self.thumb_height:
+            return None
+        top = self.thumb_position[1] + delta
+        track_top = self.track_position[1]
+        return min(max(top, track_top), track_top + self.track_height - self.thumb_height)
+
+    def _drag(self, x: int, src_y: int, dst_x: int, dst_y: int):
+        """拖动滚动条，并在滚动停止后更新数据。"""
+        expected = self._expected_thumb_top(dst_y - src_y)
+        device.swipe(x, src_y, dst_x, dst_y, 0.3)
+        if self.auto_update:
+            self.update(self.wait_settle(expected))
+        else:
+            time.sleep(0.2)
+
+    def track_pixels(self, content_pixels: int, viewport_height: int) -> int:
+        """
+        将内容的滚动距离换算为滚动条上的拖动距离。
+
+        :param content_pixels: 内容需要滚动的距离，单位为像素。
+        :param viewport_height: 可视区域高度，单位为像素。
+        :return: 滚动条需要拖动的距离，单位为像素。
+        """
+        if not self.thumb_height:
+            self.update()
+        if not self.thumb_height:
+            raise ValueError('Unable to update scrollbar data.')
+        # 把手高度 / 轨道高度 = 可视高度 / 内容高度
+        return max(1, int(content_pixels * self.thumb_height / viewport_height))
+
+    def scan(
+        self,
+        scanner: Callable[[MatLike], T | None],
+        *,
+        step_pixels: int,
+        start: float | None = 0,
+        end: float = 1,
+        skip_current: bool = False
+    ) -> T | None:
+        """
+        逐页滚动并识别内容，直到 `scanner` 返回非 None 的结果。
+
+        滚动停止时的截图同时用于更新滚动数据与识别，通常每一页只截图一次（见 `wait_settle`）。
+        识别在后台线程中进行，与下一次滑动同时执行。
+        若在上一页找到结果时已经滑到了下一页，则先在当前页重新识别，
+        仍未找到时滚回上一页再识别一次，保证返回的结果与当前画面一致。
+
+        :param scanner: 识别函数。参数为截图，找到时返回结果，否则返回 None。
+            在后台线程中执行，不能操作设备。
+        :param step_pixels: 每次在滚动条上拖动的距离，单位为像素。
+        :param start: 起始位置，范围 [0, 1]。若为 None，表示使用当前位置。
+        :param end: 结束位置，范围 [0, 1]。
+        :param skip_current:
+            当前页（`self.frame`）是否已经由调用方识别过。为 True 时直接滚动到下一页。
+            仅在 `start` 为 None 时有效。
+        :return: `scanner` 的结果。若滚动到最后仍未找到，返回 None。
+        """
+        if not self.auto_update:
+            raise ValueError('scan() requires auto_update=True.')
+        if start is not None:
+            self.to(start)
+            skip_current = False
+        if self.frame is None:
+            self.update()
+            skip_current = False
+        assert self.frame is not None
+        if skip_current and (self.position >= end or not self._step(step_pixels)):
+            return None
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='kaa-scroll-scan') as executor:
+            while True:
+                frame = self.frame
+                future = executor.submit(scanner, frame)
+                if self.position >= end or not self._step(step_pixels):
+                    return future.result()
+                if (ret := future.result()) is None:
+                    continue
+                # 结果来自上一页，而画面已经滚动
+                logger.debug('Found on previous page. Rescanning current page.')
+                assert self.frame is not None
+                if (ret := scanner(self.frame)) is not None:
+                    return ret
+                logger.debug('Scrolling back to previous page.')
+                self._step(-step_pixels)
+                assert self.frame is not None
+                return scanner(self.frame)
+
+    def _step(self, pixels: int) -> bool:
+        """在滚动条上拖动指定像素，可以为负数。"""
+        if not self.thumb_height or not self.thumb_position:
+            logger.warning('Unable to update scrollbar data.')
+            return False
+        x, src_y = self.thumb_position
+        src_y += self.thumb_height // 2
+        logger.debug(f'Stepping by {pixels} px...')
+        self._drag(x, src_y, x, src_y + pixels)
+        return True
+
     @action('滚动.下一页', screenshot_mode='manual-inherit')
     def next(self, *, page: float) -> bool:
         """
@@ -269,12 +443,26 @@ class Scrollable:
             dst_y = src_y + int(self.track_height * percentage)
         else:
             raise ValueError('Either percentage or pixels must be provided.')
-        device.swipe(x, src_y, x, dst_y, 0.3)
-        time.sleep(0.2)
-        if self.auto_update:
-            self.update()
+        self._drag(x, src_y, x, dst_y)
         return True
     
+    @action('滚动.拖动把手到', screenshot_mode='manual-inherit')
+    def to_thumb(self, top: int) -> bool:
+        """
+        拖动滚动条把手，使其上边缘位于指定 y 坐标。
+
+        与 `to` 相比，可以精确还原之前记录的 `thumb_position`。
+
+        :param top: 把手上边缘的目标 y 坐标。
+        :return: 是否滚动成功。
+        """
+        if not self.thumb_height or not self.thumb_position:
+            self.update()
+        if not self.thumb_position:
+            logger.warning('Unable to update scrollbar data.')
+            return False
+        return self._step(top - self.thumb_position[1])
+
     @action('滚动.滚动到', screenshot_mode='manual-inherit')
     def to(self, position: float) -> bool:
         """
@@ -296,10 +484,7 @@ class Scrollable:
         tx, ty = self.thumb_position
         ty += self.thumb_height // 2
         target_y = y + int(self.track_height * position)
-        device.swipe(tx, ty, x, target_y, 0.3)
-        time.sleep(0.2)
-        if self.auto_update:
-            self.update()
+        self._drag(tx, ty, x, target_y)
         return True
     
     def __call__(self,
@@ -1,5 +1,6 @@
 import os
 import sys
+import json
 import logging
 import argparse
 import importlib.metadata
@@ -21,6 +22,7 @@ psr.add_argument('-lp', '--log-path', default=None, help='Path to the log file.
 psr.add_argument('-ll', '--log-level', default='DEBUG', help='Log level. Default: DEBUG')
 psr.add_argument('--kill-dmm', action='store_true', default=False, help='Kill DMM Game Player when tasks are completed. Overrides config().end_game.kill_dmm')
 psr.add_argument('--kill-game', action='store_true', default=False, help='Kill gakumasu.exe when tasks are completed. Overrides config().end_game.kill_game')
+psr.add_argument('--record-session', default=None, help='Record screenshots and inputs of the run into this directory for offline replay. Only available with "task invoke". Default: None')
 psr.add_argument('--start-immidiately', action='store_true', default=False, help='Start tasks immediately after launching the UI. Only available when no subcommand is specified.')
 
 # 子命令
@@ -42,6 +44,27 @@ remote_server_psr = subparsers.add_parser('remote-server', help='Start the remot
 remote_server_psr.add_argument('--host', default='0.0.0.0', help='Host to bind to')
 remote_server_psr.add_argument('--port', type=int, default=8000, help='Port to bind to')
 
+# bench 子命令
+bench_psr = subparsers.add_parser('bench', help='Benchmark commands')
+bench_subparsers = bench_psr.add_subparsers(dest='bench_command', required=True)
+
+# bench device 子命令
+bench_device_psr = bench_subparsers.add_parser('device', help='Benchmark screenshot and input latency of device implementations')
+bench_target = bench_device_psr.add_mutually_exclusive_group()
+bench_target.add_argument('--fake', action='store_true', default=False, help='Use a local fake ADB server serving frames from --frames. This is the default when no other target is given.')
+bench_target.add_argument('--serial', default=None, help='Serial of a real ADB device to benchmark')
+bench_target.add_argument('--from-config', action='store_true', default=False, help='Benchmark the device configured in the configuration file (any screenshot implementation)')
+bench_device_psr.add_argument('--impl', nargs='+', choices=['adb', 'adb_raw', 'uiautomator2'], default=['adb', 'adb_raw'], help='Implementations to benchmark. Default: adb adb_raw')
+bench_device_psr.add_argument('--adb-host', default='127.0.0.1', help='ADB server host. Default: 127.0.0.1')
+bench_device_psr.add_argument('--adb-port', type=int, default=5037, help='ADB server port. Default: 5037')
+bench_device_psr.add_argument('--frames', default='./screenshots', help='Directory of PNG screenshots served by the fake device. Default: ./screenshots')
+bench_device_psr.add_argument('--capture-delay', type=float, default=0, help='Extra screencap delay of the fake device in milliseconds. Default: 0')
+bench_device_psr.add_argument('--input-delay', type=float, default=0, help='Extra input delay of the fake device in milliseconds. Default: 0')
+bench_device_psr.add_argument('-n', '--samples', type=int, default=30, help='Screenshots per implementation. Default: 30')
+bench_device_psr.add_argument('--warmup', type=int, default=3, help='Warmup screenshots, not counted. Default: 3')
+bench_device_psr.add_argument('--clicks', type=int, default=10, help='Clicks per implementation. 0 to skip. Default: 10')
+bench_device_psr.add_argument('--json', default=None, help='Write results to this JSON file')
+
 _kaa: Kaa | None = None
 def kaa() -> Kaa:
     global _kaa
@@ -63,14 +86,19 @@ def task_invoke() -> int:
     kaa().set_log_level(log_level)
     if psr.parse_args().log_path is not None:
         kaa().add_file_logger(psr.parse_args().log_path)
+    if psr.parse_args().record_session is not None:
+        kaa().record_session_path = psr.parse_args().record_session
     # 执行任务
     print(tasks_args)
-    if '*' in tasks_args:
-        if len(tasks_args) > 1:
-            raise ValueError('Cannot specify other tasks when using wildcard.')
-        kaa().run_all()
-    else:
-        kaa().run(tasks_from_id(tasks_args))
+    try:
+        if '*' in tasks_args:
+            if len(tasks_args) > 1:
+                raise ValueError('Cannot specify other tasks when using wildcard.')
+            kaa().run_all()
+        else:
+            kaa().run(tasks_from_id(tasks_args))
+    finally:
+        kaa().stop_recording()
     if psr.parse_args().kill_dmm:
         os.system('taskkill /f /im DMMGamePlayer.exe')
     if psr.parse_args().kill_game:
@@ -104,6 +132,37 @@ def remote_server() -> int:
         print(f'Error starting remote server: {e}')
         return -1
 
+def bench_device() -> int:
+    from ..util.device_bench import (
+        bench_adb_device, bench_fake_device, format_results, load_frames, measure
+    )
+    args = psr.parse_args()
+    options = {'samples': args.samples, 'warmup': args.warmup, 'clicks': args.clicks}
+    if args.from_config:
+        impl_name = kaa().config_store.user(0).backend.screenshot_impl  # HACK: 硬编码
+        device = kaa()._on_create_device()
+        results = [measure(impl_name, device.screenshot_raw, device.click, **options)]
+    elif args.serial is not None:
+        results = bench_adb_device(args.impl, serial=args.serial, host=args.adb_host, port=args.adb_port, **options)
+    else:
+        try:
+            frames = load_frames(args.frames)
+        except FileNotFoundError as e:
+            print(e)
+            return -1
+        results = bench_fake_device(
+            args.impl,
+            frames,
+            capture_delay=args.capture_delay / 1000,
+            input_delay=args.input_delay / 1000,
+            **options
+        )
+    print(format_results(results))
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([r.to_dict() for r in results], f, ensure_ascii=False, indent=2)
+    return 0 if all(r.error is None for r in results) else 1
+
 def main():
     args = psr.parse_args()
     if args.subcommands == 'task':
@@ -113,6 +172,11 @@ def main():
             sys.exit(task_list())
         else:
             raise ValueError(f'Unknown task command: {args.task_command}')
+    elif args.subcommands == 'bench':
+        if args.bench_command == 'device':
+            sys.exit(bench_device())
+        else:
+            raise ValueError(f'Unknown bench command: {args.bench_command}')
     elif args.subcommands == 'remote-server':
         sys.exit(remote_server())
     elif args.subcommands is None:
@@ -1,30 +1,36 @@
-import io
 import os
 import sys
-from typing import Any, Literal, cast
-import zipfile
+from typing import TYPE_CHECKING, Any, Literal, cast
 import logging
 import traceback
 import importlib.metadata
 from datetime import datetime
 from typing_extensions import override
 
-import cv2
 
 from kaa.errors import WindowsOnlyError
 from kotonebot.util import is_windows
 from kotonebot.client.host.mumu12_host import MuMu12HostConfig
 
 from kotonebot.client.device import Device
+if TYPE_CHECKING:
+    from ..util.prefetch import ScreenshotPrefetcher
+    from ..util.session import SessionRecorder
 from kotonebot.ui import user
 from kotonebot import KotoneBot
 from ..util.paths import get_ahk_path
+from ..util.log_buffer import LogRingBuffer
+from ..util.log_queue import AsyncLogPipeline
+from ..util.log_files import RotatingLogHandler
+from ..util.report import ReportBuilder, ReportJob
+from ..util.flight_recorder import FlightRecorder
 from ..kaa_context import _set_instance
 if is_windows():
     from .dmm_host import DmmHost, DmmInstance
 else:
     DmmHost = DmmInstance = None
-from ..config import BaseConfig, upgrade_config
+from ..config import BaseConfig
+from ..config.store import ConfigChangeEvent, StoreContextConfig, config_store
 from kotonebot.config.base_config import UserConfig
 from kotonebot.client.host import (
     Mumu12Host, LeidianHost, Mumu12Instance,
@@ -41,14 +47,19 @@ format = '[%(asctime)s][%(levelname)s][%(name)s:%(lineno)d] %(message)s'
 log_formatter = logging.Formatter(format)
 logging.basicConfig(level=logging.INFO, format=format)
 
-log_stream = io.StringIO()
-memo_handler = logging.StreamHandler(log_stream)
-memo_handler.setFormatter(log_formatter)
-memo_handler.setLevel(logging.DEBUG)
+# 内存中保留最近的日志，用于错误报告。容量固定，长时间运行时内存占用不会增长
+log_buffer = LogRingBuffer(level=logging.DEBUG)
+log_buffer.setFormatter(log_formatter)
 
 root_logger = logging.getLogger()
 root_logger.setLevel(logging.INFO)
-root_logger.addHandler(memo_handler)
+root_logger.addHandler(log_buffer)
+# 格式化与写入都在单独的线程中进行，日志调用只是放入队列
+log_pipeline = AsyncLogPipeline()
+log_pipeline.install(root_logger)
+
+# 内存中保留最近的截图与操作，用于错误报告。见 `kaa.util.flight_recorder`
+flight_recorder = FlightRecorder()
 
 logging.getLogger("kotonebot").setLevel(logging.DEBUG)
 logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -61,25 +72,43 @@ class Kaa(KotoneBot):
     琴音小助手 kaa 主类。由其他 GUI/TUI 调用。
     """
     def __init__(self, config_path: str):
-        # 升级配置
-        upgrade_msg = upgrade_config()
+        # 加载（并在需要时升级）配置。之后 Context、UI 都读取这一份内存中的配置
+        self.config_store = config_store(config_path)
+        _ = self.config_store.root
         super().__init__(module='kaa.tasks', config_path=config_path, config_type=BaseConfig)
-        self.upgrade_msg = upgrade_msg
+        self.upgrade_msg = self.config_store.upgrade_msg
         self.version = importlib.metadata.version('ksaa')
+        self.prefetcher: 'ScreenshotPrefetcher | None' = None
+        self.record_session_path: str | None = None
+        """若设置，则在每次运行时把截图与输入录制到此目录。见 `kaa.util.session`。"""
+        self.session_recorder: 'SessionRecorder | None' = None
+        self.__device: Device | None = None
+        self.config_store.subscribe(self.__on_log_level_changed, 'options.misc.log_level')
+        self.config_store.subscribe(self.__on_prefetch_changed, 'options.misc.screenshot_prefetch')
+        self.config_store.subscribe(self.__on_flight_recorder_changed, 'options.misc.flight_recorder')
+        self.config_store.subscribe(self.__on_backend_changed, 'backend')
         logger.info('Version: %s', self.version)
         logger.info('Python Version: %s', sys.version)
         logger.info('Python Executable: %s', sys.executable)
 
+    @override
+    def initialize(self):
+        super().initialize()
+        # 在后台预热 OCR 与图像数据库，与模拟器、游戏启动并行
+        from .warmup import warmup
+        warmup.start()
+
     def add_file_logger(self, log_path: str):
         log_dir = os.path.abspath(os.path.dirname(log_path))
         os.makedirs(log_dir, exist_ok=True)
 
-        file_handler = logging.FileHandler(log_path, encoding='utf-8')
+        # 按大小与时间轮转，旧分段在后台压缩，日志目录总大小有上限
+        file_handler = RotatingLogHandler(log_path)
         file_handler.setFormatter(log_formatter)
-        root_logger.addHandler(file_handler)
+        log_pipeline.add_handler(file_handler)
 
     def set_log_level(self, level: int):
-        handlers = logging.getLogger().handlers
+        handlers = log_pipeline.handlers
         if len(handlers) == 0:
             print('Warning: No default handler found.')
         else:
@@ -93,51 +122,64 @@ class Kaa(KotoneBot):
         path: str | None = None
     ) -> str:
         """
-        保存错误报告
+        保存错误报告，等待保存完成。
 
         :param path: 保存的路径。若为 `None`，则保存到 `./reports/{YY-MM-DD HH-MM-SS}.zip`。
-        :return: 保存的路径
+        :return: 保存的路径。保存失败时为空字符串。
         """
-        from kotonebot import device
-        from kotonebot.backend.context import current_callstack
         try:
-            if path is None:
-                path = f'./reports/{datetime.now().strftime("%Y-%m-%d %H-%M-%S")}.zip'
-            exception_msg = '\n'.join(traceback.format_exception(exception))
-            task_callstack = '\n'.join(
-                [f'{i + 1}. name={task.name} priority={task.priority}' for i, task in enumerate(current_callstack)])
-            screenshot = device.screenshot()
-            logs = log_stream.getvalue()
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config_content = f.read()
-
-            if not os.path.exists(os.path.dirname(path)):
-                os.makedirs(os.path.dirname(path))
-            with zipfile.ZipFile(path, 'w') as zipf:
-                zipf.writestr('exception.txt', exception_msg)
-                zipf.writestr('task_callstack.txt', task_callstack)
-                zipf.writestr('screenshot.png', cv2.imencode('.png', screenshot)[1].tobytes())
-                zipf.writestr('config.json', config_content)
-                zipf.writestr('logs.txt', logs)
-            return path
+            return self.start_error_report(exception, path=path).wait()
         except Exception as e:
             logger.exception('Failed to save error report:')
             return ''
 
+    def start_error_report(
+        self,
+        exception: Exception,
+        *,
+        path: str | None = None
+    ) -> ReportJob[str]:
+        """
+        在后台线程中保存错误报告。
+
+        :param path: 保存的路径。若为 `None`，则保存到 `./reports/{YY-MM-DD HH-MM-SS}.zip`。
+        :return: 任务句柄。`wait()` 返回保存的路径。
+        """
+        from kotonebot import device
+        from kotonebot.backend.context import current_callstack
+        if path is None:
+            path = f'./reports/{datetime.now().strftime("%Y-%m-%d %H-%M-%S")}.zip'
+        # 异常与调用栈只能在当前线程中取得，其余内容在后台线程中生成
+        exception_msg = '\n'.join(traceback.format_exception(exception))
+        task_callstack = '\n'.join(
+            [f'{i + 1}. name={task.name} priority={task.priority}' for i, task in enumerate(current_callstack)])
+
+        def logs() -> str:
+            # 等待队列中的日志写入缓冲区
+            log_pipeline.flush()
+            return log_buffer.text()
+
+        builder = ReportBuilder()
+        builder.add_text('exception.txt', exception_msg)
+        builder.add_text('task_callstack.txt', task_callstack)
+        builder.add_image('screenshot.png', lambda: device.screenshot())
+        builder.add('flight', flight_recorder.snapshot().write, optional=True)
+        builder.add_file(self.config_path, 'config.json')
+        builder.add_text('logs.txt', logs)
+        return builder.start(path)
+
     @override
     def _on_init_context(self) -> None:
         """
         初始化 Context，从配置中读取 target_screenshot_interval。
         """
-        from kotonebot.config.manager import load_config
-        from kotonebot.backend.context import init_context
+        from kotonebot.backend.context import init_context, inject_context, config
 
-        # 加载配置以获取 target_screenshot_interval
-        config = load_config(self.config_path, type=self.config_type)
-        user_config = config.user_configs[0]  # HACK: 硬编码
+        user_config = self.config_store.user(0)  # HACK: 硬编码
         target_screenshot_interval = user_config.backend.target_screenshot_interval
 
         d = self._on_create_device()
+        self.__device = d
         init_context(
             config_path=self.config_path,
             config_type=self.config_type,
@@ -145,6 +187,8 @@ class Kaa(KotoneBot):
             target_screenshot_interval=target_screenshot_interval,
             force=True  # 强制重新初始化，用于配置热重载
         )
+        # 任务通过 conf() 读取共享的内存配置，UI 中保存的修改立即生效
+        inject_context(config=StoreContextConfig(config.context, self.config_store))
 
     @override
     def _on_after_init_context(self):
@@ -152,9 +196,88 @@ class Kaa(KotoneBot):
             raise ValueError('Backend instance is not set.')
         _set_instance(self.backend_instance)
         from kotonebot import device
+        from ..util.ocr import CachedContextOcr
+        # 启用 OCR 结果缓存
+        CachedContextOcr.install()
         logger.info('Set target resolution to 720x1280.')
         device.orientation = 'portrait'
         device.target_resolution = (720, 1280)
+        self.__setup_prefetch()
+        self.__setup_flight_recorder()
+        self.__setup_recorder()
+
+    def __setup_prefetch(self):
+        """
+        按配置启用截图预取。须在设置目标分辨率之后调用，
+        使预取的截图与同步截图经过相同的缩放。
+        """
+        from ..util.prefetch import ScreenshotPrefetcher
+
+        # 热重载时旧设备已被替换，先停止旧的预取线程
+        if self.prefetcher is not None:
+            self.prefetcher.uninstall()
+            self.prefetcher = None
+        options = self.config_store.options(0)  # HACK: 硬编码
+        if not options.misc.screenshot_prefetch or self.__device is None:
+            return
+        self.prefetcher = ScreenshotPrefetcher(self.__device)
+        self.prefetcher.install()
+
+    def __setup_flight_recorder(self):
+        """
+        按配置把飞行记录器接入当前设备。须在启用截图预取之后调用，
+        使记录到的是任务实际取走的帧。
+        """
+        flight_recorder.uninstall()
+        options = self.config_store.options(0)  # HACK: 硬编码
+        if not options.misc.flight_recorder or self.__device is None:
+            return
+        flight_recorder.install(self.__device)
+
+    def __setup_recorder(self):
+        """
+        按 `record_session_path` 开始录制会话。须在启用截图预取之后调用，
+        使录制到的是任务实际取走的帧。
+        """
+        from ..util.session import SessionRecorder
+
+        self.stop_recording()
+        if self.record_session_path is None or self.__device is None:
+            return
+        self.session_recorder = SessionRecorder(self.__device, self.record_session_path)
+        self.session_recorder.install()
+
+    def __on_log_level_changed(self, event: ConfigChangeEvent):
+        level_str = self.config_store.options(0).misc.log_level
+        logging.getLogger().setLevel(logging.DEBUG if level_str == 'verbose' else logging.INFO)
+        logger.info('Log level set to %s', level_str.upper())
+
+    def __on_prefetch_changed(self, event: ConfigChangeEvent):
+        # 尚未创建设备时，在下次运行初始化 Context 时按配置启用
+        if self.__device is not None:
+            if self.session_recorder is not None:
+                # 录制器须包装在预取之外，重新接入需要重新开始录制，会覆盖已录制的时间线
+                logger.info('Screenshot prefetch changed while recording a session. It will take effect on the next run.')
+                return
+            # 预取与飞行记录器都会包装设备方法，按原来的顺序重新接入
+            flight_recorder.uninstall()
+            self.__setup_prefetch()
+            self.__setup_flight_recorder()
+
+    def __on_flight_recorder_changed(self, event: ConfigChangeEvent):
+        if self.__device is not None:
+            self.__setup_flight_recorder()
+
+    def __on_backend_changed(self, event: ConfigChangeEvent):
+        # 设备只在每次运行开始时创建，后端配置的修改在下次运行时生效
+        if self.__device is not None:
+            logger.info('Backend config changed. It will take effect on the next run.')
+
+    def stop_recording(self):
+        """停止录制会话。"""
+        if self.session_recorder is not None:
+            self.session_recorder.close()
+            self.session_recorder = None
 
     def __get_backend_instance(self, config: UserConfig) -> Instance:
         """
@@ -245,11 +368,8 @@ class Kaa(KotoneBot):
         """
         创建设备。
         """
-        from kotonebot.config.manager import load_config
-
-        # 步骤1：加载配置
-        config = load_config(self.config_path, type=self.config_type)
-        user_config = config.user_configs[0]  # HACK: 硬编码
+        # 步骤1：读取配置
+        user_config = self.config_store.user(0)  # HACK: 硬编码
 
         # 步骤2：获取实例
         self.backend_instance = self.__get_backend_instance(user_config)
@@ -0,0 +1,119 @@
+"""启动预热。在模拟器启动、游戏加载的同时，提前完成 OCR、图像数据库等的冷启动。"""
+import time
+import logging
+import threading
+from typing import Callable
+
+import numpy as np
+
+from kotonebot.backend.core import Image
+
+logger = logging.getLogger(__name__)
+
+
+def _warmup_ocr(lang: str):
+    from kaa.util.ocr import ocr_engine
+    engine = ocr_engine(lang)  # type: ignore[arg-type]
+    # 检测与识别模型各跑一次推理，完成 ONNX Runtime 的首次初始化
+    dummy = np.full((64, 320, 3), 255, dtype=np.uint8)
+    dummy[24:40, 40:280] = 0
+    engine(dummy)
+    engine.text_rec([dummy])
+
+
+def _warmup_idols_db():
+    from kaa.game_ui.idols_overview import idols_db
+    idols_db()
+
+
+def _warmup_drinks_db():
+    from kaa.game_ui.drinks_overview import drinks_db
+    drinks_db()
+
+
+def _warmup_templates():
+    from kaa.tasks import R
+    # 培育中最常用的几组模板
+    groups = [R.Common, R.InPurodyuusu, R.Produce]
+    count = 0
+    for group in groups:
+        for value in vars(group).values():
+            if isinstance(value, Image) and value.path is not None:
+                _ = value.data
+                count += 1
+    logger.debug('%d templates decoded.', count)
+    # 交流、演出跳过按钮每次轮询都会用到白色过滤后的模板
+    from kaa.game_ui.common import WhiteFilter, prefiltered_templates
+    for template in (R.Common.ButtonCommuSkip, R.Common.ButtonCommuFastforward, R.Produce.ButtonSkipLive):
+        prefiltered_templates.get(template, WhiteFilter())
+
+
+class Warmup:
+    """
+    在后台线程中执行预热步骤。
+
+    每个步骤相互独立，某一步失败只记录日志，不影响其他步骤，
+    也不影响之后任务的正常执行（任务中会按需重新加载）。
+    """
+
+    def __init__(self):
+        self.steps: list[tuple[str, Callable[[], None]]] = [
+            ('ocr.jp', lambda: _warmup_ocr('jp')),
+            ('ocr.en', lambda: _warmup_ocr('en')),
+            ('idols_db', _warmup_idols_db),
+            ('drinks_db', _warmup_drinks_db),
+            ('templates', _warmup_templates),
+        ]
+        self.timings: dict[str, float] = {}
+        """各步骤耗时，单位秒。"""
+        self.errors: dict[str, Exception] = {}
+        """失败的步骤及其异常。"""
+        self.__thread: threading.Thread | None = None
+        self.__done = threading.Event()
+
+    @property
+    def started(self) -> bool:
+        return self.__thread is not None
+
+    @property
+    def done(self) -> bool:
+        return self.__done.is_set()
+
+    def start(self):
+        """开始预热。重复调用不会重复执行。"""
+        if self.__thread is not None:
+            return
+        self.__thread = threading.Thread(target=self.__run, name='kaa-warmup', daemon=True)
+        self.__thread.start()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        等待预热完成。
+
+        :param timeout: 超时时间，单位秒。为 None 时一直等待。
+        :return: 是否已完成。
+        """
+        return self.__done.wait(timeout)
+
+    def __run(self):
+        logger.info('Warmup started.')
+        total_start = time.perf_counter()
+        for name, func in self.steps:
+            start = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                self.errors[name] = e
+                logger.warning('Warmup step "%s" failed: %s', name, e)
+                continue
+            self.timings[name] = time.perf_counter() - start
+        total = time.perf_counter() - total_start
+        self.__done.set()
+        logger.info(
+            'Warmup finished in %.2fs. %s',
+            total,
+            ', '.join(f'{name}={t:.2f}s' for name, t in self.timings.items())
+        )
+
+
+warmup = Warmup()
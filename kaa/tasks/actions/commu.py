@@ -7,6 +7,7 @@ from kaa.tasks import R
 from kaa.game_ui import dialog
 from kotonebot.util import Countdown
 from kaa.game_ui import WhiteFilter
+from kaa.game_ui.common import find_prefiltered
 from kotonebot import device, image, user, action, use_screenshot
 
 logger = logging.getLogger(__name__)
@@ -14,26 +15,12 @@ logger = logging.getLogger(__name__)
 @action('获取 SKIP 按钮', screenshot_mode='manual-inherit')
 def skip_button():
     device.screenshot()
-    return image.find(
-        R.Common.ButtonCommuSkip,
-        threshold=0.6,
-    ) or image.find(
-        R.Common.ButtonCommuSkip,
-        threshold=0.6,
-        preprocessors=[WhiteFilter()]
-    )
+    return find_prefiltered(R.Common.ButtonCommuSkip, WhiteFilter(), threshold=0.6)
 
 @action('获取 FASTFORWARD 按钮', screenshot_mode='manual-inherit')
 def fastforward_button():
     device.screenshot()
-    return image.find(
-        R.Common.ButtonCommuFastforward,
-        threshold=0.6,
-    ) or image.find(
-        R.Common.ButtonCommuFastforward,
-        threshold=0.6,
-        preprocessors=[WhiteFilter()]
-    )
+    return find_prefiltered(R.Common.ButtonCommuFastforward, WhiteFilter(), threshold=0.6)
 
 @action('检查是否处于交流')
 def is_at_commu():
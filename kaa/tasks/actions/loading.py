@@ -1,54 +1,75 @@
 import time
 from logging import getLogger
 
-import cv2
 import numpy as np
+from cv2.typing import MatLike
 
-from kotonebot import image, device, action, sleep
+from kotonebot import image, device, action, use_screenshot, Loop
 from kotonebot.backend.debug import result
 from kaa.tasks import R
 
 logger = getLogger(__name__)
 
+LOADING_SAMPLE_STRIDE = 4
+"""检测加载画面时的采样步长。每隔多少个像素取一个点。"""
+
+def is_loading_frame(img: MatLike, *, stride: int = LOADING_SAMPLE_STRIDE) -> bool:
+    """
+    判断给定画面是否为加载画面。
+
+    加载画面上方 35% 区域在二值化后只有不超过两种颜色。
+    这里对该区域做步长为 `stride` 的降采样，把每个像素三个通道的二值化结果
+    打包成 3 bit 的调色板编号，再用 bincount 统计出现的颜色数量。
+
+    :param img: BGR 格式的截图。
+    :param stride: 采样步长。
+    """
+    roi = img[:int(img.shape[0] * 0.35):stride, ::stride]
+    bits = roi > 127
+    palette = bits[..., 0] | (bits[..., 1] << 1) | (bits[..., 2] << 2)
+    counts = np.bincount(palette.ravel(), minlength=8)
+    return np.count_nonzero(counts) <= 2
+
 @action('检测加载页面', screenshot_mode='manual')
-def loading() -> bool:
-    """检测是否在场景加载页面"""
-    img = device.screenshot()
-    original_img = img.copy()
-    # 二值化图片
-    _, img = cv2.threshold(img, 127, 255, cv2.THRESH_BINARY)
-    # 裁剪上面 35%
-    img = img[:int(img.shape[0] * 0.35), :]
-    # 判断图片中颜色数量是否 <= 2
-    # https://stackoverflow.com/questions/56606294/count-number-of-unique-colours-in-image
-    b,g,r = cv2.split(img)
-    shiftet_im = b.astype(np.int64) + 1000 * (g.astype(np.int64) + 1) + 1000 * 1000 * (r.astype(np.int64) + 1)
-    ret = len(np.unique(shiftet_im)) <= 2
-    result('tasks.actions.loading', [img, original_img], f'result={ret}')
+def loading(img: MatLike | None = None) -> bool:
+    """
+    检测是否在场景加载页面
+
+    :param img: 截图。若为 None，则重新截图。
+    """
+    img = use_screenshot(img)
+    ret = is_loading_frame(img)
+    result('tasks.actions.loading', [img], f'result={ret}')
     return ret
 
-@action('等待加载开始')
+@action('等待加载开始', screenshot_mode='manual')
 def wait_loading_start(timeout: float = 60):
     """等待加载开始"""
     start_time = time.time()
-    while not loading():
+    # 以设备实际的截图速度轮询，不额外等待
+    for l in Loop(interval=0):
+        assert l.screenshot is not None
+        if loading(l.screenshot):
+            break
         if time.time() - start_time > timeout:
             raise TimeoutError('加载超时')
         logger.debug('Not loading...')
-        sleep(1)
 
-@action('等待加载结束')
+@action('等待加载结束', screenshot_mode='manual')
 def wait_loading_end(timeout: float = 60):
     """等待加载结束"""
     start_time = time.time()
-    while loading():
+    # 以设备实际的截图速度轮询，不额外等待
+    for l in Loop(interval=0):
+        assert l.screenshot is not None
+        if not loading(l.screenshot):
+            break
         if time.time() - start_time > timeout:
             raise TimeoutError('加载超时')
         # 检查网络错误
         if image.find(R.Common.TextNetworkError):
             device.click(image.expect(R.Common.ButtonRetry))
         logger.debug('Loading...')
-        sleep(1)
 
 if __name__ == '__main__':
     print(loading())
@@ -1,8 +1,9 @@
 import logging
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from kotonebot import task
+from kaa.util.log_files import log_index
 
 logger = logging.getLogger(__name__)
 
@@ -13,18 +14,11 @@ def clear_logs():
     if not log_dir.exists():
         return
     
-    now = datetime.now()
-    cutoff_date = now - timedelta(days=7)
-    
     logger.info('Clearing logs...')
-    for file in log_dir.glob('*.log'):
-        try:
-            mtime = datetime.fromtimestamp(file.stat().st_mtime)
-            if mtime < cutoff_date:
-                file.unlink()
-                logger.info(f'Removed file {file}.')
-        except Exception as e:
-            logger.error(f'Failed to remove {file}: {e}.')
+    # 根据分段索引中的时间删除，不必遍历目录
+    removed = log_index(str(log_dir)).prune(max_age=timedelta(days=7).total_seconds())
+    for segment in removed:
+        logger.info(f'Removed file {segment.file}.')
     logger.info('Clearing logs done.')
 
 if __name__ == '__main__':
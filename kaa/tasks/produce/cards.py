@@ -13,6 +13,7 @@ from kaa.config import conf
 from kaa.game_ui import dialog
 from kaa.tasks.produce.common import acquisition_date_change_dialog
 from kaa.util.trace import trace
+from kaa.util.frame import Frame
 from kotonebot.primitives import RectTuple, Rect
 from kotonebot import action, Interval, Countdown, device, image, sleep, ocr, contains, use_screenshot, color
 from kotonebot.backend.loop import Loop
@@ -375,19 +376,18 @@ def detect_recommended_card(
     cards.append(SKIP_CARD_BUTTON)
 
     img = use_screenshot(img)
-    original_image = img.copy()
+    frame = Frame.of(img)
     results: list[CardDetectResult] = []
     for x, y, w, h, return_value in cards:
         outer = (max(0, x - GLOW_EXTENSION), max(0, y - GLOW_EXTENSION))
-        # 裁剪出检测区域
-        glow_area = img[outer[1]:y + h + GLOW_EXTENSION, outer[0]:x + w + GLOW_EXTENSION]
-        area_h = glow_area.shape[0]
-        area_w = glow_area.shape[1]
-        glow_area[GLOW_EXTENSION:area_h-GLOW_EXTENSION, GLOW_EXTENSION:area_w-GLOW_EXTENSION] = 0
-
-        # 过滤出目标黄色
-        glow_area = cv2.cvtColor(glow_area, cv2.COLOR_BGR2HSV)
+        # 检测区域
+        area_w = min(img.shape[1], x + w + GLOW_EXTENSION) - outer[0]
+        area_h = min(img.shape[0], y + h + GLOW_EXTENSION) - outer[1]
+        glow_area = frame.hsv(Rect(outer[0], outer[1], area_w, area_h))
+
+        # 过滤出目标黄色，并去掉卡片本身
         yellow_mask = cv2.inRange(glow_area, YELLOW_LOWER, YELLOW_UPPER)
+        yellow_mask[GLOW_EXTENSION:area_h-GLOW_EXTENSION, GLOW_EXTENSION:area_w-GLOW_EXTENSION] = 0
         
         # 分割出每一边
         left_border = yellow_mask[:, 0:GLOW_EXTENSION]
@@ -413,7 +413,6 @@ def detect_recommended_card(
             bottom_score,
             Rect(x, y, w, h)
         ))
-        img = original_image.copy()
     #     cv2.imshow(f"card detect {return_value}", cv2.cvtColor(glow_area, cv2.COLOR_HSV2BGR))
     #     cv2.namedWindow(f"card detect {return_value}", cv2.WINDOW_NORMAL)
     #     cv2.moveWindow(f"card detect {return_value}", 100 + (return_value % 3) * 300, 100 + (return_value // 3) * 300)
@@ -442,8 +441,9 @@ def detect_recommended_card(
     # 跟踪检测结果
     if conf().trace.recommend_card_detection:
         x, y, w, h = filtered_results[0].rect.xywh
-        cv2.rectangle(original_image, (x, y), (x+w, y+h), (0, 0, 255), 3)
-        trace('rec-card', original_image, {
+        trace_image = img.copy()
+        cv2.rectangle(trace_image, (x, y), (x+w, y+h), (0, 0, 255), 3)
+        trace('rec-card', trace_image, {
             'card_count': card_count,
             'type': filtered_results[0].type,
             'score': filtered_results[0].score,
@@ -24,6 +24,7 @@ from kaa.tasks import R
 from kaa.config import conf
 from .p_drink import acquire_p_drink
 from kaa.tasks.actions.loading import loading
+from kaa.util.ocr import ocr_batch
 from kaa.config.schema import produce_solution
 from kaa.tasks.start_game import wait_for_home
 from kaa.tasks.actions.commu import handle_unread_commu
@@ -193,25 +194,26 @@ def resume_produce_pre() -> tuple[Literal['regular', 'pro', 'master'], int]:
     retry_count = 0
     max_retries = 5
     current_week = None
+    img = device.screenshot()
     while retry_count < max_retries:
-        week_text = ocr.ocr(R.Produce.BoxResumeDialogWeeks, lang='en').squash().regex(r'\d+/\d+')
-        if week_text:
-            weeks = week_text[0].split('/')
-            logger.info(f'Current week: {weeks[0]}/{weeks[1]}')
-            if len(weeks) >= 2:
-                current_week = int(weeks[0])
-                break
-        week_text2 = ocr.ocr(R.Produce.BoxResumeDialogWeeks_Saving, lang='en').squash().regex(r'\d+/\d+')
-        if week_text2:
-            weeks = week_text2[0].split('/')
-            logger.info(f'Current week: {weeks[0]}/{weeks[1]}')
-            if len(weeks) >= 2:
-                current_week = int(weeks[0])
-                break
+        # 普通状态与保存中状态的周数位置不同，两处一起识别
+        week_texts = [
+            r.squash().regex(r'\d+/\d+')
+            for r in ocr_batch(img, [R.Produce.BoxResumeDialogWeeks, R.Produce.BoxResumeDialogWeeks_Saving], lang='en')
+        ]
+        for week_text in week_texts:
+            if week_text:
+                weeks = week_text[0].split('/')
+                logger.info(f'Current week: {weeks[0]}/{weeks[1]}')
+                if len(weeks) >= 2:
+                    current_week = int(weeks[0])
+                    break
+        if current_week is not None:
+            break
         retry_count += 1
-        logger.warning(f'Failed to detect weeks. week_text="{week_text}". Retrying... ({retry_count}/{max_retries})')
+        logger.warning(f'Failed to detect weeks. week_text="{week_texts}". Retrying... ({retry_count}/{max_retries})')
         sleep(0.5)
-        device.screenshot()
+        img = device.screenshot()
     
     if retry_count >= max_retries:
         raise ValueError('Failed to detect weeks after multiple retries.')
@@ -279,7 +281,7 @@ class ProduceInterrupt:
     @staticmethod
     def _check_loading(img: MatLike) -> AcquisitionType | None:
         """检查加载画面"""
-        if loading():
+        if loading(img):
             logger.info("Loading...")
             return "Loading"
         return None
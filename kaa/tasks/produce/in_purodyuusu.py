@@ -8,6 +8,7 @@ from kaa.tasks import R
 from kaa.tasks.common import skip
 from ..actions import loading
 from kaa.game_ui import WhiteFilter, dialog
+from kaa.game_ui.common import find_prefiltered
 from ..actions.scenes import at_home
 from .cards import do_cards, CardDetectResult
 from ..actions.commu import handle_unread_commu
@@ -337,7 +338,7 @@ def produce_end(has_live: bool = True):
                     logger.info("Skipping unread commu")
                 # 跳过演出
                 # [kotonebot-resource\sprites\jp\produce\screenshot_produce_end.png]
-                elif image.find(R.Produce.ButtonSkipLive, preprocessors=[WhiteFilter()]):
+                elif find_prefiltered(R.Produce.ButtonSkipLive, WhiteFilter(), raw_first=False):
                     logger.info("Skipping live.")
                     device.click()
                 # [kotonebot-resource\sprites\jp\produce\screenshot_produce_end_skip.png]
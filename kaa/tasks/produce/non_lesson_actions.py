@@ -87,7 +87,7 @@ def enter_study():
         logger.info("授業 type: Normal.")
         # 获取三个选项的内容
         ui = CommuEventButtonUI()
-        buttons = ui.all()
+        buttons = ui.all(cached=True)
         if not buttons:
             raise UnrecoverableError("Failed to find any buttons.")
         # 选中 +30 的选项
@@ -268,7 +268,7 @@ def enter_outing():
     # TODO: 可能需要二次处理外出事件
     # [kotonebot-resource\sprites\jp\in_purodyuusu\screenshot_outing.png]
     ui = CommuEventButtonUI()
-    buttons = ui.all()
+    buttons = ui.all(cached=True)
     if not buttons:
         raise UnrecoverableError("Failed to find any buttons.")
     target_btn = buttons[min(1, len(buttons) - 1)]
@@ -2,7 +2,7 @@ import logging
 from typing import Optional, Literal
 from typing_extensions import assert_never
 
-from kaa.config.schema import produce_solution
+from kaa.config.schema import produce_solution, produce_solution_frozen
 from kaa.tasks.produce.common import resume_produce_pre
 from kotonebot.ui import user
 from kaa.tasks import R
@@ -396,7 +396,9 @@ def produce():
         user.warning('配置有误', '未设置要培育的偶像。将跳过本次培育。')
         return
 
-    for i in range(count):
+    i = 0
+    # 每次培育前重新读取次数，运行中修改的培育次数立即生效
+    while i < (count := conf().produce.produce_count):
         start_time = time.time()
         if produce_solution().data.auto_set_memory:
             memory_set_to_use = None
@@ -410,12 +412,16 @@ def produce():
             f'Produce start with: '
             f'idol: {idol}, mode: {mode}, memory_set: #{memory_set_to_use}, support_card_set: #{support_card_set_to_use}'
         )
-        if not do_produce(idol, mode, memory_set_to_use):
+        # 培育过程中方案保持不变，出牌等循环中读取方案不访问磁盘
+        with produce_solution_frozen():
+            finished = do_produce(idol, mode, memory_set_to_use)
+        if not finished:
             user.info('AP 不足', f'由于 AP 不足，跳过了 {count - i} 次培育。')
             logger.info('%d produce(s) skipped because of insufficient AP.', count - i)
             break
         end_time = time.time()
         logger.info(f"Produce time used: {format_time(end_time - start_time)}")
+        i += 1
 
 if __name__ == '__main__':
     import logging
@@ -429,10 +435,15 @@ if __name__ == '__main__':
     conf().produce.enabled = True
     conf().produce.produce_count = 1
     conf().produce.enable_fever_month = 'ignore'
-    produce_solution().data.mode = 'pro'
-    # produce_solution().data.idol = 'i_card-skin-hski-3-002'
-    produce_solution().data.memory_set = 1
-    produce_solution().data.auto_set_memory = False
+    # produce_solution() 返回只读快照，需要通过方案管理器修改并保存当前方案
+    from kaa.config.produce import ProduceSolutionManager
+    manager = ProduceSolutionManager()
+    solution = manager.read(produce_solution().id)
+    solution.data.mode = 'pro'
+    # solution.data.idol = 'i_card-skin-hski-3-002'
+    solution.data.memory_set = 1
+    solution.data.auto_set_memory = False
+    manager.save(solution.id, solution)
     # do_produce(PIdol.月村手毬_初声, 'pro', 5)
     produce()
     # a()
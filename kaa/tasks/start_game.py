@@ -104,7 +104,7 @@ def wait_for_home():
     logger.info('Entering home...')
     click_cd = Countdown(1).start()
     should_click = False
-    for _ in Loop():
+    for l in Loop():
         logger.info('尝试进入/返回主页中...')
         # 首页
         if image.find(R.Daily.ButtonHomeCurrent):
@@ -113,7 +113,7 @@ def wait_for_home():
         # [screenshots/startup/1.png]
         elif image.find(R.Daily.ButonLinkData):
             should_click = True
-        elif loading():
+        elif loading(l.screenshot):
             pass
         # 热更新
         # [screenshots/startup/update.png]
@@ -0,0 +1,574 @@
+"""
+设备基准测试。`kaa bench device` 子命令的实现。
+
+测量各截图实现的截图延迟分位数、吞吐量、点击往返耗时与解码耗时。
+既可以连接真实设备，也可以连接本地模拟的 ADB 服务器 `FakeAdbServer`，
+后者从 `screenshots/` 中读取截图作为画面，不需要模拟器即可复现测试结果。
+"""
+import io
+import os
+import re
+import time
+import socket
+import struct
+import logging
+import threading
+import socketserver
+from glob import glob
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Literal
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+logger = logging.getLogger(__name__)
+
+FAKE_SERIAL = 'kaa-bench-fake'
+"""模拟设备的序列号。"""
+FAKE_ADB_VERSION = 41
+"""模拟 ADB 服务器的协议版本。与 adbutils 自带的 adb 一致，避免 adb 重启服务器。"""
+FAKE_API_LEVEL = 30
+"""模拟设备的 Android API Level。"""
+
+AdbImplName = Literal['adb', 'adb_raw', 'uiautomator2']
+ADB_IMPLS: tuple[AdbImplName, ...] = ('adb', 'adb_raw', 'uiautomator2')
+"""可以通过 ADB 连接直接创建的截图实现。"""
+
+
+def load_frames(path: str, limit: int = 16) -> list[MatLike]:
+    """
+    读取目录（含子目录）下的 PNG 截图，作为模拟设备的画面。
+
+    :param path: 截图目录。
+    :param limit: 最多读取的张数。
+    """
+    files = sorted(glob(os.path.join(path, '**', '*.png'), recursive=True))
+    frames = []
+    for file in files:
+        img = cv2.imread(file)
+        if img is None:
+            continue
+        frames.append(img)
+        if len(frames) >= limit:
+            break
+    if not frames:
+        raise FileNotFoundError(f'No PNG screenshots found in "{path}".')
+    return frames
+
+
+class _FrameSource:
+    """按顺序循环提供截图，并缓存各格式的编码结果。"""
+
+    def __init__(self, frames: list[MatLike]):
+        self.frames = frames
+        self.__index = 0
+        self.__png: dict[int, bytes] = {}
+        self.__raw: dict[int, bytes] = {}
+        self.__lock = threading.Lock()
+
+    def __next(self) -> int:
+        with self.__lock:
+            i = self.__index
+            self.__index = (i + 1) % len(self.frames)
+            return i
+
+    def png(self) -> bytes:
+        i = self.__next()
+        if i not in self.__png:
+            self.__png[i] = cv2.imencode('.png', self.frames[i])[1].tobytes()
+        return self.__png[i]
+
+    def raw(self) -> bytes:
+        """`screencap` 不带 `-p` 时的输出：16 字节头部 + RGBA 数据。"""
+        i = self.__next()
+        if i not in self.__raw:
+            img = self.frames[i]
+            h, w = img.shape[:2]
+            rgba = cv2.cvtColor(img, cv2.COLOR_BGR2RGBA)
+            # width, height, pixel_format=RGBA_8888, color_space
+            self.__raw[i] = struct.pack('<IIII', w, h, 1, 0) + rgba.tobytes()
+        return self.__raw[i]
+
+
+class FakeAdbServer:
+    """
+    本地模拟的 ADB 服务器。
+
+    实现了 ADB 客户端与服务器之间协议（smart socket）中，
+    kaa 的 `adb` 与 `adb_raw` 截图实现会用到的部分：
+
+    * `host:version`、`host:devices`、`host:tport:serial:*` 等主机请求
+    * `shell:` 与 `exec:` 服务中的 `screencap`、`input`、`wm size`、`getprop` 等命令
+    * `sync:` 服务中的 `STAT` 与 `SEND`（用于 `adb_raw` 推送截图脚本）
+
+    设备端命令的耗时可以通过 `capture_delay` 与 `input_delay` 模拟。
+
+    例：
+    ```python
+    with FakeAdbServer(load_frames('screenshots')) as server:
+        d = AdbClient(port=server.port).device(FAKE_SERIAL)
+        d.screenshot()
+    ```
+    """
+
+    def __init__(
+        self,
+        frames: list[MatLike],
+        *,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        capture_delay: float = 0,
+        input_delay: float = 0,
+    ):
+        """
+        :param frames: 模拟设备的画面，BGR 格式。按顺序循环返回。
+        :param host: 监听地址。
+        :param port: 监听端口。为 0 时由系统分配。
+        :param capture_delay: 每次截图额外等待的时间，单位秒。
+        :param input_delay: 每次点击/滑动额外等待的时间，单位秒。
+        """
+        h, w = frames[0].shape[:2]
+        self.screen_size = (w, h)
+        self.capture_delay = capture_delay
+        self.input_delay = input_delay
+        self.inputs = 0
+        """收到的点击/滑动命令数。"""
+        self.files: dict[str, bytes] = {}
+        """通过 `sync:` 推送到模拟设备上的文件。"""
+        self.__source = _FrameSource(frames)
+        self.__server = _ThreadingTCPServer((host, port), _AdbRequestHandler)
+        self.__server.fake = self  # type: ignore[attr-defined]
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def host(self) -> str:
+        return self.__server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.__server.server_address[1]
+
+    def start(self) -> 'FakeAdbServer':
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever,
+            name='kaa-fake-adb',
+            daemon=True
+        )
+        self.__thread.start()
+        logger.info('Fake ADB server listening on %s:%d', self.host, self.port)
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __enter__(self) -> 'FakeAdbServer':
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def execute(self, cmd: str, conn: socket.socket):
+        """执行设备端命令，并把输出写入连接。"""
+        cmd = cmd.strip()
+        if cmd == 'screencap -p':
+            time.sleep(self.capture_delay)
+            conn.sendall(self.__source.png())
+        elif cmd == 'screencap':
+            time.sleep(self.capture_delay)
+            conn.sendall(self.__source.raw())
+        elif cmd.startswith('input '):
+            time.sleep(self.input_delay)
+            self.inputs += 1
+        elif cmd == 'wm size':
+            w, h = self.screen_size
+            conn.sendall(f'Physical size: {w}x{h}\n'.encode())
+        elif cmd == 'getprop ro.build.version.sdk':
+            conn.sendall(f'{FAKE_API_LEVEL}\n'.encode())
+        elif cmd.startswith('sh ') and cmd[3:].strip() in self.files:
+            self.__run_script(cmd[3:].strip(), conn)
+        elif cmd.startswith(('chmod ', 'rm ')):
+            pass
+        else:
+            conn.sendall(f'/system/bin/sh: {cmd.split(" ")[0]}: not supported by fake device\n'.encode())
+
+    def __run_script(self, path: str, conn: socket.socket):
+        # 只支持 adb_raw 推送的「循环 screencap + sleep」脚本
+        script = self.files[path].decode('utf-8', errors='replace')
+        if 'screencap' not in script:
+            return
+        match = re.search(r'sleep\s+([\d.]+)', script)
+        interval = float(match.group(1)) if match else 0
+        while True:
+            time.sleep(self.capture_delay)
+            try:
+                conn.sendall(self.__source.raw())
+            except OSError:
+                # 客户端断开
+                return
+            time.sleep(interval)
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _AdbRequestHandler(socketserver.BaseRequestHandler):
+    request: socket.socket
+
+    @property
+    def fake(self) -> FakeAdbServer:
+        return self.server.fake  # type: ignore[attr-defined]
+
+    def handle(self):
+        try:
+            while True:
+                req = self.__read_request()
+                if req is None:
+                    return
+                if not self.__dispatch(req):
+                    return
+        except (ConnectionError, OSError):
+            pass
+
+    def __dispatch(self, req: str) -> bool:
+        """处理一条请求。返回是否继续在此连接上读取请求。"""
+        if req == 'host:version':
+            self.__okay(self.__block(f'{FAKE_ADB_VERSION:04x}'))
+            return False
+        if req in ('host:devices', 'host:devices-l'):
+            self.__okay(self.__block(f'{FAKE_SERIAL}\tdevice\n'))
+            return False
+        if req == 'host:features' or req.endswith(':features'):
+            self.__okay(self.__block(''))
+            return False
+        if req.startswith('host-serial:') and req.endswith(':get-state'):
+            self.__okay(self.__block('device'))
+            return False
+        if req.startswith('host:tport:'):
+            # 之后的请求发往设备。tport 额外返回 8 字节的 transport id
+            self.__okay(struct.pack('<Q', 1))
+            return True
+        if req.startswith(('host:transport:', 'host:transport-id:', 'host:transport-any')):
+            self.__okay()
+            return True
+        if req == 'sync:':
+            self.__okay()
+            self.__sync()
+            return False
+        if req.startswith(('shell:', 'exec:')):
+            self.__okay()
+            self.fake.execute(req.split(':', 1)[1], self.request)
+            return False
+        self.__fail(f'unsupported service: {req}')
+        return False
+
+    def __sync(self):
+        while True:
+            header = self.__read_exact(8)
+            if header is None:
+                return
+            sync_id, length = header[:4], struct.unpack('<I', header[4:])[0]
+            if sync_id == b'QUIT':
+                return
+            path = (self.__read_exact(length) or b'').decode('utf-8')
+            if sync_id == b'STAT':
+                data = self.fake.files.get(path)
+                if data is None:
+                    self.request.sendall(b'STAT' + struct.pack('<III', 0, 0, 0))
+                else:
+                    self.request.sendall(b'STAT' + struct.pack('<III', 0o100755, len(data), int(time.time())))
+            elif sync_id == b'SEND':
+                path = path.rsplit(',', 1)[0]
+                content = b''
+                while True:
+                    chunk_header = self.__read_exact(8)
+                    if chunk_header is None:
+                        return
+                    chunk_id, chunk_len = chunk_header[:4], struct.unpack('<I', chunk_header[4:])[0]
+                    if chunk_id == b'DONE':
+                        break
+                    content += self.__read_exact(chunk_len) or b''
+                self.fake.files[path] = content
+                self.request.sendall(b'OKAY' + struct.pack('<I', 0))
+            else:
+                message = f'unsupported sync request: {sync_id!r}'.encode()
+                self.request.sendall(b'FAIL' + struct.pack('<I', len(message)) + message)
+                return
+
+    def __read_request(self) -> str | None:
+        length = self.__read_exact(4)
+        if length is None:
+            return None
+        data = self.__read_exact(int(length, 16))
+        return None if data is None else data.decode('utf-8')
+
+    def __read_exact(self, n: int) -> bytes | None:
+        buf = b''
+        while len(buf) < n:
+            chunk = self.request.recv(n - len(buf))
+            if not chunk:
+                return None
+            buf += chunk
+        return buf
+
+    @staticmethod
+    def __block(text: str) -> bytes:
+        data = text.encode('utf-8')
+        return f'{len(data):04x}'.encode() + data
+
+    def __okay(self, payload: bytes = b''):
+        self.request.sendall(b'OKAY' + payload)
+
+    def __fail(self, message: str):
+        self.request.sendall(b'FAIL' + self.__block(message))
+
+
+# ---------- 解码耗时 ----------
+
+def _decode_png_pil(img: MatLike) -> Callable[[], Any]:
+    from PIL import Image
+    payload = cv2.imencode('.png', img)[1].tobytes()
+    # 与 AdbImpl.screenshot 的解码流程一致
+    return lambda: cv2.cvtColor(np.array(Image.open(io.BytesIO(payload)).convert('RGB')), cv2.COLOR_RGB2BGR)
+
+
+def _decode_rgba(img: MatLike) -> Callable[[], Any]:
+    h, w = img.shape[:2]
+    payload = cv2.cvtColor(img, cv2.COLOR_BGR2RGBA).tobytes()
+    # 与 AdbRawImpl 的解码流程一致
+    return lambda: cv2.cvtColor(np.frombuffer(payload, np.uint8).reshape(h, w, 4), cv2.COLOR_RGBA2BGR)
+
+
+def _decode_jpeg(img: MatLike) -> Callable[[], Any]:
+    payload = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 80])[1]
+    return lambda: cv2.imdecode(payload, cv2.IMREAD_COLOR)
+
+
+def _decode_flipped_rgba(img: MatLike) -> Callable[[], Any]:
+    h, w = img.shape[:2]
+    payload = cv2.flip(cv2.cvtColor(img, cv2.COLOR_BGR2RGBA), 0).tobytes()
+    return lambda: cv2.flip(cv2.cvtColor(np.frombuffer(payload, np.uint8).reshape(h, w, 4), cv2.COLOR_RGBA2BGR), 0)
+
+
+DECODERS: dict[str, Callable[[MatLike], Callable[[], Any]]] = {
+    'adb': _decode_png_pil,
+    'adb_raw': _decode_rgba,
+    'uiautomator2': _decode_jpeg,
+    'nemu_ipc': _decode_flipped_rgba,
+}
+"""
+各截图实现在客户端的解码过程。参数为一帧截图，返回对该帧编码数据执行一次解码的函数。
+uiautomator2 与 nemu_ipc 的传输格式分别按 JPEG 与上下翻转的 RGBA 近似。
+"""
+
+
+# ---------- 测量 ----------
+
+@dataclass
+class Percentiles:
+    p50: float
+    p90: float
+    p99: float
+    mean: float
+    max: float
+
+    @staticmethod
+    def of(samples_ms: list[float]) -> 'Percentiles':
+        a = np.asarray(samples_ms, dtype=np.float64)
+        p50, p90, p99 = np.percentile(a, [50, 90, 99])
+        return Percentiles(float(p50), float(p90), float(p99), float(a.mean()), float(a.max()))
+
+
+@dataclass
+class DeviceBenchResult:
+    impl: str
+    samples: int = 0
+    screenshot_ms: Percentiles | None = None
+    """截图延迟，单位毫秒。"""
+    fps: float | None = None
+    """连续截图的吞吐量，单位帧每秒。"""
+    click_ms: Percentiles | None = None
+    """点击命令往返耗时，单位毫秒。"""
+    decode_ms: float | None = None
+    """客户端解码一帧的平均耗时，单位毫秒。"""
+    resolution: tuple[int, int] | None = None
+    error: str | None = None
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def measure(
+    impl: str,
+    screenshot: Callable[[], MatLike],
+    click: Callable[[int, int], Any],
+    *,
+    samples: int = 30,
+    warmup: int = 3,
+    clicks: int = 10,
+    decode_repeat: int = 20,
+) -> DeviceBenchResult:
+    """
+    测量一个截图实现。
+
+    :param impl: 实现名称。用于选择解码方式，以及输出。
+    :param screenshot: 截图函数。
+    :param click: 点击函数。
+    :param samples: 截图次数。
+    :param warmup: 正式测量前的预热截图次数。不计入结果。
+    :param clicks: 点击次数。为 0 时不测量点击。
+    :param decode_repeat: 解码测量的重复次数。
+    """
+    result = DeviceBenchResult(impl)
+    img = None
+    for _ in range(warmup):
+        img = screenshot()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(samples):
+        t = time.perf_counter()
+        img = screenshot()
+        latencies.append((time.perf_counter() - t) * 1000)
+    total = time.perf_counter() - start
+    result.samples = samples
+    result.screenshot_ms = Percentiles.of(latencies)
+    result.fps = samples / total if total > 0 else None
+    if img is not None:
+        h, w = img.shape[:2]
+        result.resolution = (w, h)
+
+    if clicks > 0 and img is not None:
+        h, w = img.shape[:2]
+        click_latencies = []
+        for _ in range(clicks):
+            t = time.perf_counter()
+            # 点击左上角边缘，尽量不触发游戏内的操作
+            click(1, 1)
+            click_latencies.append((time.perf_counter() - t) * 1000)
+        result.click_ms = Percentiles.of(click_latencies)
+
+    decoder = DECODERS.get(impl)
+    if decoder is not None and img is not None:
+        decode = decoder(img)
+        decode()
+        t = time.perf_counter()
+        for _ in range(decode_repeat):
+            decode()
+        result.decode_ms = (time.perf_counter() - t) / decode_repeat * 1000
+    return result
+
+
+def create_adb_impl(impl: AdbImplName, adb_device: Any) -> Any:
+    """
+    通过 adbutils 的设备对象创建截图实现。
+
+    :param impl: 实现名称。
+    :param adb_device: `adbutils.AdbDevice`。
+    """
+    if impl == 'adb':
+        from kotonebot.client.implements.adb import AdbImpl
+        return AdbImpl(adb_device)
+    elif impl == 'adb_raw':
+        from kotonebot.client.implements.adb_raw import AdbRawImpl
+        return AdbRawImpl(adb_device)
+    elif impl == 'uiautomator2':
+        from kotonebot.client.implements.uiautomator2 import UiAutomator2Impl
+        return UiAutomator2Impl(adb_device)
+    raise ValueError(f'Unknown impl: {impl}')
+
+
+def bench_adb_device(
+    impls: list[AdbImplName],
+    *,
+    serial: str,
+    host: str = '127.0.0.1',
+    port: int = 5037,
+    **kwargs,
+) -> list[DeviceBenchResult]:
+    """
+    依次测量 ADB 设备上的各截图实现。
+
+    :param impls: 要测量的实现。
+    :param serial: 设备序列号。
+    :param host: ADB 服务器地址。
+    :param port: ADB 服务器端口。
+    :param kwargs: 传给 `measure` 的参数。
+    """
+    from adbutils import AdbClient
+    adb_device = AdbClient(host=host, port=port).device(serial)
+    # adb_raw 通过 adb 可执行文件截图，需要让它连接到同一个服务器
+    old_port = os.environ.get('ANDROID_ADB_SERVER_PORT')
+    os.environ['ANDROID_ADB_SERVER_PORT'] = str(port)
+    results = []
+    try:
+        for name in impls:
+            logger.info('Benchmarking %s...', name)
+            try:
+                impl = create_adb_impl(name, adb_device)
+                results.append(measure(name, impl.screenshot, impl.click, **kwargs))
+            except ImportError as e:
+                # 未安装对应的可选依赖（如 uiautomator2）
+                logger.warning('Skipped %s: %s', name, e)
+                results.append(DeviceBenchResult(name, error=f'{type(e).__name__}: {e}'))
+            except Exception as e:
+                logger.exception('Benchmark of %s failed.', name)
+                results.append(DeviceBenchResult(name, error=f'{type(e).__name__}: {e}'))
+    finally:
+        if old_port is None:
+            os.environ.pop('ANDROID_ADB_SERVER_PORT', None)
+        else:
+            os.environ['ANDROID_ADB_SERVER_PORT'] = old_port
+    return results
+
+
+def bench_fake_device(
+    impls: list[AdbImplName],
+    frames: list[MatLike],
+    *,
+    capture_delay: float = 0,
+    input_delay: float = 0,
+    **kwargs,
+) -> list[DeviceBenchResult]:
+    """
+    启动 `FakeAdbServer`，并在其上测量各截图实现。
+
+    :param impls: 要测量的实现。
+    :param frames: 模拟设备的画面。
+    :param capture_delay: 模拟的截图耗时，单位秒。
+    :param input_delay: 模拟的点击耗时，单位秒。
+    :param kwargs: 传给 `measure` 的参数。
+    """
+    with FakeAdbServer(frames, capture_delay=capture_delay, input_delay=input_delay) as server:
+        results = bench_adb_device(impls, serial=FAKE_SERIAL, host=server.host, port=server.port, **kwargs)
+        for r in results:
+            r.extra['fake'] = True
+            r.extra['capture_delay_ms'] = capture_delay * 1000
+            r.extra['input_delay_ms'] = input_delay * 1000
+    return results
+
+
+def format_results(results: list[DeviceBenchResult]) -> str:
+    """把结果格式化为表格。"""
+    header = f'{"impl":<14}{"p50":>9}{"p90":>9}{"p99":>9}{"mean":>9}{"fps":>8}{"click":>9}{"decode":>9}'
+    lines = [header, '-' * len(header)]
+    def ms(v: float | None) -> str:
+        return f'{v:.1f}ms' if v is not None else '-'
+    for r in results:
+        if r.error is not None:
+            lines.append(f'{r.impl:<14}error: {r.error}')
+            continue
+        s = r.screenshot_ms
+        assert s is not None
+        lines.append(
+            f'{r.impl:<14}{ms(s.p50):>9}{ms(s.p90):>9}{ms(s.p99):>9}{ms(s.mean):>9}'
+            f'{(f"{r.fps:.1f}" if r.fps else "-"):>8}'
+            f'{ms(r.click_ms.p50 if r.click_ms else None):>9}{ms(r.decode_ms):>9}'
+        )
+    return '\n'.join(lines)
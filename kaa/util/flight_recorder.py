@@ -0,0 +1,333 @@
+"""
+截图飞行记录器。
+
+在内存中保留最近一段时间的截图（JPEG/WebP 压缩）与点击、滑动操作，出错时随错误报告一起导出，
+用于查看卡住或出错之前的画面。与 `SessionRecorder` 不同，飞行记录器默认常驻，
+因此调用方线程只做降采样与限速，压缩在后台线程中进行，内存占用与开销都有上限。
+
+导出到报告中的目录结构：
+```
+flight/
+    0001.jpg        截图序列。连续相同的截图只保存一张
+    timeline.jsonl  时间线。每行一个截图或操作事件
+    stats.json      记录器的统计信息（开销、丢弃数等）
+```
+"""
+import json
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Literal
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from kotonebot.client.device import Device
+
+if TYPE_CHECKING:
+    from .report import ReportWriter
+
+logger = logging.getLogger(__name__)
+
+ImageFormat = Literal['jpg', 'webp']
+
+
+@dataclass
+class _Frame:
+    data: bytes
+    """压缩后的图像。"""
+    times: list[float] = field(default_factory=list)
+    """截取时间（`time.time()`）。连续相同的截图合并为一帧，记录每次截取的时间。"""
+
+
+@dataclass(frozen=True)
+class FlightSnapshot:
+    """某一时刻飞行记录器内容的快照。"""
+    frames: list[tuple[bytes, list[float]]]
+    events: list[dict[str, Any]]
+    stats: dict[str, Any]
+    format: ImageFormat
+
+    def write(self, writer: 'ReportWriter', prefix: str = 'flight'):
+        """写入错误报告。"""
+        timeline: list[dict[str, Any]] = []
+        for i, (data, times) in enumerate(self.frames, start=1):
+            name = f'{i:04d}.{self.format}'
+            writer.write_bytes(f'{prefix}/{name}', data, compressed=True)
+            timeline.extend({'type': 'frame', 't': t, 'file': name} for t in times)
+        timeline.extend(self.events)
+        timeline.sort(key=lambda e: e['t'])
+        writer.write_text(
+            f'{prefix}/timeline.jsonl',
+            ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in timeline)
+        )
+        writer.write_text(f'{prefix}/stats.json', json.dumps(self.stats, ensure_ascii=False, indent=2))
+
+
+class FlightRecorder:
+    """
+    在固定内存预算内保留最近的截图与操作。
+
+    接入方式与 `SessionRecorder` 相同：包装设备实例上的 `screenshot` 与 `swipe`，
+    点击通过 `click_hooks_before` 记录。记录的是任务实际拿到的截图。
+
+    开销控制：
+    * 调用方线程只缩放截图并交给后台线程，两次采样至少间隔 `min_interval` 秒；
+    * 后台线程压缩时仍有未处理的帧，则丢弃旧帧，只压缩最新的一帧；
+    * 实测的单帧耗时（缩放 + 压缩）除以 `max_load` 作为下一次采样的最小间隔，
+      因此记录器占用的 CPU 时间不超过 `max_load` 的比例。
+
+    例：
+    ```python
+    recorder = FlightRecorder()
+    recorder.install(device)
+    ...
+    snapshot = recorder.snapshot()  # 出错时
+    ```
+    """
+
+    def __init__(
+        self,
+        *,
+        seconds: float = 60,
+        max_bytes: int = 16 * 1024 * 1024,
+        scale: float = 0.5,
+        format: ImageFormat = 'jpg',
+        quality: int = 70,
+        min_interval: float = 0.2,
+        max_load: float = 0.05,
+        max_events: int = 5000,
+    ):
+        """
+        :param seconds: 保留最近多少秒的记录。
+        :param max_bytes: 压缩后截图的总大小上限。单位字节。
+        :param scale: 截图缩放比例。
+        :param format: 压缩格式。
+        :param quality: 压缩质量，范围 [0, 100]。
+        :param min_interval: 两次采样的最小间隔。单位秒。
+        :param max_load: 记录器耗时占总时间的比例上限。
+        :param max_events: 保留的操作数上限。
+        """
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.scale = scale
+        self.format: ImageFormat = format
+        self.quality = quality
+        self.min_interval = min_interval
+        self.max_load = max_load
+        self.device: Device | None = None
+
+        self.captured = 0
+        """交给后台线程的帧数。"""
+        self.skipped = 0
+        """因限速而未采样的截图数。"""
+        self.dropped = 0
+        """后台线程来不及压缩而丢弃的帧数。"""
+        self.hook_seconds = 0.0
+        """调用方线程中的总耗时。单位秒。"""
+        self.encode_seconds = 0.0
+        """后台线程中的总耗时。单位秒。"""
+        self.encoded = 0
+        """已压缩的帧数。"""
+        self.merged = 0
+        """与上一帧相同而合并的帧数。"""
+
+        self.__frames: deque[_Frame] = deque()
+        self.__frames_size = 0
+        self.__events: deque[dict[str, Any]] = deque(maxlen=max_events)
+        self.__lock = threading.Lock()
+        self.__cond = threading.Condition(self.__lock)
+        self.__pending: tuple[float, MatLike] | None = None
+        self.__last_image: MatLike | None = None
+        self.__next_capture = 0.0
+        self.__cost = 0.0
+        """最近一帧的总耗时。"""
+        self.__running = False
+        self.__thread: threading.Thread | None = None
+        self.__wrapped: dict[str, Callable] = {}
+
+    @property
+    def installed(self) -> bool:
+        return self.device is not None
+
+    @property
+    def size(self) -> int:
+        """已保存截图的总大小。单位字节。"""
+        return self.__frames_size
+
+    def install(self, device: Device) -> 'FlightRecorder':
+        """接入设备，开始记录。已接入其他设备时先断开。"""
+        if self.device is device:
+            return self
+        self.uninstall()
+        self.device = device
+        self.__start_thread()
+
+        original_screenshot = device.screenshot
+        original_swipe = device.swipe
+        def screenshot() -> MatLike:
+            img = original_screenshot()
+            if self.device is device:
+                self.record_frame(img)
+            return img
+        def swipe(x1: int, y1: int, x2: int, y2: int, duration: float | None = None, **kwargs):
+            if self.device is device:
+                self.record_action('swipe', x1=int(x1), y1=int(y1), x2=int(x2), y2=int(y2), duration=duration)
+            return original_swipe(x1, y1, x2, y2, duration, **kwargs)
+        self.__wrapped = {'screenshot': screenshot, 'swipe': swipe}
+        device.screenshot = screenshot  # type: ignore[method-assign]
+        device.swipe = swipe  # type: ignore[method-assign]
+        device.click_hooks_before.append(self._click_hook)
+        return self
+
+    def uninstall(self):
+        """断开设备。已记录的内容保留，仍可导出。"""
+        device = self.device
+        if device is None:
+            return
+        self.device = None
+        if self._click_hook in device.click_hooks_before:
+            device.click_hooks_before.remove(self._click_hook)
+        # 若之后又被其他对象包装，则保留，包装函数在断开后直接透传
+        for name, wrapper in self.__wrapped.items():
+            if vars(device).get(name) is wrapper:
+                delattr(device, name)
+        self.__wrapped = {}
+        with self.__cond:
+            self.__running = False
+            self.__cond.notify_all()
+        if self.__thread is not None:
+            self.__thread.join(timeout=5)
+            self.__thread = None
+
+    def clear(self):
+        """清空已记录的内容。"""
+        with self.__lock:
+            self.__frames.clear()
+            self.__frames_size = 0
+            self.__events.clear()
+            self.__last_image = None
+
+    def record_frame(self, img: MatLike):
+        """在调用方线程中调用。按限速决定是否采样，采样时只缩放，压缩在后台线程中进行。"""
+        start = time.perf_counter()
+        now = time.monotonic()
+        if now < self.__next_capture:
+            self.skipped += 1
+            return
+        if self.scale != 1:
+            h, w = img.shape[:2]
+            size = (max(1, round(w * self.scale)), max(1, round(h * self.scale)))
+            frame = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        else:
+            # 调用方可能会原地修改截图（例如绘制调试信息），因此保存副本
+            frame = img.copy()
+        with self.__cond:
+            if self.__pending is not None:
+                self.dropped += 1
+            self.__pending = (time.time(), frame)
+            self.captured += 1
+            self.__cond.notify()
+        elapsed = time.perf_counter() - start
+        self.hook_seconds += elapsed
+        self.__next_capture = now + max(self.min_interval, (self.__cost + elapsed) / self.max_load)
+
+    def record_action(self, type: str, **data: Any):
+        """记录一次操作。"""
+        event = {'type': type, 't': time.time(), **data}
+        with self.__lock:
+            self.__events.append(event)
+            self.__evict(event['t'])
+
+    def _click_hook(self, x: int, y: int) -> tuple[int, int]:
+        if self.device is not None:
+            self.record_action('click', x=int(x), y=int(y))
+        return x, y
+
+    def snapshot(self) -> FlightSnapshot:
+        """取得当前内容的快照。只复制引用，可以在任何线程中调用。"""
+        with self.__lock:
+            self.__evict(time.time())
+            frames = [(f.data, list(f.times)) for f in self.__frames]
+            events = list(self.__events)
+        return FlightSnapshot(frames, events, self.stats(), self.format)
+
+    def stats(self) -> dict[str, Any]:
+        """统计信息。耗时单位为毫秒。"""
+        return {
+            'frames': len(self.__frames),
+            'bytes': self.__frames_size,
+            'captured': self.captured,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+            'merged': self.merged,
+            'hook_ms_mean': self.hook_seconds * 1000 / self.captured if self.captured else 0,
+            'encode_ms_mean': self.encode_seconds * 1000 / self.encoded if self.encoded else 0,
+        }
+
+    def __start_thread(self):
+        with self.__cond:
+            if self.__running:
+                return
+            self.__running = True
+        self.__thread = threading.Thread(target=self.__run, name='kaa-flight-recorder', daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                while self.__running and self.__pending is None:
+                    self.__cond.wait()
+                if self.__pending is None:
+                    return
+                t, img = self.__pending
+                self.__pending = None
+            try:
+                self.__encode(t, img)
+            except Exception:
+                logger.exception('Failed to encode flight recorder frame.')
+
+    def __encode(self, t: float, img: MatLike):
+        start = time.perf_counter()
+        last = self.__last_image
+        if last is not None and last.shape == img.shape and np.array_equal(last, img):
+            with self.__lock:
+                if self.__frames:
+                    self.__frames[-1].times.append(t)
+                    self.merged += 1
+                    return
+        if self.format == 'webp':
+            params = [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        ok, buf = cv2.imencode('.' + self.format, img, params)
+        if not ok:
+            raise ValueError('Failed to encode frame.')
+        data = buf.tobytes()
+        elapsed = time.perf_counter() - start
+        self.encode_seconds += elapsed
+        self.encoded += 1
+        self.__cost = elapsed
+        with self.__lock:
+            self.__last_image = img
+            self.__frames.append(_Frame(data, [t]))
+            self.__frames_size += len(data)
+            self.__evict(t)
+
+    def __evict(self, now: float):
+        """须持有锁。丢弃过期的记录，以及超出内存预算的最旧的帧。"""
+        deadline = now - self.seconds
+        frames = self.__frames
+        while frames and (
+            frames[0].times[-1] < deadline
+            or (self.__frames_size > self.max_bytes and len(frames) > 1)
+        ):
+            self.__frames_size -= len(frames.popleft().data)
+        # 合并的帧中只保留未过期的时间
+        if frames and frames[0].times[0] < deadline:
+            frames[0].times = [t for t in frames[0].times if t >= deadline]
+        while self.__events and self.__events[0]['t'] < deadline:
+            self.__events.popleft()
@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Literal
+
+import cv2
+from cv2.typing import MatLike
+
+from kotonebot.primitives import Rect
+
+
+class Frame:
+    """
+    一帧截图及其派生数据的惰性缓存。
+
+    同一帧截图在一次循环中往往会被多个识别函数转换为 HSV、灰度等格式。
+    通过 `Frame.of(img)` 取得的实例会记住已经计算过的结果，之后直接复用。
+
+    缓存以图像对象本身为键。每次截图都会得到新的数组，因此新截图自然会使缓存失效。
+    为了保证缓存正确，**不能原地修改** 传入的图像。
+    返回的派生数据是只读的共享数组，需要修改时请先复制。
+
+    例：
+    ```python
+    frame = Frame.of(device.screenshot())
+    hsv = frame.hsv()                # 整帧 HSV
+    roi = frame.hsv(rect)            # 若整帧 HSV 已计算，直接返回切片，否则只转换该区域
+    binary = frame.binary(150, rect) # 灰度二值化
+    half = frame.scaled(2)           # 1/2 缩放，同样是 Frame
+    ```
+    """
+
+    def __init__(self, img: MatLike):
+        self.img = img
+        self.__cache: dict[Hashable, MatLike] = {}
+        self.__scaled: dict[int, Frame] = {}
+        self.__lock = threading.RLock()
+
+    @classmethod
+    def of(cls, img: MatLike) -> 'Frame':
+        """
+        取得图像对应的 `Frame`。若最近已为同一图像创建过，则直接返回该实例。
+        """
+        return _frames.get(img)
+
+    def crop(self, rect: Rect) -> MatLike:
+        """原图指定区域的视图。"""
+        x, y, w, h = rect.xywh
+        return self.img[y:y+h, x:x+w]
+
+    def hsv(self, rect: Rect | None = None) -> MatLike:
+        """HSV 格式的图像。"""
+        return self.__derive('hsv', rect, lambda src: cv2.cvtColor(src, cv2.COLOR_BGR2HSV))
+
+    def gray(self, rect: Rect | None = None) -> MatLike:
+        """灰度图像。"""
+        return self.__derive('gray', rect, lambda src: cv2.cvtColor(src, cv2.COLOR_BGR2GRAY))
+
+    def binary(self, threshold: int, rect: Rect | None = None) -> MatLike:
+        """
+        灰度图像以 `threshold` 二值化（`THRESH_BINARY`）后的结果。
+        """
+        def convert(_):
+            return cv2.threshold(self.gray(rect), threshold, 255, cv2.THRESH_BINARY)[1]
+        return self.__derive(('binary', threshold), rect, convert)
+
+    def memo(self, key: Hashable, compute: Callable[[MatLike], MatLike]) -> MatLike:
+        """
+        计算并缓存任意派生数据。
+
+        :param key: 缓存键。需要能唯一确定 `compute` 的计算方式。
+        :param compute: 计算函数，参数为原图。
+        """
+        return self.__derive(('memo', key), None, compute)
+
+    def scaled(self, factor: Literal[2, 4]) -> 'Frame':
+        """
+        缩小为 1/`factor` 后的 `Frame`。
+
+        :param factor: 缩小倍数，2 或 4。
+        """
+        with self.__lock:
+            if factor not in self.__scaled:
+                if factor == 4:
+                    src = self.scaled(2).img
+                    f = 2
+                else:
+                    src = self.img
+                    f = factor
+                h, w = src.shape[:2]
+                img = cv2.resize(src, (w // f, h // f), interpolation=cv2.INTER_AREA)
+                img.flags.writeable = False
+                self.__scaled[factor] = Frame(img)
+            return self.__scaled[factor]
+
+    def __derive(
+        self,
+        kind: Hashable,
+        rect: Rect | None,
+        convert: Callable[[MatLike], MatLike],
+    ) -> MatLike:
+        with self.__lock:
+            if rect is None:
+                key = (kind, None)
+                if key not in self.__cache:
+                    self.__cache[key] = self.__freeze(convert(self.img))
+                return self.__cache[key]
+            x, y, w, h = rect.xywh
+            # 各派生数据都是逐像素计算的，整帧结果已存在时，直接切片
+            full = self.__cache.get((kind, None))
+            if full is not None:
+                return full[y:y+h, x:x+w]
+            key = (kind, (x, y, w, h))
+            if key not in self.__cache:
+                self.__cache[key] = self.__freeze(convert(self.img[y:y+h, x:x+w]))
+            return self.__cache[key]
+
+    @staticmethod
+    def __freeze(img: MatLike) -> MatLike:
+        img.flags.writeable = False
+        return img
+
+
+class _FrameCache:
+    """最近使用的几个 `Frame`。以图像对象的身份（而非内容）为键。"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.__items: OrderedDict[int, Frame] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, img: MatLike) -> Frame:
+        key = id(img)
+        with self.__lock:
+            frame = self.__items.get(key)
+            # Frame 持有图像的强引用，因此缓存期间 id 不会被复用
+            if frame is not None and frame.img is img:
+                self.__items.move_to_end(key)
+                return frame
+            frame = Frame(img)
+            self.__items[key] = frame
+            while len(self.__items) > self.capacity:
+                self.__items.popitem(last=False)
+            return frame
+
+
+# 截图、截图的裁剪以及 image.find 中的模板会交替出现，保留几帧避免互相挤出
+_frames = _FrameCache(4)
@@ -0,0 +1,187 @@
+"""内存中的定长日志缓冲区。用于错误报告与日志导出，长时间运行时内存占用保持不变。"""
+import time
+import zlib
+import pickle
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator
+
+
+@dataclass(frozen=True)
+class LogEntry:
+    created: float
+    """记录时间（`time.time()`）。"""
+    levelno: int
+    """日志等级。"""
+    name: str
+    """logger 名称。"""
+    text: str
+    """格式化后的日志文本。"""
+
+    @property
+    def levelname(self) -> str:
+        return logging.getLevelName(self.levelno)
+
+
+_Row = tuple[float, int, str, str]
+
+
+class _Chunk:
+    """已写满的一段日志。可选地以 zlib 压缩保存。"""
+
+    def __init__(self, rows: list[_Row], compress: bool):
+        # 多线程记录时，时间不一定严格递增
+        self.first = min(row[0] for row in rows)
+        self.last = max(row[0] for row in rows)
+        self.count = len(rows)
+        self.compressed = compress
+        self.__rows: list[_Row] | None = None
+        self.__data: bytes | None = None
+        if compress:
+            self.__data = zlib.compress(pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL), 6)
+            self.size = len(self.__data)
+        else:
+            self.__rows = rows
+            self.size = sum(len(row[3]) + len(row[2]) for row in rows) + 64 * len(rows)
+
+    def rows(self) -> list[_Row]:
+        if self.__rows is not None:
+            return self.__rows
+        assert self.__data is not None
+        return pickle.loads(zlib.decompress(self.__data))
+
+
+class LogRingBuffer(logging.Handler):
+    """
+    定长的日志环形缓冲区。
+
+    新记录先追加到当前段，当前段写满 `chunk_records` 条后封存（`compress` 为 True 时压缩）。
+    所有已封存段的总大小超过 `max_bytes` 时，丢弃最旧的段。
+    因此内存占用的上限约为 `max_bytes` 加上一个未封存段的大小。
+
+    例：
+    ```python
+    buffer = LogRingBuffer()
+    logging.getLogger().addHandler(buffer)
+    ...
+    buffer.text(minutes=10, level=logging.WARNING)
+    ```
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = 8 * 1024 * 1024,
+        chunk_records: int = 2000,
+        compress: bool = True,
+        level: int = logging.NOTSET,
+    ):
+        """
+        :param max_bytes: 已封存段的总大小上限。单位字节。
+        :param chunk_records: 每段的记录条数。
+        :param compress: 是否压缩已封存的段。
+        :param level: 最低记录等级。
+        """
+        super().__init__(level)
+        self.max_bytes = max_bytes
+        self.chunk_records = chunk_records
+        self.compress = compress
+        self.dropped = 0
+        """因超出容量而丢弃的记录条数。"""
+        self.__chunks: deque[_Chunk] = deque()
+        self.__chunks_size = 0
+        self.__current: list[_Row] = []
+        self.__lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """已封存段的总大小。单位字节。"""
+        return self.__chunks_size
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return sum(chunk.count for chunk in self.__chunks) + len(self.__current)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            text = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.__lock:
+            self.__current.append((record.created, record.levelno, record.name, text))
+            if len(self.__current) >= self.chunk_records:
+                self.__seal()
+
+    def clear(self):
+        """清空缓冲区。"""
+        with self.__lock:
+            self.__chunks.clear()
+            self.__chunks_size = 0
+            self.__current = []
+
+    def records(
+        self,
+        *,
+        minutes: float | None = None,
+        since: float | None = None,
+        level: int = logging.NOTSET,
+        logger: str | None = None,
+        limit: int | None = None,
+    ) -> list[LogEntry]:
+        """
+        查询日志记录，按时间从旧到新排列。
+
+        :param minutes: 只返回最近若干分钟内的记录。
+        :param since: 只返回此时间（`time.time()`）之后的记录。与 `minutes` 同时指定时取较晚者。
+        :param level: 最低日志等级。
+        :param logger: logger 名称。同时匹配其子 logger，如 `kaa` 匹配 `kaa.tasks`。
+        :param limit: 只返回最后若干条。
+        """
+        start = since or 0.0
+        if minutes is not None:
+            start = max(start, time.time() - minutes * 60)
+        with self.__lock:
+            chunks = list(self.__chunks)
+            current = list(self.__current)
+        result = [
+            LogEntry(*row)
+            for row in self.__iter_rows(chunks, current, start)
+            if row[0] >= start and row[1] >= level and self.__match_logger(row[2], logger)
+        ]
+        if limit is not None:
+            result = result[-limit:] if limit > 0 else []
+        return result
+
+    def text(self, **kwargs) -> str:
+        """
+        查询日志并拼接为文本。参数同 `records()`。
+        """
+        return ''.join(entry.text + '\n' for entry in self.records(**kwargs))
+
+    def __seal(self):
+        chunk = _Chunk(self.__current, self.compress)
+        self.__current = []
+        self.__chunks.append(chunk)
+        self.__chunks_size += chunk.size
+        while self.__chunks_size > self.max_bytes and len(self.__chunks) > 1:
+            old = self.__chunks.popleft()
+            self.__chunks_size -= old.size
+            self.dropped += old.count
+
+    @staticmethod
+    def __iter_rows(chunks: list[_Chunk], current: list[_Row], start: float) -> Iterator[_Row]:
+        for chunk in chunks:
+            # 整段都早于起始时间时，不必解压
+            if chunk.last < start:
+                continue
+            yield from chunk.rows()
+        yield from current
+
+    @staticmethod
+    def __match_logger(name: str, logger: str | None) -> bool:
+        if logger is None:
+            return True
+        return name == logger or name.startswith(logger + '.')
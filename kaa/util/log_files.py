@@ -0,0 +1,385 @@
+"""
+按大小与时间轮转的日志文件。
+
+日志目录中的 `index.json` 记录了所有日志分段（文件名、时间范围、大小），
+导出与清理日志时只需读取索引，不必遍历目录。
+轮转出的分段在后台线程中用 gzip 压缩，所有分段的总大小不超过给定的预算。
+"""
+import os
+import gzip
+import json
+import time
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass, asdict
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+
+
+@dataclass
+class LogSegment:
+    file: str
+    """文件名，相对于日志目录。"""
+    start: float
+    """第一条日志的时间（`time.time()`）。"""
+    end: float
+    """最后一条日志的时间（`time.time()`）。正在写入的分段可能略有滞后。"""
+    size: int
+    """文件大小。单位字节。"""
+    compressed: bool = False
+    """是否已压缩。"""
+
+
+class LogIndex:
+    """
+    日志目录的分段索引。
+
+    通常不直接创建，而是通过 `log_index()` 取得与目录对应的共享实例。
+    首次读取索引时列出一次目录（只读取目录项，不打开文件），
+    把索引中没有的 `.log`、`.log.gz` 文件（如旧版本或启动器留下的日志）加入索引，
+    并去掉文件已不存在的分段。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.__segments: dict[str, LogSegment] | None = None
+        self.__active: set[str] = set()
+        self.__lock = threading.RLock()
+
+    def path_of(self, segment: LogSegment) -> str:
+        """分段文件的路径。"""
+        return os.path.join(self.directory, segment.file)
+
+    def segments(self, since: float | None = None, until: float | None = None) -> list[LogSegment]:
+        """
+        与时间范围有重叠的分段，按开始时间排列。
+
+        :param since: 范围开始时间。为 None 时不限制。
+        :param until: 范围结束时间。为 None 时不限制。
+        """
+        now = time.time()
+        with self.__lock:
+            result = []
+            for segment in self.__load().values():
+                # 正在写入的分段，结束时间视为现在
+                end = now if segment.file in self.__active else segment.end
+                if since is not None and end < since:
+                    continue
+                if until is not None and segment.start > until:
+                    continue
+                result.append(LogSegment(**asdict(segment)))
+            return sorted(result, key=lambda s: (s.start, s.file))
+
+    @property
+    def total_size(self) -> int:
+        """所有分段的总大小。单位字节。"""
+        with self.__lock:
+            return sum(s.size for s in self.__load().values())
+
+    def put(self, segment: LogSegment, *, active: bool | None = None):
+        """
+        添加或更新分段。
+
+        :param active: 是否正在写入。正在写入的分段不会被 `prune()` 删除。为 None 时保持不变。
+        """
+        with self.__lock:
+            self.__load()[segment.file] = segment
+            if active is True:
+                self.__active.add(segment.file)
+            elif active is False:
+                self.__active.discard(segment.file)
+            self.__save()
+
+    def rename(self, old_file: str, segment: LogSegment):
+        """分段文件被重命名或压缩后，更新索引。"""
+        with self.__lock:
+            segments = self.__load()
+            segments.pop(old_file, None)
+            self.__active.discard(old_file)
+            segments[segment.file] = segment
+            self.__save()
+
+    def prune(self, *, max_age: float | None = None, budget: int | None = None) -> list[LogSegment]:
+        """
+        删除过旧的分段，以及超出总大小预算时最旧的分段。正在写入的分段不会被删除。
+
+        :param max_age: 结束时间早于此秒数之前的分段将被删除。
+        :param budget: 总大小预算。单位字节。
+        :return: 被删除的分段。
+        """
+        now = time.time()
+        removed: list[LogSegment] = []
+        with self.__lock:
+            segments = self.__load()
+            candidates = sorted(
+                (s for s in segments.values() if s.file not in self.__active),
+                key=lambda s: (s.end, s.file)
+            )
+            total = sum(s.size for s in segments.values())
+            for segment in candidates:
+                expired = max_age is not None and segment.end < now - max_age
+                over_budget = budget is not None and total > budget
+                if not expired and not over_budget:
+                    continue
+                try:
+                    os.remove(self.path_of(segment))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error('Failed to remove %s: %s.', segment.file, e)
+                    continue
+                del segments[segment.file]
+                total -= segment.size
+                removed.append(segment)
+            if removed:
+                self.__save()
+        return removed
+
+    def __load(self) -> dict[str, LogSegment]:
+        if self.__segments is not None:
+            return self.__segments
+        path = os.path.join(self.directory, INDEX_FILE)
+        indexed: dict[str, LogSegment] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for item in json.load(f)['segments']:
+                        segment = LogSegment(**item)
+                        indexed[segment.file] = segment
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning('Log index is broken, rebuilding: %s', e)
+                indexed = {}
+        # 与目录内容对齐：加入不经过索引写入的文件（如启动器的日志），去掉已不存在的文件
+        segments = self.__scan(indexed)
+        self.__segments = segments
+        if segments.keys() != indexed.keys():
+            try:
+                self.__save()
+            except OSError as e:
+                logger.warning('Failed to save log index: %s', e)
+        return segments
+
+    def __scan(self, known: dict[str, LogSegment]) -> dict[str, LogSegment]:
+        """列出目录中的日志文件。已在 `known` 中的文件沿用原有记录，只对新文件读取文件信息。"""
+        segments: dict[str, LogSegment] = {}
+        if not os.path.isdir(self.directory):
+            return segments
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(('.log', '.log.gz')) or not entry.is_file():
+                continue
+            if entry.name in known:
+                segments[entry.name] = known[entry.name]
+                continue
+            stat = entry.stat()
+            segments[entry.name] = LogSegment(
+                file=entry.name,
+                start=stat.st_mtime,
+                end=stat.st_mtime,
+                size=stat.st_size,
+                compressed=entry.name.endswith('.gz'),
+            )
+        return segments
+
+    def __save(self):
+        assert self.__segments is not None
+        os.makedirs(self.directory, exist_ok=True)
+        data = {'segments': [asdict(s) for s in sorted(self.__segments.values(), key=lambda s: s.start)]}
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.part', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, os.path.join(self.directory, INDEX_FILE))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+_indexes: dict[str, LogIndex] = {}
+_indexes_lock = threading.Lock()
+
+def log_index(directory: str = 'logs') -> LogIndex:
+    """取得日志目录对应的索引。同一目录在进程内共享一个实例。"""
+    key = os.path.abspath(directory)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = LogIndex(directory)
+        return _indexes[key]
+
+
+class _Compressor:
+    """在后台线程中依次压缩轮转出的分段。"""
+
+    def __init__(self):
+        self.__queue: queue.Queue[tuple[LogIndex, LogSegment, int | None]] = queue.Queue()
+        self.__thread: threading.Thread | None = None
+        self.__lock = threading.Lock()
+
+    def submit(self, index: LogIndex, segment: LogSegment, budget: int | None):
+        with self.__lock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run, name='kaa-log-compressor', daemon=True)
+                self.__thread.start()
+        self.__queue.put((index, segment, budget))
+
+    def join(self, timeout: float | None = None) -> bool:
+        """等待已提交的压缩全部完成。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.__queue.unfinished_tasks > 0:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def __run(self):
+        while True:
+            index, segment, budget = self.__queue.get()
+            try:
+                compress_segment(index, segment)
+                if budget is not None:
+                    index.prune(budget=budget)
+            except Exception:
+                logger.exception('Failed to compress log segment %s.', segment.file)
+            finally:
+                self.__queue.task_done()
+
+
+compressor = _Compressor()
+
+
+def compress_segment(index: LogIndex, segment: LogSegment) -> LogSegment:
+    """用 gzip 压缩分段，并更新索引。"""
+    src = index.path_of(segment)
+    file = segment.file + '.gz'
+    dst = os.path.join(index.directory, file)
+    tmp = dst + '.part'
+    with open(src, 'rb') as f_in, gzip.open(tmp, 'wb', compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    os.replace(tmp, dst)
+    compressed = LogSegment(file, segment.start, segment.end, os.path.getsize(dst), True)
+    index.rename(segment.file, compressed)
+    os.remove(src)
+    return compressed
+
+
+class RotatingLogHandler(logging.Handler):
+    """
+    按大小与时间轮转的日志文件 handler。
+
+    正在写入的分段位于 `path`。超过 `max_bytes` 或写入时间超过 `max_age` 后，
+    重命名为 `{名称}.{序号}.log` 并在后台压缩为 `.log.gz`，再开始新的分段。
+    所有分段（包括其他会话的）总大小超过 `budget` 时，删除最旧的分段。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_bytes: int = 20 * 1024 * 1024,
+        max_age: float = 6 * 3600,
+        budget: int | None = 512 * 1024 * 1024,
+        compress: bool = True,
+        index_interval: float = 60,
+    ):
+        """
+        :param path: 日志文件路径。
+        :param max_bytes: 单个分段的最大大小。单位字节。
+        :param max_age: 单个分段的最长写入时间。单位秒。
+        :param budget: 日志目录中所有分段的总大小预算。单位字节。为 None 时不限制。
+        :param compress: 是否压缩轮转出的分段。
+        :param index_interval: 更新索引中当前分段信息的间隔。单位秒。
+        """
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.budget = budget
+        self.compress = compress
+        self.index_interval = index_interval
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.index = log_index(self.directory)
+        self.rotations = 0
+        """已轮转的次数。"""
+        self.__name = os.path.basename(path)
+        self.__stem = self.__name[:-len('.log')] if self.__name.endswith('.log') else self.__name
+        self.__stream = None
+        self.__segment: LogSegment | None = None
+        self.__opened_at = 0.0
+        self.__indexed_at = 0.0
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            data = (self.format(record) + '\n').encode('utf-8')
+            with self.lock:  # type: ignore[union-attr]
+                if self.__stream is None:
+                    self.__open(record.created)
+                assert self.__segment is not None
+                if self.__segment.size > 0 and (
+                    self.__segment.size + len(data) > self.max_bytes
+                    or time.monotonic() - self.__opened_at > self.max_age
+                ):
+                    self.__rotate(record.created)
+                self.__write(data, record.created)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self.lock:  # type: ignore[union-attr]
+            if self.__stream is not None:
+                self.__stream.flush()
+
+    def close(self):
+        with self.lock:  # type: ignore[union-attr]
+            if self.__stream is not None:
+                self.__stream.close()
+                self.__stream = None
+                assert self.__segment is not None
+                self.index.put(self.__segment, active=False)
+        super().close()
+
+    def __open(self, created: float):
+        os.makedirs(self.directory, exist_ok=True)
+        self.__stream = open(self.path, 'ab')
+        size = self.__stream.tell()
+        self.__segment = LogSegment(self.__name, created, created, size)
+        self.__opened_at = time.monotonic()
+        self.__indexed_at = self.__opened_at
+        self.index.put(self.__segment, active=True)
+
+    def __write(self, data: bytes, created: float):
+        assert self.__stream is not None and self.__segment is not None
+        self.__stream.write(data)
+        self.__stream.flush()
+        self.__segment.size += len(data)
+        self.__segment.end = created
+        if time.monotonic() - self.__indexed_at > self.index_interval:
+            self.__indexed_at = time.monotonic()
+            self.index.put(LogSegment(**asdict(self.__segment)))
+
+    def __rotate(self, created: float):
+        assert self.__stream is not None and self.__segment is not None
+        self.__stream.close()
+        self.__stream = None
+        self.rotations += 1
+        # 同名的日志文件被再次打开时，跳过已有的序号
+        seq = self.rotations
+        while True:
+            file = f'{self.__stem}.{seq:03d}.log'
+            if not os.path.exists(os.path.join(self.directory, file)) \
+                    and not os.path.exists(os.path.join(self.directory, file + '.gz')):
+                break
+            seq += 1
+        self.rotations = seq
+        os.replace(self.path, os.path.join(self.directory, file))
+        rotated = LogSegment(file, self.__segment.start, self.__segment.end, self.__segment.size)
+        self.index.rename(self.__name, rotated)
+        if self.compress:
+            compressor.submit(self.index, rotated, self.budget)
+        elif self.budget is not None:
+            self.index.prune(budget=self.budget)
+        self.__open(created)
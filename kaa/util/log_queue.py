@@ -0,0 +1,196 @@
+"""
+异步日志。
+
+日志调用只把记录放入队列，格式化与写入（控制台、文件、内存缓冲区）都在单独的写入线程中进行，
+出牌等高频循环中的日志不再受磁盘速度影响。
+"""
+import copy
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    带丢弃策略的 `QueueHandler`。
+
+    队列已满时，等级不高于 `drop_level` 的记录直接丢弃；
+    更高等级的记录最多等待 `block_timeout` 秒，仍无法放入时才丢弃。
+    丢弃之后第一条成功放入的记录之前，会插入一条 WARNING 说明丢弃的条数。
+    """
+
+    def __init__(
+        self,
+        q: queue.Queue,
+        *,
+        drop_level: int = logging.DEBUG,
+        block_timeout: float = 1,
+    ):
+        super().__init__(q)
+        self.queue: queue.Queue
+        self.drop_level = drop_level
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        """丢弃的总条数。"""
+        self.__unreported = 0
+        self.__lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只合并参数，格式化留给写入线程。
+        # 参数可能是之后会被修改的对象，因此必须在这里合并
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.__unreported:
+            self.__report_dropped(record)
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno > self.drop_level:
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+        with self.__lock:
+            self.dropped += 1
+            self.__unreported += 1
+
+    def __report_dropped(self, record: logging.LogRecord):
+        with self.__lock:
+            count = self.__unreported
+            self.__unreported = 0
+        if count == 0:
+            return
+        notice = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            'Dropped %d log record(s) because the log queue was full.', (count,), None
+        )
+        notice.created = record.created
+        try:
+            self.queue.put_nowait(self.prepare(notice))
+        except queue.Full:
+            with self.__lock:
+                self.__unreported += count
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # 队列已满时等待写入线程腾出空间，保证一定能停止
+        self.queue.put(self._sentinel)
+
+
+class AsyncLogPipeline:
+    """
+    把 logger 上的 handler 移到单独的写入线程中执行。
+
+    例：
+    ```python
+    pipeline = AsyncLogPipeline()
+    pipeline.install(logging.getLogger())  # 接管已有的 handler
+    pipeline.add_handler(logging.FileHandler('a.log'))
+    ...
+    pipeline.flush()  # 等待已记录的日志全部写出
+    ```
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity: int = 10000,
+        drop_level: int = logging.DEBUG,
+        block_timeout: float = 1,
+    ):
+        """
+        :param capacity: 队列容量。
+        :param drop_level: 队列已满时，等级不高于此值的记录直接丢弃。
+        :param block_timeout: 队列已满时，更高等级的记录最长等待时间。单位秒。
+        """
+        self.queue: queue.Queue[logging.LogRecord] = queue.Queue(capacity)
+        self.handler = DroppingQueueHandler(self.queue, drop_level=drop_level, block_timeout=block_timeout)
+        self.__listener = _Listener(self.queue, respect_handler_level=True)
+        self.__logger: logging.Logger | None = None
+        self.__lock = threading.Lock()
+
+    @property
+    def installed(self) -> bool:
+        return self.__logger is not None
+
+    @property
+    def handlers(self) -> tuple[logging.Handler, ...]:
+        """在写入线程中执行的 handler。"""
+        return tuple(self.__listener.handlers)
+
+    @property
+    def dropped(self) -> int:
+        """丢弃的日志条数。"""
+        return self.handler.dropped
+
+    def install(self, logger: logging.Logger):
+        """
+        接管 `logger` 上已有的 handler，并启动写入线程。
+
+        :param logger: 通常为根 logger。
+        """
+        with self.__lock:
+            if self.__logger is not None:
+                return
+            handlers = [h for h in logger.handlers if h is not self.handler]
+            for h in handlers:
+                logger.removeHandler(h)
+            self.__listener.handlers = tuple(handlers)
+            logger.addHandler(self.handler)
+            self.__logger = logger
+            self.__listener.start()
+            thread = getattr(self.__listener, '_thread', None)
+            if thread is not None:
+                thread.name = 'kaa-log-writer'
+        atexit.register(self.uninstall)
+
+    def uninstall(self):
+        """写出剩余的日志，停止写入线程，并把 handler 还给 logger。"""
+        with self.__lock:
+            logger = self.__logger
+            if logger is None:
+                return
+            self.__logger = None
+            logger.removeHandler(self.handler)
+            self.__listener.stop()
+            for h in self.__listener.handlers:
+                logger.addHandler(h)
+            self.__listener.handlers = ()
+
+    def add_handler(self, handler: logging.Handler):
+        """添加在写入线程中执行的 handler。"""
+        with self.__lock:
+            # 写入线程遍历的是旧的元组，替换整个元组即可，不需要加锁
+            self.__listener.handlers = tuple(self.__listener.handlers) + (handler,)
+
+    def remove_handler(self, handler: logging.Handler):
+        """移除 handler。"""
+        with self.__lock:
+            self.__listener.handlers = tuple(h for h in self.__listener.handlers if h is not handler)
+
+    def flush(self, timeout: float = 5) -> bool:
+        """
+        等待队列中的日志全部写出。
+
+        :param timeout: 最长等待时间。单位秒。
+        :return: 是否已全部写出。
+        """
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks > 0:
+            if not self.installed or time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        for h in self.__listener.handlers:
+            h.flush()
+        return True
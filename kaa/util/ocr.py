@@ -0,0 +1,259 @@
+import hashlib
+import logging
+import threading
+import dataclasses
+from collections import OrderedDict
+from typing import Any, Hashable, Sequence
+
+import numpy as np
+from cv2.typing import MatLike
+from rapidocr_onnxruntime import RapidOCR
+
+from kotonebot.primitives import Rect
+from kotonebot.backend import ocr as _ocr
+from kotonebot.backend.context import ContextOcr, inject_context, ocr as context_ocr
+from kotonebot.backend.context.context import OcrLanguage
+from kotonebot.backend.ocr import Ocr, OcrResult, OcrResultList, sanitize_text
+
+logger = logging.getLogger(__name__)
+
+TEXT_SCORE = 0.5
+"""单行识别结果的最低置信度，与 RapidOCR 默认的 `text_score` 一致。"""
+
+
+_ENGINE_ATTRS: dict[str, str] = {'jp': '_engine_jp', 'en': '_engine_en'}
+"""kotonebot 中保存各语言 RapidOCR 实例的模块变量。kotonebot 没有公开取得 RapidOCR 实例的接口。"""
+_engine_lock = threading.Lock()
+"""kotonebot 创建引擎时没有加锁。预热线程与任务线程同时首次使用时，会各自创建一个 ONNX 会话。"""
+
+
+def ocr_engine(lang: OcrLanguage) -> RapidOCR:
+    """
+    获取 kotonebot 内部使用的 RapidOCR 引擎实例，尚未创建时创建。
+    可以在多个线程中同时调用，引擎只会创建一次。
+
+    批量识别需要直接调用识别模型，kotonebot 的 `Ocr` 没有提供这样的接口，
+    因此只能读取其内部变量。所有访问都集中在此处。
+
+    :raises ValueError: 语言无效时。
+    :raises RuntimeError: kotonebot 的内部实现变化，找不到引擎实例时。
+    """
+    if lang not in _ENGINE_ATTRS:
+        raise ValueError(f'Invalid language: {lang}')
+    with _engine_lock:
+        # 通过公开的函数创建引擎
+        if lang == 'jp':
+            _ocr.jp()
+        else:
+            _ocr.en()
+        engine = getattr(_ocr, _ENGINE_ATTRS[lang], None)
+    if not isinstance(engine, RapidOCR):
+        raise RuntimeError(
+            f'Cannot find the RapidOCR engine at kotonebot.backend.ocr.{_ENGINE_ATTRS[lang]}. '
+            'The kotonebot version is probably incompatible.'
+        )
+    return engine
+
+
+class OcrCache:
+    """
+    以识别区域像素内容为键的 OCR 结果缓存。
+
+    很多流程会在等待其他元素变化时反复识别同一块静止的文本，
+    这些帧在识别区域内的像素完全相同。命中缓存时直接返回上次的结果，
+    不再进行推理。
+    """
+
+    def __init__(self, capacity: int = 128):
+        """
+        :param capacity: 最多缓存的结果数量。超出后按 LRU 淘汰。
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.__items: OrderedDict[Hashable, OcrResultList] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(img: MatLike, rect: Rect | None, lang: OcrLanguage, **options: Any) -> Hashable:
+        """
+        计算缓存键。
+
+        键由识别区域的像素哈希、区域位置、语言与识别选项组成。
+        区域位置参与计算，因为结果中的 `original_rect` 依赖于它。
+        """
+        if rect is not None:
+            x, y, w, h = rect.xywh
+            roi = img[y:y+h, x:x+w]
+            pos = (x, y, w, h)
+        else:
+            roi = img
+            pos = None
+        roi = np.ascontiguousarray(roi)
+        digest = hashlib.blake2b(roi.data, digest_size=16).digest()
+        return (digest, roi.shape, pos, lang, tuple(sorted(options.items())))
+
+    def get(self, key: Hashable) -> OcrResultList | None:
+        with self.__lock:
+            results = self.__items.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.__items.move_to_end(key)
+        # 返回副本，防止调用方修改（如 `OcrResult.replace`）污染缓存
+        return OcrResultList(dataclasses.replace(r) for r in results)
+
+    def put(self, key: Hashable, results: OcrResultList):
+        with self.__lock:
+            self.__items[key] = OcrResultList(dataclasses.replace(r) for r in results)
+            self.__items.move_to_end(key)
+            while len(self.__items) > self.capacity:
+                self.__items.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        """返回缓存命中统计。"""
+        return {
+            'size': len(self.__items),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+        }
+
+
+ocr_cache = OcrCache()
+"""全局 OCR 结果缓存。"""
+
+
+class CachedOcr(Ocr):
+    """
+    带结果缓存的 `Ocr`。
+
+    `find`、`find_all`、`expect` 等方法最终都会调用 `ocr`，因此全部受益于缓存。
+    """
+
+    def __init__(self, lang: OcrLanguage, cache: OcrCache = ocr_cache):
+        super().__init__(ocr_engine(lang))
+        self.lang: OcrLanguage = lang
+        self.cache = cache
+
+    def ocr(
+        self,
+        img: MatLike,
+        *,
+        rect: Rect | None = None,
+        pad: bool = True,
+    ) -> OcrResultList:
+        key = self.cache.key(img, rect, self.lang, pad=pad)
+        if (results := self.cache.get(key)) is not None:
+            return results
+        results = super().ocr(img, rect=rect, pad=pad)
+        self.cache.put(key, results)
+        return results
+
+
+class CachedContextOcr(ContextOcr):
+    """
+    使用 `CachedOcr` 作为引擎的 `ContextOcr`。
+
+    通过 `inject_context(ocr=...)` 注入后，`from kotonebot import ocr` 的所有调用都会经过缓存。
+    """
+
+    def __init__(self, context: Any, cache: OcrCache = ocr_cache):
+        super().__init__(context)
+        self.__engines: dict[OcrLanguage, CachedOcr] = {}
+        self.cache = cache
+
+    @classmethod
+    def install(cls, cache: OcrCache = ocr_cache) -> 'CachedContextOcr':
+        """创建实例并注入到当前 Context 中。"""
+        ins = cls(context_ocr.context, cache)
+        inject_context(ocr=ins)
+        return ins
+
+    def _get_engine(self, lang: OcrLanguage | None = None) -> Ocr:
+        return self.raw(lang)
+
+    def raw(self, lang: OcrLanguage | None = None) -> Ocr:
+        lang = lang or 'jp'
+        if lang not in ('jp', 'en'):
+            raise ValueError(f'Invalid language: {lang}')
+        if lang not in self.__engines:
+            self.__engines[lang] = CachedOcr(lang, self.cache)
+        return self.__engines[lang]
+
+
+def ocr_batch(
+    img: MatLike,
+    rects: Sequence[Rect],
+    *,
+    lang: OcrLanguage = 'jp',
+    single_line: bool = True,
+) -> list[OcrResultList]:
+    """
+    对同一张图像中的多个区域进行 OCR。
+
+    `single_line` 为 True 时，认为每个区域恰好框住一行文本，
+    跳过文本检测阶段，将所有区域的裁剪图打包成一个批次直接送入识别模型。
+    N 个文本框的开销约等于一次推理，而不是 N 次完整的检测 + 识别。
+
+    :param img: 图像。
+    :param rects: 需要识别的区域。
+    :param lang: OCR 语言。
+    :param single_line:
+        每个区域是否只包含一行文本。
+        若为 False，则退化为对每个区域逐个调用带检测的 OCR。
+    :return: 识别结果，顺序与 `rects` 相同。未识别到文本的区域对应空列表。
+    """
+    if not rects:
+        return []
+    if not single_line:
+        engine = CachedOcr(lang)
+        return [engine.ocr(img, rect=rect) for rect in rects]
+
+    h, w = img.shape[:2]
+    ret = [OcrResultList() for _ in rects]
+    crops: list[MatLike] = []
+    pending: list[tuple[int, Hashable]] = []
+    for i, rect in enumerate(rects):
+        x, y, rw, rh = rect.xywh
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(w, x + rw), min(h, y + rh)
+        if x2 <= x1 or y2 <= y1:
+            logger.warning('Rect %s is out of image bounds. Skipped.', rect)
+            continue
+        key = ocr_cache.key(img, rect, lang, single_line=True)
+        if (cached := ocr_cache.get(key)) is not None:
+            ret[i] = cached
+            continue
+        crops.append(img[y1:y2, x1:x2])
+        pending.append((i, key))
+
+    if not crops:
+        return ret
+    rec_res, elapse = ocr_engine(lang).text_rec(crops)
+    logger.debug('Batch OCR: %d/%d rects, elapsed=%.3fs', len(crops), len(rects), elapse)
+    for (i, key), (text, score) in zip(pending, rec_res):
+        text = sanitize_text(text)
+        if text and score >= TEXT_SCORE:
+            rect = rects[i]
+            ret[i].append(OcrResult(
+                text=text,
+                rect=Rect(0, 0, rect.w, rect.h),
+                confidence=float(score),
+                original_rect=Rect(*rect.xywh),
+            ))
+        ocr_cache.put(key, ret[i])
+    return ret
@@ -0,0 +1,194 @@
+"""截图预取。在后台线程中持续截图，使截图延迟与图像识别的耗时相互重叠。"""
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+from cv2.typing import MatLike
+
+from kotonebot.client.device import Device
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CapturedFrame:
+    seq: int
+    """序号，从 1 开始递增。"""
+    image: MatLike
+    """截图数据。"""
+    started_at: float
+    """开始截图的时间（`time.monotonic()`）。"""
+    finished_at: float
+    """截图完成的时间（`time.monotonic()`）。"""
+
+
+class ScreenshotPrefetcher:
+    """
+    双缓冲截图预取器。
+
+    启用后，后台线程持续截图并保留最新的一帧；`device.screenshot()` 直接取走这一帧，
+    不再同步等待截图。此时后台线程已经在截取下一帧，
+    因此调用方处理当前帧的同时，下一帧的截图也在进行。
+
+    取帧时遵循以下规则：
+    * 同一帧只会被取走一次。若最新帧已被取走，则等待下一帧。
+    * 在最近一次点击/滑动 **完成** 之前开始截取的帧视为过期，永远不会被返回，
+      保证操作之后的判断一定基于操作之后的画面。
+    * 超过 `idle_timeout` 没有取帧时，后台线程暂停截图，避免空转占用设备资源。
+    * 后台截图出错或等待超时时，退回到同步截图。
+
+    截图通过 `Device` 提供的 `screenshot_hook_before` 接入。
+    `click_hooks_before` 在发送点击之前调用，此时点击尚未生效，
+    因此与滑动一样，替换设备实例上的 `click` 与 `swipe` 方法，在操作返回之后记录。
+    """
+
+    def __init__(
+        self,
+        device: Device,
+        *,
+        idle_timeout: float = 2,
+        wait_timeout: float = 5,
+    ):
+        """
+        :param device: 目标设备。
+        :param idle_timeout: 超过此时间没有取帧时，暂停后台截图。单位秒。
+        :param wait_timeout: 取帧时最长的等待时间。超时后退回同步截图。单位秒。
+        """
+        self.device = device
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self.captured = 0
+        """后台线程截取的总帧数。"""
+        self.consumed = 0
+        """被取走的总帧数。"""
+        self.discarded_stale = 0
+        """因早于最近一次操作而被丢弃的帧数。"""
+        self.__cond = threading.Condition()
+        self.__latest: CapturedFrame | None = None
+        self.__last_consumed_seq = 0
+        self.__last_input = 0.0
+        self.__last_demand = 0.0
+        self.__seq = 0
+        self.__running = False
+        self.__thread: threading.Thread | None = None
+        self.__wrapped: dict[str, Callable] = {}
+
+    @property
+    def running(self) -> bool:
+        return self.__running
+
+    def install(self):
+        """接入设备并启动后台线程。"""
+        if self.__running:
+            return
+        self.__running = True
+        self.__last_demand = time.monotonic()
+        self.device.screenshot_hook_before = self._screenshot_hook
+        self.__wrapped = {}
+        for name in ('click', 'swipe'):
+            self.__wrapped[name] = self.__wrap_input(getattr(self.device, name))
+            setattr(self.device, name, self.__wrapped[name])
+        self.__thread = threading.Thread(target=self.__run, name='kaa-screenshot-prefetch', daemon=True)
+        self.__thread.start()
+        logger.info('Screenshot prefetch enabled.')
+
+    def uninstall(self):
+        """停止后台线程并恢复设备。"""
+        if not self.__running:
+            return
+        with self.__cond:
+            self.__running = False
+            self.__cond.notify_all()
+        if self.device.screenshot_hook_before == self._screenshot_hook:
+            self.device.screenshot_hook_before = None
+        # 若之后又被其他对象（如 SessionRecorder）包装，则保留，由对方负责移除
+        for name, wrapper in self.__wrapped.items():
+            if vars(self.device).get(name) is wrapper:
+                delattr(self.device, name)
+        self.__wrapped = {}
+        if self.__thread is not None:
+            self.__thread.join(timeout=self.wait_timeout)
+            self.__thread = None
+        logger.info('Screenshot prefetch disabled.')
+
+    def mark_input(self):
+        """
+        记录一次输入操作。此前开始截取的帧都将被视为过期。
+        """
+        with self.__cond:
+            self.__last_input = time.monotonic()
+
+    def get(self, timeout: float | None = None) -> CapturedFrame | None:
+        """
+        取走最新的有效帧。
+
+        :param timeout: 最长等待时间。为 None 时使用 `wait_timeout`。
+        :return: 最新的有效帧。超时或预取已停止时返回 None。
+        """
+        timeout = self.wait_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self.__cond:
+            self.__last_demand = time.monotonic()
+            self.__cond.notify_all()
+            while self.__running:
+                frame = self.__latest
+                if frame is not None and frame.seq > self.__last_consumed_seq:
+                    if frame.started_at > self.__last_input:
+                        self.__last_consumed_seq = frame.seq
+                        self.consumed += 1
+                        return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning('Timed out waiting for prefetched screenshot.')
+                    return None
+                self.__cond.wait(remaining)
+            return None
+
+    def _screenshot_hook(self) -> MatLike | None:
+        # 后台线程自身截图时，走正常流程
+        if threading.current_thread() is self.__thread:
+            return None
+        frame = self.get()
+        return frame.image if frame is not None else None
+
+    def __wrap_input(self, original: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            try:
+                return original(*args, **kwargs)
+            finally:
+                # 操作返回（点击已送达、滑动结束）之后开始截取的帧才有效
+                self.mark_input()
+        return wrapper
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                # 长时间没有取帧时暂停
+                while self.__running and time.monotonic() - self.__last_demand > self.idle_timeout:
+                    self.__cond.wait()
+                if not self.__running:
+                    return
+            started_at = time.monotonic()
+            try:
+                # 直接调用类上的方法，绕过其他对象在设备实例上的包装（如 SessionRecorder），
+                # 它们应当只看到调用方实际取走的帧
+                img = type(self.device).screenshot(self.device)
+            except Exception:
+                logger.exception('Prefetch screenshot failed.')
+                time.sleep(0.5)
+                continue
+            finished_at = time.monotonic()
+            with self.__cond:
+                self.__seq += 1
+                self.captured += 1
+                previous = self.__latest
+                if (
+                    previous is not None
+                    and previous.seq > self.__last_consumed_seq
+                    and previous.started_at <= self.__last_input
+                ):
+                    self.discarded_stale += 1
+                self.__latest = CapturedFrame(self.__seq, img, started_at, finished_at)
+                self.__cond.notify_all()
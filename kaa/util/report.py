@@ -0,0 +1,318 @@
+"""
+在后台线程中流式生成错误报告压缩包。
+
+截图的 PNG 编码、日志文件的读取与压缩都在工作线程中进行，调用方（UI、任务线程）不会被阻塞。
+已压缩的内容（PNG、gz 等）以 `ZIP_STORED` 原样存入，文本以较快的压缩等级压缩。
+"""
+import os
+import logging
+import zipfile
+import threading
+from typing import Any, Callable, Generic, Iterable, TypeVar
+
+import cv2
+from cv2.typing import MatLike
+
+from kaa.errors import ReportCancelledError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+ProgressCallback = Callable[[dict[str, Any]], None]
+
+STORED_SUFFIXES = ('.png', '.jpg', '.jpeg', '.webp', '.gz', '.zip', '.7z', '.mp4', '.mkv')
+"""以这些后缀结尾的文件已经压缩过，原样存入。"""
+TEXT_COMPRESS_LEVEL = 1
+"""文本的压缩等级。等级 1 的速度约为等级 9 的数倍，体积只略大一些。"""
+CHUNK_SIZE = 1024 * 1024
+
+
+def _is_compressed(name: str) -> bool:
+    return name.lower().endswith(STORED_SUFFIXES)
+
+
+class ReportJob(Generic[T]):
+    """
+    后台任务的句柄。
+
+    例：
+    ```python
+    job = ReportJob(lambda job: build(job), on_progress=print).start()
+    ...
+    job.cancel()
+    job.wait()  # 返回结果，或抛出任务中的异常
+    ```
+    """
+
+    def __init__(
+        self,
+        target: Callable[['ReportJob[T]'], T],
+        *,
+        on_progress: ProgressCallback | None = None,
+        name: str = 'kaa-report',
+    ):
+        """
+        :param target: 在工作线程中执行的函数，参数为任务句柄本身。
+        :param on_progress: 进度回调。在工作线程中调用。
+        :param name: 工作线程名称。
+        """
+        self.__target = target
+        self.__on_progress = on_progress
+        self.__thread = threading.Thread(target=self.__run, name=name, daemon=True)
+        self.__cancel = threading.Event()
+        self.__done = threading.Event()
+        self.__result: T | None = None
+        self.__error: BaseException | None = None
+        self.progress: dict[str, Any] | None = None
+        """最近一次回报的进度。"""
+
+    @property
+    def done(self) -> bool:
+        return self.__done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已请求取消。"""
+        return self.__cancel.is_set()
+
+    @property
+    def error(self) -> BaseException | None:
+        return self.__error
+
+    def start(self) -> 'ReportJob[T]':
+        self.__thread.start()
+        return self
+
+    def cancel(self):
+        """请求取消。工作线程会在处理下一块数据前停止。"""
+        self.__cancel.set()
+
+    def check_cancelled(self):
+        """
+        在工作线程中调用。已请求取消时抛出 `ReportCancelledError`。
+        """
+        if self.__cancel.is_set():
+            raise ReportCancelledError()
+
+    def report(self, data: dict[str, Any]):
+        """在工作线程中调用，回报进度。"""
+        self.progress = data
+        if self.__on_progress is not None:
+            try:
+                self.__on_progress(data)
+            except Exception:
+                logger.exception('Progress callback failed.')
+
+    def join(self, timeout: float | None = None) -> bool:
+        """
+        等待任务结束。
+
+        :return: 任务是否已结束。
+        """
+        return self.__done.wait(timeout)
+
+    def wait(self, timeout: float | None = None) -> T:
+        """
+        等待任务结束并返回结果。
+
+        :raises TimeoutError: 超时时任务仍未结束。
+        :raises: 任务中抛出的异常。
+        """
+        if not self.__done.wait(timeout):
+            raise TimeoutError('Report job is still running.')
+        if self.__error is not None:
+            raise self.__error
+        return self.__result  # type: ignore
+
+    def __run(self):
+        try:
+            self.__result = self.__target(self)
+        except BaseException as e:
+            self.__error = e
+        finally:
+            self.__done.set()
+
+
+class ReportWriter:
+    """工作线程中使用的写入器，按内容类型选择压缩方式。"""
+
+    def __init__(self, zipf: zipfile.ZipFile, job: ReportJob | None):
+        self.zipf = zipf
+        self.job = job
+
+    def __check(self):
+        if self.job is not None:
+            self.job.check_cancelled()
+
+    def __info(self, name: str, compressed: bool | None, date_time: tuple | None = None) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(name, date_time) if date_time else zipfile.ZipInfo(name)
+        if compressed is None:
+            compressed = _is_compressed(name)
+        if compressed:
+            info.compress_type = zipfile.ZIP_STORED
+        else:
+            info.compress_type = zipfile.ZIP_DEFLATED
+            # ZipInfo 没有公开设置压缩等级的参数，ZipFile.write() 内部也是这样设置的
+            info._compresslevel = TEXT_COMPRESS_LEVEL  # type: ignore
+        return info
+
+    def write_bytes(self, name: str, data: bytes, *, compressed: bool | None = None):
+        """
+        :param compressed: 内容是否已压缩。为 `None` 时按文件名后缀判断。
+        """
+        self.__check()
+        info = self.__info(name, compressed)
+        info.file_size = len(data)
+        with self.zipf.open(info, 'w') as dest:
+            view = memoryview(data)
+            for start in range(0, len(view), CHUNK_SIZE):
+                self.__check()
+                dest.write(view[start:start + CHUNK_SIZE])
+
+    def write_text(self, name: str, text: str):
+        self.write_bytes(name, text.encode('utf-8'), compressed=False)
+
+    def write_image(self, name: str, image: MatLike):
+        """编码为 PNG 后原样存入。"""
+        self.__check()
+        ok, buf = cv2.imencode('.png', image)
+        if not ok:
+            raise ValueError(f'Failed to encode image {name}.')
+        self.write_bytes(name, buf.tobytes(), compressed=True)
+
+    def write_file(self, path: str, name: str | None = None, *, compressed: bool | None = None):
+        """
+        分块读取文件写入压缩包，每块之间检查是否已取消。
+
+        :param name: 压缩包中的名称。为 `None` 时使用 `path`。
+        """
+        self.__check()
+        name = name if name is not None else path
+        base = zipfile.ZipInfo.from_file(path, name)
+        info = self.__info(base.filename, compressed if compressed is not None else _is_compressed(path), base.date_time)
+        info.external_attr = base.external_attr
+        info.file_size = base.file_size
+        with open(path, 'rb') as src, self.zipf.open(info, 'w') as dest:
+            while chunk := src.read(CHUNK_SIZE):
+                self.__check()
+                dest.write(chunk)
+
+
+class ReportBuilder:
+    """
+    错误报告压缩包的构建器。
+
+    调用方线程只登记条目，条目的内容（编码截图、读取日志等）在 `build()` 时才生成。
+
+    例：
+    ```python
+    builder = ReportBuilder()
+    builder.add_text('description.txt', '描述', label='描述文件')
+    builder.add_image('screenshot.png', img, label='截图')
+    builder.add_file('config.json', label='配置文件')
+    job = builder.start('./reports/a.zip', on_progress=print)
+    ```
+    """
+
+    def __init__(self):
+        self.__entries: list[tuple[str, Callable[[ReportWriter], None], bool]] = []
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def add(self, label: str, fn: Callable[[ReportWriter], None], *, optional: bool = False):
+        """
+        登记一个条目。
+
+        :param label: 进度中显示的名称。
+        :param fn: 在工作线程中调用，通过 `ReportWriter` 写入内容。
+        :param optional: 为 True 时，`fn` 出错只记录警告并跳过，不影响整个报告。
+        """
+        self.__entries.append((label, fn, optional))
+
+    def add_text(self, name: str, text: str | Callable[[], str], *, label: str | None = None, optional: bool = False):
+        """:param text: 文本，或在工作线程中生成文本的函数。"""
+        self.add(
+            label or name,
+            lambda w: w.write_text(name, text() if callable(text) else text),
+            optional=optional
+        )
+
+    def add_image(
+        self,
+        name: str,
+        image: MatLike | Callable[[], MatLike | None] | None,
+        *,
+        label: str | None = None,
+        optional: bool = True,
+    ):
+        """
+        :param image: 图像，或返回图像的函数。为 `None` 时跳过。PNG 编码在工作线程中进行。
+        """
+        def write(w: ReportWriter):
+            img = image() if callable(image) else image
+            if img is not None:
+                w.write_image(name, img)
+        self.add(label or name, write, optional=optional)
+
+    def add_file(self, path: str, name: str | None = None, *, label: str | None = None, optional: bool = True):
+        """登记一个文件。文件不存在时跳过。"""
+        def write(w: ReportWriter):
+            if os.path.exists(path):
+                w.write_file(path, name)
+        self.add(label or (name or path), write, optional=optional)
+
+    def add_files(self, label: str, files: Callable[[], Iterable[tuple[str, str]]], *, optional: bool = False):
+        """
+        登记一组文件，列表在工作线程中生成。不存在的文件跳过。
+
+        :param files: 返回 `(路径, 压缩包中的名称)` 的函数。
+        """
+        def write(w: ReportWriter):
+            for path, name in files():
+                if os.path.exists(path):
+                    w.write_file(path, name)
+        self.add(label, write, optional=optional)
+
+    def build(self, path: str, job: ReportJob | None = None, *, total_steps: int | None = None) -> str:
+        """
+        在当前线程中写出压缩包。先写入临时文件，完成后再重命名，取消或出错时删除临时文件。
+
+        :param path: 保存路径。
+        :param job: 任务句柄，用于回报进度与检查取消。
+        :param total_steps: 进度中的总步数。默认为条目数，调用方之后还有其他步骤（如上传）时可以指定更大的值。
+        :return: 保存的路径。
+        """
+        total = total_steps or len(self.__entries)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path + '.part'
+        try:
+            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=TEXT_COMPRESS_LEVEL) as zipf:
+                writer = ReportWriter(zipf, job)
+                for step, (label, fn, optional) in enumerate(self.__entries, start=1):
+                    if job is not None:
+                        job.check_cancelled()
+                        job.report({'type': 'packing', 'item': label, 'step': step, 'total_steps': total})
+                    try:
+                        fn(writer)
+                    except ReportCancelledError:
+                        raise
+                    except Exception as e:
+                        if not optional:
+                            raise
+                        logger.warning(f'Failed to add {label} to report: {e}')
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return path
+
+    def start(self, path: str, *, on_progress: ProgressCallback | None = None) -> ReportJob[str]:
+        """在工作线程中执行 `build()`，返回任务句柄。"""
+        return ReportJob(lambda job: self.build(path, job), on_progress=on_progress).start()
+
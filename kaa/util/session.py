@@ -0,0 +1,503 @@
+"""
+会话录制与回放。
+
+`SessionRecorder` 记录一次真实运行中的每一帧截图与每次点击、滑动：
+截图通过 PyAV 编码为视频，事件写入 JSONL 时间线。
+`ReplayDevice` 按录制的顺序重新提供这些截图，并在任务点击/滑动时前进，
+从而可以离线重放整个任务，作为端到端的性能基准与回归测试。
+
+会话目录结构：
+```
+session/
+    frames.mkv      截图视频。连续相同的截图只编码一次
+    timeline.jsonl  时间线。第一行为会话信息，之后每行一个事件
+```
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Iterator, Literal, TypedDict, cast
+
+import numpy as np
+from cv2.typing import MatLike
+
+from kotonebot.client.device import Device
+from kaa.errors import ReplayDivergedError, ReplayExhaustedError
+
+logger = logging.getLogger(__name__)
+
+SESSION_VERSION = 1
+FRAMES_FILE = 'frames.mkv'
+TIMELINE_FILE = 'timeline.jsonl'
+
+SessionCodec = Literal['ffv1', 'libx264rgb']
+"""
+截图视频的编码。两者都是无损编码，保证回放时识别结果与录制时一致。
+
+* ffv1: 编码快，文件较大。
+* libx264rgb: 编码较慢，静止画面多时文件小得多。
+"""
+_CODEC_OPTIONS: dict[str, tuple[str, dict[str, str]]] = {
+    'ffv1': ('bgr0', {}),
+    'libx264rgb': ('bgr24', {'crf': '0', 'preset': 'veryfast'}),
+}
+
+
+class SessionHeader(TypedDict):
+    type: Literal['session']
+    version: int
+    width: int
+    height: int
+    codec: str
+    created: str
+
+
+class FrameEvent(TypedDict):
+    type: Literal['frame']
+    t: float
+    """距离录制开始的时间，单位秒。"""
+    index: int
+    """视频中的帧序号。"""
+
+
+class ClickEvent(TypedDict):
+    type: Literal['click']
+    t: float
+    x: int
+    y: int
+
+
+class SwipeEvent(TypedDict):
+    type: Literal['swipe']
+    t: float
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+    duration: float | None
+
+
+SessionEvent = FrameEvent | ClickEvent | SwipeEvent
+
+
+class SessionRecorder:
+    """
+    录制设备上的截图与输入事件。
+
+    接入方式与 `ScreenshotPrefetcher` 相同：点击通过 `click_hooks_before` 记录，
+    截图与滑动没有合适的钩子，因此会包装设备实例上的 `screenshot` 与 `swipe`。
+    记录的是调用方实际拿到的截图（已缩放到目标分辨率）与逻辑坐标。
+
+    视频在后台线程中编码，不阻塞任务执行。
+
+    例：
+    ```python
+    with SessionRecorder(device, 'sessions/produce'):
+        do_produce(...)
+    ```
+    """
+
+    def __init__(self, device: Device, path: str, *, codec: SessionCodec = 'ffv1'):
+        """
+        :param device: 目标设备。
+        :param path: 会话目录。已有的会话会被覆盖。
+        :param codec: 截图视频的编码。
+        """
+        self.device = device
+        self.path = path
+        self.codec = codec
+        self.frames = 0
+        """已编码的（不重复的）帧数。"""
+        self.events = 0
+        """已记录的事件数。"""
+        self.__lock = threading.Lock()
+        self.__queue: queue.Queue[MatLike | None] = queue.Queue(maxsize=64)
+        self.__writer: threading.Thread | None = None
+        self.__timeline = None
+        self.__start = 0.0
+        self.__last_frame: MatLike | None = None
+        self.__active = False
+        self.__wrapped: dict[str, Callable] = {}
+
+    @property
+    def active(self) -> bool:
+        return self.__active
+
+    def install(self) -> 'SessionRecorder':
+        """接入设备，开始录制。"""
+        if self.__active:
+            return self
+        os.makedirs(self.path, exist_ok=True)
+        self.__timeline = open(os.path.join(self.path, TIMELINE_FILE), 'w', encoding='utf-8')
+        self.__start = time.monotonic()
+        self.__active = True
+        self.__writer = threading.Thread(target=self.__write_frames, name='kaa-session-recorder', daemon=True)
+        self.__writer.start()
+
+        original_screenshot = self.device.screenshot
+        original_swipe = self.device.swipe
+        def screenshot() -> MatLike:
+            img = original_screenshot()
+            if self.__active:
+                self.record_frame(img)
+            return img
+        def swipe(x1: int, y1: int, x2: int, y2: int, duration: float | None = None, **kwargs):
+            if self.__active:
+                self.record_swipe(x1, y1, x2, y2, duration)
+            return original_swipe(x1, y1, x2, y2, duration, **kwargs)
+        self.__wrapped = {'screenshot': screenshot, 'swipe': swipe}
+        self.device.screenshot = screenshot  # type: ignore[method-assign]
+        self.device.swipe = swipe  # type: ignore[method-assign]
+        self.device.click_hooks_before.append(self._click_hook)
+        logger.info('Session recording started: %s', self.path)
+        return self
+
+    def close(self):
+        """停止录制，等待视频编码完成。"""
+        if not self.__active:
+            return
+        self.__active = False
+        if self._click_hook in self.device.click_hooks_before:
+            self.device.click_hooks_before.remove(self._click_hook)
+        # 包装函数在停用后直接透传。若没有被其他包装覆盖，则移除
+        for name, wrapper in self.__wrapped.items():
+            if vars(self.device).get(name) is wrapper:
+                delattr(self.device, name)
+        self.__wrapped = {}
+        self.__queue.put(None)
+        if self.__writer is not None:
+            self.__writer.join()
+            self.__writer = None
+        with self.__lock:
+            if self.__timeline is not None:
+                self.__timeline.close()
+                self.__timeline = None
+        logger.info('Session recording stopped: %d frames, %d events.', self.frames, self.events)
+
+    def __enter__(self) -> 'SessionRecorder':
+        return self.install()
+
+    def __exit__(self, *_):
+        self.close()
+
+    def record_frame(self, img: MatLike):
+        with self.__lock:
+            last = self.__last_frame
+            if last is not None and last.shape == img.shape and np.array_equal(last, img):
+                index = self.frames - 1
+            else:
+                if last is None:
+                    h, w = img.shape[:2]
+                    self.__write_event(cast(SessionHeader, {
+                        'type': 'session',
+                        'version': SESSION_VERSION,
+                        'width': w,
+                        'height': h,
+                        'codec': self.codec,
+                        'created': datetime.now().isoformat(),
+                    }))
+                # 调用方可能会原地修改截图（例如绘制调试信息），因此保存副本
+                frame = img.copy()
+                self.__last_frame = frame
+                index = self.frames
+                self.frames += 1
+                self.__queue.put(frame)
+            self.__write_event(FrameEvent(type='frame', t=self.__now(), index=index))
+
+    def record_click(self, x: int, y: int):
+        with self.__lock:
+            self.__write_event(ClickEvent(type='click', t=self.__now(), x=int(x), y=int(y)))
+
+    def record_swipe(self, x1: int, y1: int, x2: int, y2: int, duration: float | None = None):
+        with self.__lock:
+            self.__write_event(SwipeEvent(
+                type='swipe', t=self.__now(),
+                x1=int(x1), y1=int(y1), x2=int(x2), y2=int(y2), duration=duration
+            ))
+
+    def _click_hook(self, x: int, y: int) -> tuple[int, int]:
+        if self.__active:
+            self.record_click(x, y)
+        return x, y
+
+    def __now(self) -> float:
+        return round(time.monotonic() - self.__start, 4)
+
+    def __write_event(self, event: SessionHeader | SessionEvent):
+        # 截图之前的输入没有画面可以对应，忽略
+        if self.__timeline is None or (self.__last_frame is None and event['type'] != 'session'):
+            return
+        self.__timeline.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self.__timeline.flush()
+        self.events += 1
+
+    def __write_frames(self):
+        import av
+        pix_fmt, options = _CODEC_OPTIONS[self.codec]
+        container = None
+        stream = None
+        try:
+            while True:
+                img = self.__queue.get()
+                if img is None:
+                    break
+                if container is None:
+                    h, w = img.shape[:2]
+                    container = av.open(os.path.join(self.path, FRAMES_FILE), 'w')
+                    stream = container.add_stream(self.codec, rate=1, options=options)
+                    stream.width = w
+                    stream.height = h
+                    stream.pix_fmt = pix_fmt
+                assert stream is not None
+                frame = av.VideoFrame.from_ndarray(img, format='bgr24')
+                for packet in stream.encode(frame):
+                    container.mux(packet)
+        except Exception:
+            logger.exception('Failed to encode session frames.')
+        finally:
+            if container is not None and stream is not None:
+                for packet in stream.encode():
+                    container.mux(packet)
+                container.close()
+
+
+class Session:
+    """已录制的会话。"""
+
+    def __init__(self, path: str, header: SessionHeader, events: list[SessionEvent]):
+        self.path = path
+        self.header = header
+        self.events = events
+
+    @staticmethod
+    def load(path: str) -> 'Session':
+        """读取会话目录。"""
+        with open(os.path.join(path, TIMELINE_FILE), 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if not lines or lines[0].get('type') != 'session':
+            raise ValueError(f'Invalid session timeline: {path}')
+        header = cast(SessionHeader, lines[0])
+        if header['version'] != SESSION_VERSION:
+            raise ValueError(f'Unsupported session version: {header["version"]}')
+        return Session(path, header, cast(list[SessionEvent], lines[1:]))
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.header['width'], self.header['height']
+
+    @property
+    def duration(self) -> float:
+        """录制时长，单位秒。"""
+        return self.events[-1]['t'] if self.events else 0
+
+    def inputs(self) -> list[ClickEvent | SwipeEvent]:
+        return [e for e in self.events if e['type'] != 'frame']  # type: ignore[misc]
+
+    def frames(self) -> Iterator[MatLike]:
+        """按顺序解码视频中的所有帧。"""
+        import av
+        with av.open(os.path.join(self.path, FRAMES_FILE), 'r') as container:
+            for frame in container.decode(video=0):
+                yield frame.to_ndarray(format='bgr24')
+
+
+class _FrameReader:
+    """只能向前移动的视频帧读取器。只在内存中保留当前帧。"""
+
+    def __init__(self, session: Session):
+        self.__frames = session.frames()
+        self.__index = -1
+        self.__current: MatLike | None = None
+
+    def get(self, index: int) -> MatLike:
+        if index < self.__index:
+            raise ValueError(f'Cannot seek backwards: {index} < {self.__index}')
+        while self.__index < index:
+            self.__current = next(self.__frames)
+            self.__index += 1
+        assert self.__current is not None
+        # 调用方可能会修改截图，返回副本
+        return self.__current.copy()
+
+
+class _ReplayScreen:
+    def __init__(self, device: 'ReplayDevice'):
+        self.device = device
+
+    @property
+    def screen_size(self) -> tuple[int, int]:
+        return self.device.session.size
+
+    def detect_orientation(self) -> Literal['portrait', 'landscape'] | None:
+        w, h = self.screen_size
+        return 'portrait' if h >= w else 'landscape'
+
+    def screenshot(self) -> MatLike:
+        return self.device._next_frame()
+
+
+class _ReplayTouch:
+    def __init__(self, device: 'ReplayDevice'):
+        self.device = device
+
+    def click(self, x: int, y: int) -> None:
+        self.device._input(ClickEvent(type='click', t=0, x=x, y=y))
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: float | None = None) -> None:
+        self.device._input(SwipeEvent(type='swipe', t=0, x1=x1, y1=y1, x2=x2, y2=y2, duration=duration))
+
+
+class ReplayDevice(Device):
+    """
+    回放已录制会话的设备。
+
+    有两种推进方式：
+
+    * `input`：按录制顺序依次返回截图。录制中两次输入之间的截图用完后，
+      重复返回最后一帧，直到任务执行了下一次点击/滑动，再跳到录制中该输入之后的截图。
+      截图不受真实时间限制，因此回放通常快于实际运行。
+    * `time`：按经过的时间（乘以 `speed`）返回录制中对应时刻的截图，输入不影响进度。
+
+    回放中的输入与录制不一致时，记录到 `divergences`；`strict` 为 True 时抛出
+    `ReplayDivergedError`。任务在录制结束后仍继续截图时，抛出 `ReplayExhaustedError`。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        mode: Literal['input', 'time'] = 'input',
+        speed: float = 1,
+        click_tolerance: int = 48,
+        strict: bool = False,
+        max_idle_screenshots: int = 300,
+    ):
+        """
+        :param path: 会话目录。
+        :param mode: 推进方式。
+        :param speed: `time` 模式下的回放速度倍数。
+        :param click_tolerance: 点击坐标与录制相差不超过此值（像素）时视为一致。
+            kaa 点击矩形时会在中心附近随机取点，因此需要一定容差。
+        :param strict: 输入与录制不一致时是否抛出异常。
+        :param max_idle_screenshots: `input` 模式下，等待下一次输入期间最多重复返回同一帧的次数。
+            超过后视为任务卡住，抛出 `ReplayExhaustedError`。
+        """
+        super().__init__('replay')
+        self.session = Session.load(path)
+        self.mode = mode
+        self.speed = speed
+        self.click_tolerance = click_tolerance
+        self.strict = strict
+        self.max_idle_screenshots = max_idle_screenshots
+        self.divergences: list[str] = []
+        """回放与录制不一致的地方。"""
+        self.screenshots = 0
+        """已返回的截图数。"""
+        self.inputs = 0
+        """收到的输入数。"""
+        self._screenshot = _ReplayScreen(self)
+        self._touch = _ReplayTouch(self)
+        self.__reader = _FrameReader(self.session)
+        self.__pos = 0
+        self.__current = -1
+        self.__idle = 0
+        self.__started_at: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        """录制中的事件是否已全部回放。"""
+        return self.__pos >= len(self.session.events)
+
+    def _next_frame(self) -> MatLike:
+        self.screenshots += 1
+        if self.mode == 'time':
+            return self.__frame_by_time()
+        events = self.session.events
+        if self.__pos < len(events) and events[self.__pos]['type'] == 'frame':
+            self.__current = cast(FrameEvent, events[self.__pos])['index']
+            self.__pos += 1
+            self.__idle = 0
+        else:
+            # 录制中此处是一次输入（或已结束），任务还在等待画面变化
+            self.__idle += 1
+            if self.__idle > self.max_idle_screenshots or (self.finished and self.__current >= 0 and self.__idle > 1):
+                raise ReplayExhaustedError(self.__pos, len(events))
+        if self.__current < 0:
+            raise ReplayExhaustedError(self.__pos, len(events))
+        return self.__reader.get(self.__current)
+
+    def __frame_by_time(self) -> MatLike:
+        now = time.monotonic()
+        if self.__started_at is None:
+            self.__started_at = now
+        elapsed = (now - self.__started_at) * self.speed
+        events = self.session.events
+        while self.__pos < len(events) and events[self.__pos]['t'] <= elapsed:
+            if events[self.__pos]['type'] == 'frame':
+                self.__current = cast(FrameEvent, events[self.__pos])['index']
+            self.__pos += 1
+        if self.__current < 0:
+            # 还没到第一帧
+            self.__current = next(cast(FrameEvent, e)['index'] for e in events if e['type'] == 'frame')
+        if self.finished and elapsed > self.session.duration + 1:
+            raise ReplayExhaustedError(self.__pos, len(events))
+        return self.__reader.get(self.__current)
+
+    def _input(self, actual: ClickEvent | SwipeEvent):
+        self.inputs += 1
+        if self.mode == 'time':
+            return
+        events = self.session.events
+        # 跳过录制中剩余的截图，找到对应的输入
+        while self.__pos < len(events) and events[self.__pos]['type'] == 'frame':
+            self.__current = cast(FrameEvent, events[self.__pos])['index']
+            self.__pos += 1
+        self.__idle = 0
+        if self.__pos >= len(events):
+            self.__diverge(f'Unexpected {actual["type"]} after the end of recording: {self.__describe(actual)}')
+            return
+        expected = cast(ClickEvent | SwipeEvent, events[self.__pos])
+        self.__pos += 1
+        if not self.__matches(expected, actual):
+            self.__diverge(
+                f'Input #{self.inputs} differs: expected {self.__describe(expected)}, got {self.__describe(actual)}'
+            )
+
+    def __matches(self, expected: ClickEvent | SwipeEvent, actual: ClickEvent | SwipeEvent) -> bool:
+        if expected['type'] != actual['type']:
+            return False
+        tol = self.click_tolerance
+        if expected['type'] == 'click':
+            actual = cast(ClickEvent, actual)
+            return abs(expected['x'] - actual['x']) <= tol and abs(expected['y'] - actual['y']) <= tol
+        expected = cast(SwipeEvent, expected)
+        actual = cast(SwipeEvent, actual)
+        return all(abs(expected[k] - actual[k]) <= tol for k in ('x1', 'y1', 'x2', 'y2'))  # type: ignore[literal-required]
+
+    @staticmethod
+    def __describe(event: ClickEvent | SwipeEvent) -> str:
+        if event['type'] == 'click':
+            event = cast(ClickEvent, event)
+            return f'click({event["x"]}, {event["y"]})'
+        event = cast(SwipeEvent, event)
+        return f'swipe({event["x1"]}, {event["y1"]} -> {event["x2"]}, {event["y2"]})'
+
+    def __diverge(self, message: str):
+        logger.warning('Replay diverged: %s', message)
+        self.divergences.append(message)
+        if self.strict:
+            raise ReplayDivergedError(message)
+
+    def stats(self) -> dict[str, Any]:
+        """回放统计。"""
+        return {
+            'screenshots': self.screenshots,
+            'inputs': self.inputs,
+            'recorded_inputs': len(self.session.inputs()),
+            'divergences': len(self.divergences),
+            'finished': self.finished,
+        }
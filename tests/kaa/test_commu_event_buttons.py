@@ -0,0 +1,174 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from kotonebot.primitives import Rect
+from kaa.game_ui import commu_event_buttons
+from kaa.game_ui.commu_event_buttons import CommuDescriptionStore, CommuEventButtonUI, EventButton
+
+class TestCommuDescriptionStore(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'commu_descriptions.json')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        store = CommuDescriptionStore(self.path)
+        event = store.event_key(['山です', '海です', '咲季さんとおなじです'])
+        self.assertIsNone(store.get(event, '山です'))
+        store.put(event, '山です', '体力回復')
+        store.save()
+
+        store = CommuDescriptionStore(self.path)
+        self.assertEqual(store.get(event, '山です'), '体力回復')
+        self.assertIsNone(store.get(event, '海です'))
+        # 按钮标题相同但事件不同
+        other = store.event_key(['山です', '海です'])
+        self.assertIsNone(store.get(other, '山です'))
+
+    def test_corrupted_file(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{')
+        store = CommuDescriptionStore(self.path)
+        self.assertEqual(store.events, {})
+
+
+class _Line:
+    def __init__(self, text: str):
+        self.text = text
+
+    def squash(self):
+        return self
+
+
+class _FakeCommu:
+    """
+    模拟交流事件画面。截图中只记录选中按钮的序号，
+    点击按钮后选中状态转移到该按钮。
+    """
+    def __init__(self, buttons: list[tuple[str, str]], selected: int | None = None):
+        self.rects = [Rect(100, 300 + i * 150, 500, 100) for i in range(len(buttons))]
+        self.titles = [title for title, _ in buttons]
+        self.descriptions = [desc for _, desc in buttons]
+        self.selected = selected
+        self.clicks: list[int] = []
+
+    def screenshot(self):
+        return np.full((1, 1), -1 if self.selected is None else self.selected, dtype=np.int16)
+
+    def click(self, rect: Rect):
+        i = self.rects.index(rect)
+        self.clicks.append(i)
+        self.selected = i
+
+    @staticmethod
+    def _selected_of(img) -> int | None:
+        value = int(img[0, 0])
+        return None if value < 0 else value
+
+    # CommuEventButtonUI.filter
+    def update(self, img):
+        self.__img = img
+        return self
+
+    def rectangles(self, *_):
+        selected = self._selected_of(self.__img)
+        return [r for i, r in enumerate(self.rects) if i != selected]
+
+    # CommuEventButtonUI._selected_rect
+    def selected_rect(self, img) -> Rect | None:
+        selected = self._selected_of(img)
+        return None if selected is None else self.rects[selected]
+
+    # CommuEventButtonUI.description
+    def description(self, img) -> str:
+        selected = self._selected_of(img)
+        assert selected is not None
+        return self.descriptions[selected]
+
+    def ocr_batch(self, img, rects):
+        return [_Line(self.titles[self.rects.index(r)]) for r in rects]
+
+
+class TestCommuEventButtonUICached(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = CommuDescriptionStore(os.path.join(self.dir.name, 'commu_descriptions.json'))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_all(self, screen: _FakeCommu) -> list[EventButton]:
+        ui = CommuEventButtonUI()
+        ui.filter = screen  # type: ignore
+        ui._selected_rect = screen.selected_rect  # type: ignore
+        ui.description = screen.description  # type: ignore
+        with patch.object(commu_event_buttons, 'device', screen), \
+                patch.object(commu_event_buttons, 'ocr_batch', screen.ocr_batch), \
+                patch.object(commu_event_buttons, 'description_store', lambda: self.store), \
+                patch.object(commu_event_buttons, 'sleep', lambda *_: None):
+            return ui.all(cached=True)
+
+    def lesson(self, selected: int | None = None) -> _FakeCommu:
+        return _FakeCommu([
+            ('ボーカルレッスン', 'ボーカル+30'),
+            ('ダンスレッスン', 'ダンス+15'),
+            ('ビジュアルレッスン', 'ビジュアル+15'),
+        ], selected)
+
+    def test_miss_clicks_unseen(self):
+        """测试没有缓存时点击除当前选中按钮外的所有按钮"""
+        screen = self.lesson(selected=1)
+        buttons = self.run_all(screen)
+        self.assertEqual(screen.clicks, [0, 2])
+        self.assertEqual([b.description for b in buttons], ['ボーカル+30', 'ダンス+15', 'ビジュアル+15'])
+        self.assertEqual([b.selected for b in buttons], [False, False, True])
+
+    def test_hit_no_clicks(self):
+        """测试所有描述都已缓存时不点击任何按钮，选中状态与画面一致"""
+        self.run_all(self.lesson(selected=1))
+        screen = self.lesson(selected=2)
+        buttons = self.run_all(screen)
+        self.assertEqual(screen.clicks, [])
+        self.assertEqual([b.description for b in buttons], ['ボーカル+30', 'ダンス+15', 'ビジュアル+15'])
+        self.assertEqual([b.selected for b in buttons], [False, False, True])
+
+    def test_partial_hit(self):
+        """测试只点击缓存中没有的按钮"""
+        screen = self.lesson(selected=None)
+        event = self.store.event_key(screen.titles)
+        self.store.put(event, 'ボーカルレッスン', 'ボーカル+30')
+        self.store.put(event, 'ビジュアルレッスン', 'ビジュアル+15')
+        buttons = self.run_all(screen)
+        self.assertEqual(screen.clicks, [1])
+        self.assertEqual([b.description for b in buttons], ['ボーカル+30', 'ダンス+15', 'ビジュアル+15'])
+        self.assertEqual([b.selected for b in buttons], [False, True, False])
+
+    def test_key_is_event_and_button_title(self):
+        """测试按（事件，按钮标题）缓存：按钮标题相同但所在事件不同时不命中"""
+        self.run_all(self.lesson(selected=0))
+        # 另一个事件中有同名按钮，描述不同
+        screen = _FakeCommu([
+            ('ボーカルレッスン', 'ボーカル+15'),
+            ('ダンスレッスン', 'ダンス+30'),
+        ], selected=None)
+        buttons = self.run_all(screen)
+        self.assertEqual(screen.clicks, [0, 1])
+        self.assertEqual([b.description for b in buttons], ['ボーカル+15', 'ダンス+30'])
+        event = self.store.event_key(self.lesson().titles)
+        self.assertEqual(self.store.get(event, 'ボーカルレッスン'), 'ボーカル+30')
+
+    def test_unreadable_title_skips_cache(self):
+        """测试有按钮标题识别失败时不读写缓存"""
+        self.run_all(self.lesson(selected=0))
+        screen = self.lesson(selected=0)
+        screen.titles[1] = ''
+        buttons = self.run_all(screen)
+        self.assertEqual(screen.clicks, [1, 2])
+        self.assertEqual([b.description for b in buttons], ['ボーカル+30', 'ダンス+15', 'ビジュアル+15'])
+        self.assertNotIn(self.store.event_key(screen.titles), self.store.events)
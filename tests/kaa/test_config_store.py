@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pydantic import ValidationError
+
+from kotonebot.config.base_config import RootConfig, UserConfig
+
+from kaa.config.schema import BaseConfig
+from kaa.config.migrations import LATEST_VERSION
+from kaa.config.store import ConfigStore, StoreContextConfig
+
+
+class TestConfigStore(TestCase):
+    """测试 ConfigStore 类"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'config.json')
+        root = RootConfig[BaseConfig](version=LATEST_VERSION, user_configs=[UserConfig(options=BaseConfig())])
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            f.write(root.model_dump_json(indent=4))
+        self.store = ConfigStore(self.config_path, write_delay=0.2, max_write_delay=1)
+        self.events = []
+        self.store.subscribe(self.events.append)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_file(self) -> dict:
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_parse_once(self):
+        """测试多次读取只解析一次配置文件"""
+        for _ in range(10):
+            self.store.user(0)
+            self.store.options(0)
+        self.assertEqual(self.store.loads, 1)
+        self.assertIs(self.store.options(0), self.store.root.user_configs[0].options)
+
+    def test_commit_events(self):
+        """测试提交时发布字段级变更事件"""
+        self.store.options().misc.log_level = 'verbose'
+        version = self.store.version
+        self.store.user().backend.adb_port = 16384
+        event = self.store.commit(source=self)
+
+        assert event is not None
+        self.assertEqual(event.version, version + 1)
+        self.assertIs(event.source, self)
+        self.assertEqual(self.events, [event])
+        paths = {c.path: (c.old, c.new) for c in event.changes}
+        self.assertEqual(paths, {
+            'options.misc.log_level': ('debug', 'verbose'),
+            'backend.adb_port': (5555, 16384),
+        })
+        self.assertTrue(event.touches('backend'))
+        self.assertTrue(event.touches('options.misc'))
+        self.assertFalse(event.touches('options.produce'))
+        self.assertFalse(event.touches('options.misc.log'))
+        # 已写入磁盘
+        user = self.read_file()['user_configs'][0]
+        self.assertEqual(user['options']['misc']['log_level'], 'verbose')
+        self.assertEqual(user['backend']['adb_port'], 16384)
+
+    def test_commit_without_changes(self):
+        """测试没有变更时不写入也不通知"""
+        self.store.root
+        mtime = os.stat(self.config_path).st_mtime_ns
+        self.assertIsNone(self.store.commit())
+        self.assertEqual(self.events, [])
+        self.assertEqual(os.stat(self.config_path).st_mtime_ns, mtime)
+
+    def test_subscribe_prefix(self):
+        """测试按字段前缀订阅与取消订阅"""
+        backend_events = []
+        unsubscribe = self.store.subscribe(backend_events.append, 'backend')
+        self.store.options().produce.produce_count = 3
+        self.store.commit()
+        self.assertEqual(backend_events, [])
+        self.store.user().backend.adb_ip = '127.0.0.2'
+        self.store.commit()
+        self.assertEqual(len(backend_events), 1)
+        unsubscribe()
+        self.store.user().backend.adb_ip = '127.0.0.3'
+        self.store.commit()
+        self.assertEqual(len(backend_events), 1)
+        self.assertEqual(len(self.events), 3)
+
+    def test_listener_error(self):
+        """测试订阅者出错不影响提交与其他订阅者"""
+        def broken(_):
+            raise RuntimeError('broken')
+        self.store.subscribe(broken)
+        after = []
+        self.store.subscribe(after.append)
+        self.store.options().produce.produce_count = 2
+        self.assertIsNotNone(self.store.commit())
+        self.assertEqual(len(after), 1)
+
+    def test_discard(self):
+        """测试丢弃未提交的修改时保留对象本身"""
+        options = self.store.options()
+        misc = options.misc
+        misc.log_level = 'verbose'
+        options.produce.produce_count = 5
+        self.store.discard()
+        self.assertIs(self.store.options(), options)
+        self.assertIs(options.misc, misc)
+        self.assertEqual(misc.log_level, 'debug')
+        self.assertEqual(options.produce.produce_count, 1)
+        self.assertIsNone(self.store.commit())
+
+    def test_commit_invalid_rolls_back(self):
+        """测试提交未通过校验时还原共享的配置，且不通知订阅者、不写入磁盘"""
+        options = self.store.options()
+        before = self.read_file()
+        options.misc.log_level = 'verbose'
+        options.produce.produce_count = 'abc'  # type: ignore
+        with self.assertRaises(ValidationError):
+            self.store.commit()
+        self.assertIs(self.store.options(), options)
+        self.assertEqual(options.produce.produce_count, 1)
+        self.assertEqual(options.misc.log_level, 'debug')
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.read_file(), before)
+        # 之后的有效修改可以正常提交
+        options.produce.produce_count = 3
+        self.assertIsNotNone(self.store.commit())
+        self.assertEqual(self.read_file()['user_configs'][0]['options']['produce']['produce_count'], 3)
+
+    def test_reload(self):
+        """测试从磁盘重新加载时原地更新并发布差异"""
+        options = self.store.options()
+        data = self.read_file()
+        data['user_configs'][0]['options']['produce']['produce_count'] = 7
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        event = self.store.load()
+        assert event is not None
+        self.assertIs(self.store.options(), options)
+        self.assertEqual(options.produce.produce_count, 7)
+        self.assertEqual([c.path for c in event.changes], ['options.produce.produce_count'])
+        self.assertEqual(self.store.loads, 2)
+
+    def test_context_config(self):
+        """测试 Context 中的配置读写经由 ConfigStore"""
+        ctx_config = StoreContextConfig(None, self.store)
+        self.assertIs(ctx_config.current.options, self.store.options())
+        ctx_config.current.options.start_game.dmm_game_path = 'C:/gakumas.exe'
+        ctx_config.save()
+        self.assertEqual(len(self.events), 1)
+        self.assertIs(self.events[0].source, ctx_config)
+        self.assertEqual(self.store.loads, 1)
+
+    def test_deferred_commits_coalesce(self):
+        """测试连续的延迟提交只写入一次"""
+        options = self.store.options()
+        for i in range(10):
+            options.produce.produce_count = i + 2
+            self.assertIsNotNone(self.store.commit(defer=True))
+        # 订阅者立即收到每次提交
+        self.assertEqual(len(self.events), 10)
+        self.assertEqual(self.store.status, 'pending')
+        self.assertEqual(self.store.writes, 0)
+        self.assertEqual(self.read_file()['user_configs'][0]['options']['produce']['produce_count'], 1)
+
+        deadline = time.monotonic() + 5
+        while self.store.status != 'saved' and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.store.status, 'saved')
+        self.assertEqual(self.store.writes, 1)
+        self.assertEqual(self.store.saved_version, self.store.version)
+        self.assertEqual(self.read_file()['user_configs'][0]['options']['produce']['produce_count'], 11)
+        self.assertEqual([f for f in os.listdir(self.temp_dir) if f.endswith('.part')], [])
+
+    def test_flush(self):
+        """测试立即写入延迟中的提交"""
+        self.store.options().misc.log_level = 'verbose'
+        self.store.commit(defer=True)
+        self.assertTrue(self.store.flush())
+        self.assertEqual(self.store.status, 'saved')
+        self.assertEqual(self.read_file()['user_configs'][0]['options']['misc']['log_level'], 'verbose')
+        # 之后的后台写入没有需要写入的内容
+        time.sleep(0.4)
+        self.assertEqual(self.store.writes, 1)
+
+    def test_write_error(self):
+        """测试写入失败时记录错误，修复后重试"""
+        self.store.options().misc.log_level = 'verbose'
+        os.chmod(self.temp_dir, 0o500)
+        try:
+            if os.access(self.temp_dir, os.W_OK):
+                self.skipTest('Directory permissions are not enforced.')
+            with self.assertRaises(OSError):
+                self.store.commit()
+            self.assertEqual(self.store.status, 'error')
+            self.assertEqual(len(self.events), 1)
+        finally:
+            os.chmod(self.temp_dir, 0o700)
+        self.assertTrue(self.store.flush())
+        self.assertEqual(self.store.status, 'saved')
+        self.assertEqual(self.read_file()['user_configs'][0]['options']['misc']['log_level'], 'verbose')
+
+    def test_subscribe_status(self):
+        """测试写入完成后通知写入状态"""
+        statuses = []
+        unsubscribe = self.store.subscribe_status(statuses.append)
+        self.store.options().misc.log_level = 'verbose'
+        self.store.commit(defer=True)
+        self.assertEqual(statuses, [])
+        self.assertTrue(self.store.flush())
+        self.assertEqual(statuses, ['saved'])
+        unsubscribe()
+        self.store.options().misc.log_level = 'debug'
+        self.store.commit()
+        self.assertEqual(statuses, ['saved'])
@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+import numpy as np
+from adbutils import AdbClient
+
+from kaa.util.device_bench import FAKE_SERIAL, FakeAdbServer, bench_fake_device
+
+
+def _frames():
+    frames = []
+    for i in range(3):
+        img = np.zeros((160, 90, 3), dtype=np.uint8)
+        img[:, :, i] = 255
+        frames.append(img)
+    return frames
+
+
+class TestFakeAdbServer(TestCase):
+    def setUp(self):
+        self.frames = _frames()
+        self.server = FakeAdbServer(self.frames).start()
+        self.device = AdbClient(host=self.server.host, port=self.server.port).device(FAKE_SERIAL)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_devices(self):
+        client = AdbClient(host=self.server.host, port=self.server.port)
+        self.assertEqual([d.serial for d in client.device_list()], [FAKE_SERIAL])
+
+    def test_screenshot_cycles_frames(self):
+        for frame in self.frames + self.frames[:1]:
+            img = np.array(self.device.screenshot())[:, :, ::-1]
+            self.assertTrue(np.array_equal(img, frame))
+
+    def test_shell(self):
+        self.assertEqual(self.device.shell('wm size'), 'Physical size: 90x160')
+        self.device.shell('input tap 1 1')
+        self.assertEqual(self.server.inputs, 1)
+
+    def test_push(self):
+        self.device.push(b'screencap\n', '/data/local/tmp/a.sh')
+        self.assertEqual(self.server.files['/data/local/tmp/a.sh'], b'screencap\n')
+
+
+class TestBenchFakeDevice(TestCase):
+    def test_adb(self):
+        results = bench_fake_device(['adb'], _frames(), samples=5, warmup=1, clicks=2)
+        self.assertEqual(len(results), 1)
+        r = results[0]
+        self.assertIsNone(r.error)
+        self.assertEqual(r.resolution, (90, 160))
+        assert r.screenshot_ms is not None and r.click_ms is not None
+        self.assertLessEqual(r.screenshot_ms.p50, r.screenshot_ms.max)
+        self.assertIsNotNone(r.fps)
+        self.assertIsNotNone(r.decode_ms)
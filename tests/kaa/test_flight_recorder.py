@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import shutil
+import zipfile
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from util import FakeDevice, solid
+from kaa.util.flight_recorder import FlightRecorder
+from kaa.util.report import ReportBuilder
+
+
+def _device() -> FakeDevice:
+    # 每两帧变化一次，用于验证重复帧只保存一次
+    return FakeDevice(lambda i: solid((160, 90), (0, (i // 2) * 40 % 256, 0)), size=(90, 160))
+
+
+class TestFlightRecorder(TestCase):
+    def setUp(self):
+        self.device = _device()
+        self.recorder = FlightRecorder(scale=1, min_interval=0, max_load=1)
+
+    def tearDown(self):
+        self.recorder.uninstall()
+
+    def capture(self, n: int):
+        for _ in range(n):
+            self.device.screenshot()
+            # 等待后台线程处理完，避免帧被合并丢弃
+            deadline = time.monotonic() + 5
+            r = self.recorder
+            while r.captured > r.encoded + r.dropped + r.merged and time.monotonic() < deadline:
+                time.sleep(0.005)
+
+    def test_record(self):
+        """测试记录截图与操作，相同的截图合并为一帧，断开后恢复设备"""
+        self.recorder.install(self.device)
+        self.capture(4)
+        self.device.click(10, 20)
+        self.device.swipe(1, 2, 3, 4)
+        snapshot = self.recorder.snapshot()
+        self.assertEqual(len(snapshot.frames), 2)
+        self.assertEqual([len(times) for _, times in snapshot.frames], [2, 2])
+        self.assertEqual([e['type'] for e in snapshot.events], ['click', 'swipe'])
+        img = cv2.imdecode(np.frombuffer(snapshot.frames[1][0], np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(img.shape, (160, 90, 3))
+        self.assertAlmostEqual(int(img[:, :, 1].mean()), 40, delta=2)
+
+        self.recorder.uninstall()
+        self.assertNotIn('screenshot', vars(self.device))
+        self.assertNotIn('swipe', vars(self.device))
+        self.assertEqual(self.device.click_hooks_before, [])
+
+    def test_memory_budget(self):
+        """测试超出内存预算时丢弃最旧的帧"""
+        self.recorder.max_bytes = 1
+        self.recorder.install(self.device)
+        self.capture(8)
+        snapshot = self.recorder.snapshot()
+        self.assertEqual(len(snapshot.frames), 1)
+        self.assertEqual(self.recorder.size, len(snapshot.frames[0][0]))
+
+    def test_expire(self):
+        """测试丢弃超出时间窗口的记录"""
+        self.recorder.seconds = 0.1
+        self.recorder.install(self.device)
+        self.capture(2)
+        self.device.click(1, 1)
+        time.sleep(0.2)
+        snapshot = self.recorder.snapshot()
+        self.assertEqual(snapshot.frames, [])
+        self.assertEqual(snapshot.events, [])
+
+    def test_rate_limit(self):
+        """测试两次采样之间至少间隔 min_interval"""
+        recorder = FlightRecorder(min_interval=10).install(self.device)
+        try:
+            for _ in range(20):
+                self.device.screenshot()
+            self.assertEqual(recorder.captured, 1)
+            self.assertEqual(recorder.skipped, 19)
+            self.assertGreater(recorder.stats()['hook_ms_mean'], 0)
+        finally:
+            recorder.uninstall()
+
+    def test_write_report(self):
+        """测试导出到错误报告"""
+        self.recorder.install(self.device)
+        self.capture(3)
+        self.device.click(5, 6)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            builder = ReportBuilder()
+            builder.add('flight', self.recorder.snapshot().write)
+            path = builder.start(os.path.join(temp_dir, 'a.zip')).wait(5)
+            with zipfile.ZipFile(path) as zipf:
+                names = zipf.namelist()
+                self.assertEqual(names, ['flight/0001.jpg', 'flight/0002.jpg', 'flight/timeline.jsonl', 'flight/stats.json'])
+                self.assertEqual(zipf.getinfo('flight/0001.jpg').compress_type, zipfile.ZIP_STORED)
+                timeline = [json.loads(line) for line in zipf.read('flight/timeline.jsonl').decode('utf-8').splitlines()]
+            self.assertEqual([e['type'] for e in timeline], ['frame', 'frame', 'frame', 'click'])
+            self.assertEqual([e.get('file') for e in timeline[:3]], ['0001.jpg', '0001.jpg', '0002.jpg'])
+        finally:
+            shutil.rmtree(temp_dir)
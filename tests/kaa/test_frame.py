@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from kotonebot.primitives import Rect
+from kaa.util.frame import Frame
+
+class TestFrame(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.img = rng.integers(0, 256, (128, 96, 3), dtype=np.uint8)
+        self.rect = Rect(10, 20, 30, 40)
+
+    def test_of(self):
+        frame = Frame.of(self.img)
+        self.assertIs(Frame.of(self.img), frame)
+        # 新截图是新的数组，缓存自然失效
+        self.assertIsNot(Frame.of(self.img.copy()), frame)
+
+    def test_derived(self):
+        frame = Frame(self.img)
+        hsv = cv2.cvtColor(self.img, cv2.COLOR_BGR2HSV)
+        gray = cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
+        x, y, w, h = self.rect.xywh
+        np.testing.assert_array_equal(frame.hsv(self.rect), hsv[y:y+h, x:x+w])
+        np.testing.assert_array_equal(frame.hsv(), hsv)
+        np.testing.assert_array_equal(frame.gray(), gray)
+        np.testing.assert_array_equal(frame.binary(127), cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)[1])
+        np.testing.assert_array_equal(frame.binary(127, self.rect), frame.binary(127)[y:y+h, x:x+w])
+        self.assertEqual(frame.scaled(2).img.shape, (64, 48, 3))
+        self.assertEqual(frame.scaled(4).img.shape, (32, 24, 3))
+
+    def test_memoized(self):
+        frame = Frame(self.img)
+        self.assertIs(frame.gray(self.rect), frame.gray(self.rect))
+        self.assertIs(frame.hsv(), frame.hsv())
+        self.assertIs(frame.scaled(2), frame.scaled(2))
+        # 整帧结果计算后，区域结果直接从整帧切片
+        self.assertIs(frame.hsv(Rect(0, 0, 5, 5)).base, frame.hsv())
+
+    def test_readonly(self):
+        frame = Frame(self.img)
+        with self.assertRaises(ValueError):
+            frame.hsv()[0, 0] = 0
@@ -0,0 +1,80 @@
+import os
+import json
+import shutil
+import tempfile
+from unittest import TestCase
+
+from kaa.game_ui.idols_overview import IdolPositionIndex
+
+
+class TestIdolPositionIndex(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'idols_position.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """测试保存后重新载入，指纹与位置不变"""
+        index = IdolPositionIndex(self.path)
+        index.validate((800, 100))
+        index.put('i_card-skin-a', 300, (10, 20, 140, 190))
+        index.put('i_card-skin-b', 500, (170, 20, 140, 190))
+
+        loaded = IdolPositionIndex(self.path)
+        self.assertEqual(loaded.fingerprint, (800, 100))
+        self.assertEqual(loaded.get('i_card-skin-a'), {'thumb_top': 300, 'slot': (10, 20, 140, 190)})
+        self.assertEqual(loaded.get('i_card-skin-b'), {'thumb_top': 500, 'slot': (170, 20, 140, 190)})
+        self.assertIsNone(loaded.get('i_card-skin-c'))
+
+    def test_fingerprint_changed(self):
+        """测试持有的偶像数量变化（滚动条指纹变化）时整个索引失效"""
+        index = IdolPositionIndex(self.path)
+        index.validate((800, 100))
+        index.put('i_card-skin-a', 300, (10, 20, 140, 190))
+
+        loaded = IdolPositionIndex(self.path)
+        loaded.validate((800, 100))
+        self.assertIsNotNone(loaded.get('i_card-skin-a'))
+        # 多了一行偶像，把手变短
+        loaded.validate((800, 90))
+        self.assertIsNone(loaded.get('i_card-skin-a'))
+        self.assertEqual(loaded.fingerprint, (800, 90))
+
+    def test_missing_file(self):
+        index = IdolPositionIndex(self.path)
+        self.assertIsNone(index.fingerprint)
+        self.assertEqual(index.entries, {})
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_corrupt_file(self):
+        """测试文件损坏或版本不符时视为空索引，之后可以正常写入"""
+        for content in ('{not json', json.dumps({'version': 1, 'fingerprint': [800, 100]}), json.dumps({'version': 0})):
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            index = IdolPositionIndex(self.path)
+            self.assertIsNone(index.fingerprint)
+            self.assertEqual(index.entries, {})
+
+        index.validate((800, 100))
+        index.put('i_card-skin-a', 300, (10, 20, 140, 190))
+        self.assertIsNotNone(IdolPositionIndex(self.path).get('i_card-skin-a'))
+
+    def test_remove_after_failed_check(self):
+        """测试在记录的位置没有找到偶像时删除记录，并写回文件"""
+        index = IdolPositionIndex(self.path)
+        index.validate((800, 100))
+        index.put('i_card-skin-a', 300, (10, 20, 140, 190))
+        index.put('i_card-skin-b', 500, (170, 20, 140, 190))
+
+        index.remove('i_card-skin-a')
+        self.assertIsNone(index.get('i_card-skin-a'))
+        loaded = IdolPositionIndex(self.path)
+        self.assertIsNone(loaded.get('i_card-skin-a'))
+        self.assertIsNotNone(loaded.get('i_card-skin-b'))
+
+        # 删除不存在的记录不会写文件
+        os.utime(self.path, ns=(0, 0))
+        index.remove('i_card-skin-a')
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
@@ -0,0 +1,24 @@
+import os
+from glob import glob
+from unittest import TestCase
+
+import cv2
+
+from kaa.tasks.actions.loading import is_loading_frame
+
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), '..', 'images', 'ui')
+
+class TestLoading(TestCase):
+    def test_loading(self):
+        files = glob(os.path.join(IMAGES_DIR, 'loading_*.png'))
+        self.assertTrue(files)
+        for file in files:
+            img = cv2.imread(file)
+            self.assertTrue(is_loading_frame(img), os.path.basename(file))
+
+    def test_not_loading(self):
+        files = glob(os.path.join(IMAGES_DIR, 'not_loading_*.png'))
+        self.assertTrue(files)
+        for file in files:
+            img = cv2.imread(file)
+            self.assertFalse(is_loading_frame(img), os.path.basename(file))
@@ -0,0 +1,105 @@
+import time
+import logging
+from unittest import TestCase
+
+from kaa.util.log_buffer import LogRingBuffer
+
+
+class TestLogRingBuffer(TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('test_log_buffer')
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+
+    def attach(self, **kwargs) -> LogRingBuffer:
+        buffer = LogRingBuffer(**kwargs)
+        buffer.setFormatter(logging.Formatter('[%(levelname)s][%(name)s] %(message)s'))
+        self.logger.addHandler(buffer)
+        return buffer
+
+    def test_text(self):
+        """测试格式化后的文本"""
+        buffer = self.attach(chunk_records=3)
+        for i in range(5):
+            self.logger.info('line %d', i)
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(
+            buffer.text(),
+            ''.join(f'[INFO][test_log_buffer] line {i}\n' for i in range(5))
+        )
+
+    def test_query(self):
+        """测试按等级、logger、条数筛选"""
+        buffer = self.attach(chunk_records=4)
+        child = logging.getLogger('test_log_buffer.child')
+        sibling = logging.getLogger('test_log_buffer_sibling')
+        sibling.addHandler(buffer)
+        sibling.propagate = False
+        try:
+            for i in range(10):
+                self.logger.debug('debug %d', i)
+                child.warning('warning %d', i)
+                sibling.error('error %d', i)
+        finally:
+            sibling.removeHandler(buffer)
+
+        warnings = buffer.records(level=logging.WARNING, logger='test_log_buffer')
+        self.assertEqual([e.text.split('] ')[-1] for e in warnings], [f'warning {i}' for i in range(10)])
+        self.assertTrue(all(e.levelname == 'WARNING' for e in warnings))
+        self.assertEqual(len(buffer.records(logger='test_log_buffer_sibling')), 10)
+        last = buffer.records(limit=2)
+        self.assertEqual([e.text for e in last], [
+            '[WARNING][test_log_buffer.child] warning 9',
+            '[ERROR][test_log_buffer_sibling] error 9',
+        ])
+        self.assertEqual(buffer.records(limit=0), [])
+
+    def test_query_by_time(self):
+        """测试按时间筛选"""
+        buffer = self.attach(chunk_records=2)
+        self.logger.info('old')
+        record = logging.LogRecord('test_log_buffer', logging.INFO, __file__, 0, 'ancient', None, None)
+        record.created = time.time() - 3600
+        buffer.handle(record)
+        self.logger.info('new')
+        self.assertEqual([e.text.split('] ')[-1] for e in buffer.records(minutes=10)], ['old', 'new'])
+        self.assertEqual(len(buffer.records()), 3)
+
+    def test_bounded(self):
+        """测试长时间写入时内存占用有上限"""
+        for compress in (True, False):
+            with self.subTest(compress=compress):
+                buffer = self.attach(max_bytes=64 * 1024, chunk_records=100, compress=compress)
+                for i in range(20000):
+                    self.logger.debug('frame %d: card detection result %s', i, [i, i * 2, i * 3])
+                self.assertLessEqual(buffer.size, 64 * 1024)
+                self.assertGreater(buffer.dropped, 0)
+                self.assertEqual(len(buffer) + buffer.dropped, 20000)
+                entries = buffer.records()
+                # 保留的是最新的记录，且连续
+                self.assertTrue(entries[-1].text.endswith(f'frame 19999: card detection result {[19999, 39998, 59997]}'))
+                self.assertEqual(len(entries), len(buffer))
+                self.logger.removeHandler(buffer)
+
+    def test_compression_keeps_more(self):
+        """测试压缩后同样的容量能保存更多记录"""
+        sizes = {}
+        for compress in (True, False):
+            buffer = self.attach(max_bytes=64 * 1024, chunk_records=100, compress=compress)
+            for i in range(20000):
+                self.logger.debug('frame %d: card detection result %s', i, [i, i * 2, i * 3])
+            sizes[compress] = len(buffer)
+            self.logger.removeHandler(buffer)
+        self.assertGreater(sizes[True], sizes[False] * 3)
+
+    def test_clear(self):
+        buffer = self.attach(chunk_records=2)
+        for i in range(5):
+            self.logger.info('line %d', i)
+        buffer.clear()
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.text(), '')
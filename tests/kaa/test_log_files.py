@@ -0,0 +1,170 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import logging
+import tempfile
+from unittest import TestCase
+
+from kaa.util.log_files import LogIndex, LogSegment, RotatingLogHandler, compressor, INDEX_FILE
+
+
+class TestRotatingLogHandler(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.logger = logging.getLogger('test_log_files')
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+
+    def tearDown(self):
+        for h in list(self.logger.handlers):
+            self.logger.removeHandler(h)
+            h.close()
+        compressor.join(5)
+        shutil.rmtree(self.temp_dir)
+
+    def attach(self, **kwargs) -> RotatingLogHandler:
+        handler = RotatingLogHandler(os.path.join(self.temp_dir, '25-01-01-00-00-00.log'), **kwargs)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger.addHandler(handler)
+        return handler
+
+    def read_segment(self, index: LogIndex, segment: LogSegment) -> str:
+        path = index.path_of(segment)
+        if segment.compressed:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return f.read()
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_rotate_by_size(self):
+        """测试按大小轮转并压缩，日志内容完整"""
+        handler = self.attach(max_bytes=4096, budget=None)
+        lines = [f'line {i:05d} ' + 'x' * 80 for i in range(500)]
+        for line in lines:
+            self.logger.debug(line)
+        self.assertTrue(compressor.join(5))
+        index = handler.index
+        segments = index.segments()
+        self.assertGreater(handler.rotations, 5)
+        self.assertEqual(len(segments), handler.rotations + 1)
+        # 除了正在写入的分段，都已压缩
+        self.assertEqual(segments[-1].file, '25-01-01-00-00-00.log')
+        self.assertTrue(all(s.compressed and s.file.endswith('.log.gz') for s in segments[:-1]))
+        self.assertTrue(all(s.size <= 4096 for s in segments if not s.compressed))
+        text = ''.join(self.read_segment(index, s) for s in segments)
+        self.assertEqual(text, ''.join(line + '\n' for line in lines))
+        self.assertEqual(
+            sorted(f for f in os.listdir(self.temp_dir) if f != INDEX_FILE),
+            sorted(s.file for s in segments)
+        )
+
+    def test_rotate_by_age(self):
+        """测试按写入时间轮转"""
+        handler = self.attach(max_age=0.05, compress=False)
+        self.logger.info('first')
+        time.sleep(0.1)
+        self.logger.info('second')
+        self.assertEqual(handler.rotations, 1)
+        files = [s.file for s in handler.index.segments()]
+        self.assertEqual(files, ['25-01-01-00-00-00.001.log', '25-01-01-00-00-00.log'])
+
+    def test_budget(self):
+        """测试总大小超出预算时删除最旧的分段，正在写入的分段不受影响"""
+        handler = self.attach(max_bytes=2048, budget=8192, compress=False)
+        for i in range(400):
+            self.logger.info(f'line {i:05d} ' + 'y' * 60)
+        index = handler.index
+        self.assertLessEqual(index.total_size, 8192 + 2048)
+        segments = index.segments()
+        self.assertIn('25-01-01-00-00-00.log', [s.file for s in segments])
+        # 保留的是最新的日志
+        self.assertIn('line 00399', self.read_segment(index, segments[-1]))
+        self.assertNotIn('line 00000', ''.join(self.read_segment(index, s) for s in segments))
+
+    def test_index_persisted(self):
+        """测试索引写入磁盘，之后无需遍历目录"""
+        handler = self.attach(max_bytes=1024, compress=False)
+        for i in range(50):
+            self.logger.info(f'line {i:05d} ' + 'z' * 60)
+        handler.close()
+        self.logger.removeHandler(handler)
+        with open(os.path.join(self.temp_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = LogIndex(self.temp_dir)
+        self.assertEqual(
+            [s.file for s in index.segments()],
+            [item['file'] for item in data['segments']]
+        )
+        self.assertEqual(index.total_size, sum(os.path.getsize(index.path_of(s)) for s in index.segments()))
+
+
+class TestLogIndex(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def touch(self, name: str, age_days: float) -> str:
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('log\n')
+        t = time.time() - age_days * 86400
+        os.utime(path, (t, t))
+        return path
+
+    def test_adopt_legacy_files(self):
+        """测试没有索引时扫描一次目录"""
+        self.touch('old.log', 10)
+        self.touch('new.log', 1)
+        self.touch('other.txt', 10)
+        index = LogIndex(self.temp_dir)
+        self.assertEqual([s.file for s in index.segments()], ['old.log', 'new.log'])
+
+    def test_reconcile_with_directory(self):
+        """测试索引已存在时，加入之后由其他程序创建的文件，去掉已删除的文件"""
+        self.touch('a.log', 2)
+        self.touch('b.log', 1)
+        self.assertEqual([s.file for s in LogIndex(self.temp_dir).segments()], ['a.log', 'b.log'])
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, INDEX_FILE)))
+
+        # 如启动器写入的日志，不经过索引
+        self.touch('bootstrap-25-01-01-00-00-00.log', 0)
+        self.touch('archived.log.gz', 3)
+        os.remove(os.path.join(self.temp_dir, 'a.log'))
+        index = LogIndex(self.temp_dir)
+        self.assertEqual(
+            [s.file for s in index.segments()],
+            ['archived.log.gz', 'b.log', 'bootstrap-25-01-01-00-00-00.log']
+        )
+        self.assertTrue(index.segments()[0].compressed)
+        with open(os.path.join(self.temp_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            self.assertEqual(
+                sorted(item['file'] for item in json.load(f)['segments']),
+                ['archived.log.gz', 'b.log', 'bootstrap-25-01-01-00-00-00.log']
+            )
+        # 新加入的文件可以被清理
+        removed = index.prune(max_age=2 * 86400)
+        self.assertEqual([s.file for s in removed], ['archived.log.gz'])
+
+    def test_prune_by_age(self):
+        """测试按时间清理"""
+        self.touch('old.log', 10)
+        self.touch('new.log', 1)
+        index = LogIndex(self.temp_dir)
+        removed = index.prune(max_age=7 * 86400)
+        self.assertEqual([s.file for s in removed], ['old.log'])
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'old.log')))
+        self.assertEqual([s.file for s in LogIndex(self.temp_dir).segments()], ['new.log'])
+
+    def test_segments_by_time(self):
+        """测试按时间范围查询分段"""
+        index = LogIndex(self.temp_dir)
+        index.put(LogSegment('a.log', 100, 200, 1))
+        index.put(LogSegment('b.log', 200, 300, 1))
+        index.put(LogSegment('c.log', 300, 400, 1))
+        self.assertEqual([s.file for s in index.segments(since=250)], ['b.log', 'c.log'])
+        self.assertEqual([s.file for s in index.segments(until=150)], ['a.log'])
+        self.assertEqual([s.file for s in index.segments(since=210, until=290)], ['b.log'])
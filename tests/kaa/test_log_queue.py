@@ -0,0 +1,137 @@
+import time
+import logging
+import threading
+from unittest import TestCase
+
+from kaa.util.log_queue import AsyncLogPipeline
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self, delay: float = 0, block: threading.Event | None = None):
+        super().__init__()
+        self.delay = delay
+        self.block = block
+        self.records: list[str] = []
+        self.threads: set[str] = set()
+
+    def emit(self, record: logging.LogRecord):
+        if self.block is not None:
+            self.block.wait()
+        if self.delay:
+            time.sleep(self.delay)
+        self.threads.add(threading.current_thread().name)
+        self.records.append(self.format(record))
+
+
+class TestAsyncLogPipeline(TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('test_log_queue')
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.saved_handlers = list(self.logger.handlers)
+        for h in self.saved_handlers:
+            self.logger.removeHandler(h)
+        self.handler = _ListHandler()
+        self.handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        for h in list(self.logger.handlers):
+            self.logger.removeHandler(h)
+        for h in self.saved_handlers:
+            self.logger.addHandler(h)
+
+    def test_install(self):
+        """测试接管已有 handler 并在写入线程中执行"""
+        pipeline = AsyncLogPipeline()
+        pipeline.install(self.logger)
+        try:
+            self.assertEqual(self.logger.handlers, [pipeline.handler])
+            self.assertEqual(pipeline.handlers, (self.handler,))
+            for i in range(100):
+                self.logger.debug('line %d', i)
+            self.assertTrue(pipeline.flush())
+            self.assertEqual(self.handler.records, [f'DEBUG line {i}' for i in range(100)])
+            self.assertEqual(self.handler.threads, {'kaa-log-writer'})
+        finally:
+            pipeline.uninstall()
+        self.assertEqual(self.logger.handlers, [self.handler])
+
+    def test_handler_level(self):
+        """测试 handler 自身的等级仍然生效"""
+        pipeline = AsyncLogPipeline()
+        pipeline.install(self.logger)
+        try:
+            warnings = _ListHandler()
+            warnings.setLevel(logging.WARNING)
+            pipeline.add_handler(warnings)
+            self.logger.info('info')
+            self.logger.warning('warning')
+            pipeline.flush()
+            self.assertEqual(len(self.handler.records), 2)
+            self.assertEqual(warnings.records, ['warning'])
+            pipeline.remove_handler(warnings)
+            self.assertEqual(pipeline.handlers, (self.handler,))
+        finally:
+            pipeline.uninstall()
+
+    def test_args_captured(self):
+        """测试参数在调用时合并，之后修改参数不影响日志"""
+        pipeline = AsyncLogPipeline()
+        pipeline.install(self.logger)
+        try:
+            cards = [1, 2]
+            self.logger.info('cards=%s', cards)
+            cards.append(3)
+            pipeline.flush()
+            self.assertEqual(self.handler.records, ['INFO cards=[1, 2]'])
+        finally:
+            pipeline.uninstall()
+
+    def test_exception(self):
+        """测试异常信息在写入线程中格式化"""
+        pipeline = AsyncLogPipeline()
+        pipeline.install(self.logger)
+        try:
+            try:
+                raise ValueError('boom')
+            except ValueError:
+                self.logger.exception('failed')
+            pipeline.flush()
+            self.assertIn('ValueError: boom', self.handler.records[0])
+        finally:
+            pipeline.uninstall()
+
+    def test_drop_verbose(self):
+        """测试队列已满时丢弃 DEBUG 日志而保留更高等级的日志"""
+        block = threading.Event()
+        self.handler.block = block
+        pipeline = AsyncLogPipeline(capacity=10, block_timeout=5)
+        pipeline.install(self.logger)
+        try:
+            for i in range(50):
+                self.logger.debug('debug %d', i)
+            self.assertGreaterEqual(pipeline.dropped, 39)
+            threading.Timer(0.2, block.set).start()
+            start = time.monotonic()
+            self.logger.warning('important')
+            # WARNING 等待队列腾出空间，而不是被丢弃
+            self.assertGreater(time.monotonic() - start, 0.1)
+            pipeline.flush()
+        finally:
+            block.set()
+            pipeline.uninstall()
+        self.assertIn('WARNING important', self.handler.records)
+        notices = [r for r in self.handler.records if 'Dropped' in r]
+        self.assertEqual(len(notices), 1)
+        self.assertIn(f'Dropped {pipeline.dropped} log record(s)', notices[0])
+
+    def test_uninstall_flushes(self):
+        """测试停止时写出剩余的日志"""
+        self.handler.delay = 0.001
+        pipeline = AsyncLogPipeline()
+        pipeline.install(self.logger)
+        for i in range(200):
+            self.logger.info('line %d', i)
+        pipeline.uninstall()
+        self.assertEqual(len(self.handler.records), 200)
@@ -0,0 +1,77 @@
+import time
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+import cv2
+from rapidocr_onnxruntime import RapidOCR
+
+from kotonebot.primitives import Rect
+from kotonebot.backend import ocr as kotonebot_ocr
+from kotonebot.backend.ocr import jp
+from kaa.util.ocr import ocr_batch, ocr_engine
+
+
+class TestOcrBatch(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.img = cv2.imread('tests/images/acquire_pdorinku.png')
+        # 先用带检测的 OCR 找出单行文本框
+        cls.lines = jp().ocr(cls.img, pad=False)
+
+    def test_same_as_sequential(self):
+        rects = [r.rect for r in self.lines]
+        results = ocr_batch(self.img, rects)
+        self.assertEqual(len(results), len(rects))
+        for line, result in zip(self.lines, results):
+            self.assertEqual(result.squash().text, line.text)
+            self.assertEqual(result[0].original_rect.xywh, line.rect.xywh)
+
+    def test_keep_order(self):
+        rects = [r.rect for r in self.lines]
+        forward = [r.squash().text for r in ocr_batch(self.img, rects)]
+        backward = [r.squash().text for r in ocr_batch(self.img, rects[::-1])]
+        self.assertEqual(forward, backward[::-1])
+
+    def test_empty_and_out_of_bounds(self):
+        self.assertEqual(ocr_batch(self.img, []), [])
+        results = ocr_batch(self.img, [Rect(-100, -100, 10, 10)])
+        self.assertEqual(len(results), 1)
+        self.assertEqual(len(results[0]), 0)
+
+
+class TestOcrEngine(TestCase):
+    def test_engine(self):
+        """测试能从 kotonebot 取得 RapidOCR 实例。kotonebot 内部实现变化时此测试失败"""
+        for lang in ('jp', 'en'):
+            engine = ocr_engine(lang)
+            self.assertIsInstance(engine, RapidOCR)
+            self.assertIs(ocr_engine(lang), engine)
+
+    def test_missing_engine(self):
+        with patch.object(kotonebot_ocr, '_engine_jp', None), patch.object(kotonebot_ocr, 'jp'):
+            with self.assertRaises(RuntimeError):
+                ocr_engine('jp')
+        with self.assertRaises(ValueError):
+            ocr_engine('zh')  # type: ignore
+
+    def test_create_once_across_threads(self):
+        """测试预热线程与任务线程同时首次使用时只创建一个引擎"""
+        created: list[RapidOCR] = []
+
+        def slow_jp():
+            if kotonebot_ocr._engine_jp is None:
+                time.sleep(0.05)
+                engine = RapidOCR.__new__(RapidOCR)
+                created.append(engine)
+                kotonebot_ocr._engine_jp = engine
+
+        with patch.object(kotonebot_ocr, '_engine_jp', None), patch.object(kotonebot_ocr, 'jp', slow_jp):
+            results: list[RapidOCR] = []
+            threads = [threading.Thread(target=lambda: results.append(ocr_engine('jp'))) for _ in range(2)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(len(created), 1)
+        self.assertEqual(results, [created[0]] * 2)
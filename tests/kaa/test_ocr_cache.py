@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+import cv2
+
+from kotonebot.primitives import Rect
+from kotonebot.backend.ocr import OcrResultList
+from kaa.util.ocr import OcrCache, CachedOcr, ocr_batch, ocr_cache
+
+
+class TestOcrCache(TestCase):
+    def setUp(self):
+        self.img = cv2.imread('tests/images/acquire_pdorinku.png')
+        self.rect = Rect(565, 49, 87, 26)
+
+    def test_hit_and_miss(self):
+        cache = OcrCache()
+        engine = CachedOcr('jp', cache)
+        first = engine.ocr(self.img, rect=self.rect)
+        second = engine.ocr(self.img, rect=self.rect)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual([r.text for r in first], [r.text for r in second])
+
+        # 像素变化后不应命中
+        changed = self.img.copy()
+        changed[self.rect.y1, self.rect.x1] = (0, 0, 255)
+        engine.ocr(changed, rect=self.rect)
+        self.assertEqual(cache.misses, 2)
+
+    def test_returns_copy(self):
+        cache = OcrCache()
+        engine = CachedOcr('jp', cache)
+        engine.ocr(self.img, rect=self.rect)[0].replace('審査', 'xx')
+        self.assertEqual(engine.ocr(self.img, rect=self.rect)[0].text, '審査基準')
+
+    def test_lru(self):
+        cache = OcrCache(capacity=2)
+        keys = [OcrCache.key(self.img, Rect(i, 0, 10, 10), 'jp') for i in range(3)]
+        for key in keys:
+            cache.put(key, OcrResultList())
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[2]))
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_batch_uses_cache(self):
+        ocr_cache.clear()
+        ocr_batch(self.img, [self.rect])
+        ocr_batch(self.img, [self.rect])
+        self.assertEqual(ocr_cache.hits, 1)
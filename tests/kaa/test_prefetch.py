@@ -0,0 +1,94 @@
+import time
+import threading
+from unittest import TestCase
+
+from util import FakeDevice, FakeTouch
+from kaa.util.prefetch import ScreenshotPrefetcher
+
+
+class _BlockingTouch(FakeTouch):
+    """点击在 `release` 之前一直阻塞，模拟 adb 点击的往返延迟。"""
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.returned_at = 0.0
+
+    def click(self, x, y):
+        self.entered.set()
+        self.release.wait(5)
+        self.returned_at = time.monotonic()
+
+
+def _device(delay: float) -> FakeDevice:
+    # 滑动有少许耗时，用于验证滑动结束之后才记录输入
+    return FakeDevice(size=(8, 8), capture_delay=delay, touch_delay=0.01)
+
+
+class TestScreenshotPrefetcher(TestCase):
+    def setUp(self):
+        self.device = _device(0.02)
+        self.prefetcher = ScreenshotPrefetcher(self.device)
+        self.prefetcher.install()
+
+    def tearDown(self):
+        self.prefetcher.uninstall()
+
+    def test_no_duplicate_frames(self):
+        seen = set()
+        for _ in range(5):
+            frame = self.prefetcher.get()
+            assert frame is not None
+            self.assertNotIn(frame.seq, seen)
+            seen.add(frame.seq)
+
+    def test_screenshot_uses_prefetched_frame(self):
+        self.device.screenshot()
+        self.assertEqual(self.prefetcher.consumed, 1)
+
+    def test_no_stale_frame_after_click(self):
+        self.prefetcher.get()
+        # 等待后台线程开始截取下一帧，使其成为点击前的过期帧
+        time.sleep(0.005)
+        before_click = time.monotonic()
+        self.device.click(1, 1)
+        frame = self.prefetcher.get()
+        assert frame is not None
+        self.assertGreater(frame.started_at, before_click)
+
+    def test_no_frame_started_during_click(self):
+        """测试点击发出后、返回前开始截取的帧不会被返回"""
+        touch = _BlockingTouch()
+        self.device._touch = touch  # type: ignore
+        self.prefetcher.get()
+        clicking = threading.Thread(target=self.device.click, args=(1, 1))
+        clicking.start()
+        self.assertTrue(touch.entered.wait(1))
+        # 点击进行中，后台线程继续截图
+        captured = self.prefetcher.captured
+        deadline = time.monotonic() + 2
+        while self.prefetcher.captured < captured + 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertGreaterEqual(self.prefetcher.captured, captured + 2)
+        touch.release.set()
+        clicking.join(1)
+        frame = self.prefetcher.get()
+        assert frame is not None
+        self.assertGreater(frame.started_at, touch.returned_at)
+
+    def test_no_stale_frame_after_swipe(self):
+        self.prefetcher.get()
+        self.device.swipe(0, 0, 1, 1)
+        swiped_at = time.monotonic()
+        frame = self.prefetcher.get()
+        assert frame is not None
+        self.assertGreaterEqual(frame.started_at, swiped_at - 0.001)
+
+    def test_uninstall_restores_device(self):
+        self.prefetcher.uninstall()
+        self.assertIsNone(self.device.screenshot_hook_before)
+        self.assertNotIn('click', vars(self.device))
+        self.assertNotIn('swipe', vars(self.device))
+        count = self.device.screen.count
+        self.device.screenshot()
+        self.assertEqual(self.device.screen.count, count + 1)
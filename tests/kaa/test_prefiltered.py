@@ -0,0 +1,28 @@
+import os
+from unittest import TestCase
+
+import cv2
+
+from kotonebot.backend.image import find
+from kaa.tasks import R
+from kaa.game_ui.common import WhiteFilter, prefiltered_templates, _PrefilteredPreprocessor
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+class TestPrefilteredTemplates(TestCase):
+    def test_cached(self):
+        a = prefiltered_templates.get(R.Produce.ButtonSkipLive, WhiteFilter())
+        b = prefiltered_templates.get(R.Produce.ButtonSkipLive, WhiteFilter())
+        self.assertIs(a, b)
+
+    def test_same_as_preprocessors(self):
+        img = cv2.imread(os.path.join(ROOT, 'kotonebot-resource/sprites/jp/produce/screenshot_produce_end.png'))
+        self.assertIsNotNone(img)
+        template = R.Produce.ButtonSkipLive
+        expected = find(img, template, preprocessors=[WhiteFilter()])
+        filtered = prefiltered_templates.get(template, WhiteFilter())
+        actual = find(img, filtered, preprocessors=[_PrefilteredPreprocessor(WhiteFilter(), filtered)])
+        self.assertIsNotNone(expected)
+        assert expected is not None and actual is not None
+        self.assertEqual(actual.position, expected.position)
+        self.assertAlmostEqual(actual.score, expected.score, places=5)
@@ -5,6 +5,7 @@ import shutil
 import uuid
 from unittest import TestCase
 
+from pydantic import ValidationError
 
 from kaa.config.produce import (
     ProduceData, 
@@ -12,6 +13,7 @@ from kaa.config.produce import (
     ProduceSolutionManager
 )
 from kaa.config.const import ProduceAction, RecommendCardDetectionMode
+from kaa.config.schema import ProduceSolutionCache
 from kaa.errors import ProduceSolutionNotFoundError
 
 
@@ -568,3 +570,144 @@ class TestProduceSolutionManager(TestCase):
         # 验证所有方案都已删除
         remaining_solutions = self.manager.list()
         self.assertEqual(len(remaining_solutions), 0)
+
+    def test_index_detects_external_changes(self):
+        """测试索引能发现外部对文件的修改、删除"""
+        solution = ProduceSolution(id='external_id', name='外部修改', data=ProduceData())
+        self.manager.save(solution.id, solution)
+        self.assertEqual(self.manager.read('external_id').data.mode, 'regular')
+
+        # 外部修改文件内容（大小变化）
+        file_path = self.manager._get_file_path(solution.name)
+        solution.data.mode = 'master'
+        solution.description = '外部修改后的描述'
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(solution.model_dump(mode='json'), f, ensure_ascii=False, indent=4)
+        self.assertEqual(self.manager.read('external_id').data.mode, 'master')
+
+        # 外部删除
+        os.remove(file_path)
+        with self.assertRaises(ProduceSolutionNotFoundError):
+            self.manager.read('external_id')
+        self.assertEqual(self.manager.list(), [])
+
+    def test_read_returns_independent_copy(self):
+        """测试读取结果被修改后不影响之后的读取"""
+        solution = ProduceSolution(id='copy_id', name='副本测试', data=ProduceData())
+        self.manager.save(solution.id, solution)
+
+        read_solution = self.manager.read('copy_id')
+        read_solution.name = '未保存的名称'
+        read_solution.data.actions_order.clear()
+
+        again = self.manager.read('copy_id')
+        self.assertEqual(again.name, '副本测试')
+        self.assertNotEqual(again.data.actions_order, [])
+        self.assertEqual(self.manager.list()[0].name, '副本测试')
+
+    def test_list_does_not_revalidate(self):
+        """测试方案只在文件变化时校验一次，之后 list()、read() 不再校验"""
+        for i in range(3):
+            solution = self.manager.new(f'方案{i}')
+            self.manager.save(solution.id, solution)
+        index = self.manager._index
+        self.assertEqual(len(self.manager.list()), 3)
+        validations = index.validations
+        for _ in range(10):
+            solutions = self.manager.list()
+            self.manager.read(solutions[0].id)
+        self.assertEqual(index.validations, validations)
+
+        # 外部修改后只重新校验变化的文件
+        file_path = self.manager._get_file_path('方案0')
+        solutions[0].description = '外部修改'
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(solutions[0].model_dump(mode='json'), f, ensure_ascii=False, indent=4)
+        self.assertEqual(self.manager.read(solutions[0].id).description, '外部修改')
+        self.assertEqual(index.validations, validations + 1)
+
+    def test_list_returns_independent_copies(self):
+        """测试 list() 返回的方案被修改后不影响索引"""
+        solution = self.manager.new('列表副本')
+        self.manager.save(solution.id, solution)
+        # 保存后修改原对象，也不影响索引
+        solution.name = '未保存的名称'
+        listed = self.manager.list()[0]
+        self.assertEqual(listed.name, '列表副本')
+        listed.data.actions_order.clear()
+        self.assertNotEqual(self.manager.list()[0].data.actions_order, [])
+
+    def test_save_leaves_no_temp_files(self):
+        """测试原子写入不会留下临时文件"""
+        solution = self.manager.new('原子写入')
+        self.manager.save(solution.id, solution)
+        self.manager.save(solution.id, solution)
+        self.assertEqual(os.listdir(self.manager.SOLUTIONS_DIR), ['原子写入.json'])
+
+
+class TestProduceSolutionCache(TestCase):
+    """测试 ProduceSolutionCache 类"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.original_solutions_dir = ProduceSolutionManager.SOLUTIONS_DIR
+        ProduceSolutionManager.SOLUTIONS_DIR = os.path.join(self.temp_dir, "test_solutions") # type: ignore[assignment]
+        self.manager = ProduceSolutionManager()
+        self.solution = ProduceSolution(id='cache_id', name='缓存测试', data=ProduceData(mode='pro'))
+        self.manager.save(self.solution.id, self.solution)
+        self.cache = ProduceSolutionCache()
+
+    def tearDown(self):
+        ProduceSolutionManager.SOLUTIONS_DIR = self.original_solutions_dir # type: ignore[assignment]
+        shutil.rmtree(self.temp_dir)
+
+    def test_snapshot_is_reused(self):
+        """测试文件未变化时复用同一份快照"""
+        first = self.cache.get('cache_id')
+        self.assertIs(self.cache.get('cache_id'), first)
+        self.assertEqual(self.cache.loads, 1)
+
+    def test_snapshot_is_immutable(self):
+        """测试快照不能修改"""
+        snapshot = self.cache.get('cache_id')
+        with self.assertRaises(ValidationError):
+            snapshot.data.mode = 'master'
+        self.assertIsInstance(snapshot.data.actions_order, tuple)
+
+    def test_reload_on_file_change(self):
+        """测试方案文件变化后重新加载"""
+        self.assertEqual(self.cache.get('cache_id').data.mode, 'pro')
+        self.solution.data.mode = 'master'
+        self.manager.save(self.solution.id, self.solution)
+        self.assertEqual(self.cache.get('cache_id').data.mode, 'master')
+        self.assertEqual(self.cache.loads, 2)
+
+    def test_reload_on_id_change(self):
+        """测试选中的方案变化后重新加载"""
+        other = self.manager.new('另一个方案')
+        self.manager.save(other.id, other)
+        self.assertEqual(self.cache.get('cache_id').id, 'cache_id')
+        self.assertEqual(self.cache.get(other.id).id, other.id)
+
+    def test_frozen_no_disk_access(self):
+        """测试冻结期间读取方案不访问磁盘"""
+        index = self.manager._index
+        self.cache.get('cache_id')
+        stats, reads, checks = index.stats, index.reads, self.cache.checks
+        with self.cache.frozen():
+            for _ in range(1000):
+                self.cache.get('cache_id')
+            self.assertEqual(index.stats, stats)
+            self.assertEqual(index.reads, reads)
+            self.assertEqual(self.cache.checks, checks)
+            # 冻结期间的修改不生效，之后的读取也不访问磁盘
+            self.solution.data.mode = 'master'
+            self.manager.save(self.solution.id, self.solution)
+            stats, reads = index.stats, index.reads
+            self.assertEqual(self.cache.get('cache_id').data.mode, 'pro')
+            self.assertEqual(index.stats, stats)
+            self.assertEqual(index.reads, reads)
+        self.assertEqual(self.cache.checks, checks)
+        self.assertEqual(self.cache.hits, 1001)
+        # 解除冻结后读取到新方案
+        self.assertEqual(self.cache.get('cache_id').data.mode, 'master')
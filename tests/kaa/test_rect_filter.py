@@ -0,0 +1,32 @@
+import os
+from unittest import TestCase
+
+import cv2
+
+from kaa.tasks import R
+from kaa.game_ui.common import filter_rectangles, HsvRectFilter, WHITE_LOW, WHITE_HIGH
+from kaa.game_ui.commu_event_buttons import DEFAULT_COLORS
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+IMAGES = [
+    'screenshots/produce/action_study2.png',
+    'screenshots/produce/action_study3.png',
+    # 有按钮右边缘恰好贴住识别范围边缘
+    'kotonebot-resource/sprites/jp/in_purodyuusu/screenshot_1_cards.png',
+]
+
+class TestHsvRectFilter(TestCase):
+    def test_same_as_filter_rectangles(self):
+        box = R.InPurodyuusu.BoxCommuEventButtonsArea
+        ranges = [*DEFAULT_COLORS, (WHITE_LOW, WHITE_HIGH)]
+        for path in IMAGES:
+            img = cv2.imread(os.path.join(ROOT, path))
+            self.assertIsNotNone(img, path)
+            f = HsvRectFilter(ranges, box).update(img)
+            for i, color_range in enumerate(ranges):
+                for aspect, area in ((7, 500), (3, 1000)):
+                    with self.subTest(path=path, range=i, aspect=aspect, area=area):
+                        expected = filter_rectangles(img, color_range, aspect, area, rect=box)
+                        actual = f.rectangles(i, aspect, area)
+                        self.assertEqual([r.xywh for r in actual], [r.xywh for r in expected])
+
@@ -0,0 +1,103 @@
+import os
+import shutil
+import zipfile
+import tempfile
+import threading
+from unittest import TestCase
+
+import numpy as np
+
+from kaa.errors import ReportCancelledError
+from kaa.util.report import ReportBuilder, ReportJob
+
+
+class TestReportBuilder(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'reports', 'report.zip')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_file(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_build(self):
+        """测试内容完整，已压缩的媒体原样存入，文本压缩"""
+        log = self.write_file('a.log', b'log line\n' * 10000)
+        gz = self.write_file('b.log.gz', os.urandom(1000))
+        image = np.zeros((32, 32, 3), dtype=np.uint8)
+        builder = ReportBuilder()
+        builder.add_text('description.txt', '描述')
+        builder.add_image('screenshot.png', lambda: image)
+        builder.add_files('日志', lambda: [(log, 'logs/a.log'), (gz, 'logs/b.log.gz'), ('missing.log', 'logs/c.log')])
+        progress = []
+        path = builder.start(self.path, on_progress=progress.append).wait(5)
+
+        self.assertEqual(path, self.path)
+        self.assertFalse(os.path.exists(self.path + '.part'))
+        with zipfile.ZipFile(path) as zipf:
+            self.assertEqual(zipf.namelist(), ['description.txt', 'screenshot.png', 'logs/a.log', 'logs/b.log.gz'])
+            self.assertEqual(zipf.read('description.txt').decode('utf-8'), '描述')
+            self.assertEqual(zipf.read('logs/a.log'), b'log line\n' * 10000)
+            self.assertEqual(zipf.getinfo('screenshot.png').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zipf.getinfo('logs/b.log.gz').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zipf.getinfo('logs/a.log').compress_type, zipfile.ZIP_DEFLATED)
+            self.assertLess(zipf.getinfo('logs/a.log').compress_size, 10000)
+        self.assertEqual(
+            [(p['item'], p['step'], p['total_steps']) for p in progress],
+            [('description.txt', 1, 3), ('screenshot.png', 2, 3), ('日志', 3, 3)]
+        )
+
+    def test_optional_entry(self):
+        """测试可选条目出错时跳过，必需条目出错时整个报告失败"""
+        def fail():
+            raise RuntimeError('no device')
+        builder = ReportBuilder()
+        builder.add_image('screenshot.png', fail)
+        builder.add_text('a.txt', 'a')
+        with zipfile.ZipFile(builder.start(self.path).wait(5)) as zipf:
+            self.assertEqual(zipf.namelist(), ['a.txt'])
+
+        builder = ReportBuilder()
+        builder.add_text('a.txt', fail)  # type: ignore
+        with self.assertRaises(RuntimeError):
+            builder.start(self.path + '2').wait(5)
+        self.assertFalse(os.path.exists(self.path + '2'))
+        self.assertFalse(os.path.exists(self.path + '2.part'))
+
+    def test_cancel(self):
+        """测试取消后停止写入，并删除未完成的文件"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return 'b'
+        builder = ReportBuilder()
+        builder.add_text('a.txt', slow)
+        builder.add_text('b.txt', 'b')
+        job = builder.start(self.path)
+        self.assertTrue(started.wait(5))
+        self.assertFalse(job.done)
+        job.cancel()
+        release.set()
+        with self.assertRaises(ReportCancelledError):
+            job.wait(5)
+        self.assertTrue(job.cancelled)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), [])
+
+
+class TestReportJob(TestCase):
+    def test_wait_timeout(self):
+        release = threading.Event()
+        job = ReportJob(lambda job: release.wait(5)).start()
+        with self.assertRaises(TimeoutError):
+            job.wait(0.01)
+        release.set()
+        self.assertTrue(job.wait(5))
+        self.assertTrue(job.done)
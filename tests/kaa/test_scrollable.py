@@ -0,0 +1,64 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from kotonebot.primitives import Rect
+from kaa.game_ui.scrollable import Scrollable
+
+TRACK = Rect(700, 100, 10, 800)
+CONTENT = Rect(0, 0, 600, 1000)
+THUMB_HEIGHT = 100
+
+
+class _FakeScrollDevice:
+    """拖动把手后，内容随把手同步移动。`lag` 为拖动后仍显示旧画面的截图次数。"""
+    def __init__(self, lag: int = 0):
+        self.top = TRACK.y1
+        self.shown_top = self.top
+        self.lag = lag
+        self.pending_lag = 0
+        self.captures = 0
+
+    def screenshot(self):
+        self.captures += 1
+        if self.pending_lag > 0:
+            self.pending_lag -= 1
+        else:
+            self.shown_top = self.top
+        img = np.full((1280, 720, 3), 255, dtype=np.uint8)
+        img[self.shown_top:self.shown_top + THUMB_HEIGHT, TRACK.x1:TRACK.x1 + TRACK.w] = 0
+        img[CONTENT.y1:CONTENT.y2, CONTENT.x1:CONTENT.x2] = (self.shown_top * 7) % 256
+        return img
+
+    def swipe(self, x1, y1, x2, y2, duration=None):
+        self.top = min(max(self.top + y2 - y1, TRACK.y1), TRACK.y1 + TRACK.h - THUMB_HEIGHT)
+        self.pending_lag = self.lag
+
+
+class TestScrollableScan(TestCase):
+    def scan(self, device: _FakeScrollDevice, **kwargs):
+        seen: list[int] = []
+        with patch('kaa.game_ui.scrollable.device', device):
+            sc = Scrollable(TRACK, content_rect=CONTENT)
+            sc.update()
+            self.assertTrue(sc.at_top)
+            ret = sc.scan(lambda img: seen.append(int(img[0, 0, 0])), step_pixels=THUMB_HEIGHT, **kwargs)
+        self.assertIsNone(ret)
+        return seen
+
+    def test_skip_current(self):
+        """测试从当前页开始扫描时不重新识别当前页，每一页只截图一次"""
+        device = _FakeScrollDevice()
+        seen = self.scan(device, start=None, skip_current=True)
+        # 共 8 页，第一页已由调用方识别
+        self.assertEqual(len(seen), 7)
+        self.assertNotIn((TRACK.y1 * 7) % 256, seen)
+        self.assertEqual(device.captures, 1 + 7)
+
+    def test_settle_fallback(self):
+        """测试第一张截图中把手未到达目标位置时，继续截图直到画面稳定"""
+        device = _FakeScrollDevice(lag=1)
+        seen = self.scan(device, start=None, skip_current=True)
+        self.assertEqual(seen, [(top * 7) % 256 for top in range(200, 900, 100)])
+        self.assertGreater(device.captures, 1 + 7 * 2)
@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from util import FakeDevice, solid
+from kaa.errors import ReplayDivergedError, ReplayExhaustedError
+from kaa.util.session import ReplayDevice, Session, SessionRecorder
+
+
+def _frame(i: int):
+    # 每两帧变化一次，用于验证重复帧只编码一次
+    img = solid((160, 90), (0, (i // 2) * 20 % 256, 0))
+    img[10, 10] = (1, 2, 3)
+    return img
+
+
+def _device() -> FakeDevice:
+    return FakeDevice(_frame, size=(90, 160))
+
+
+class TestSession(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        device = _device()
+        self.frames = []
+        with SessionRecorder(device, self.dir) as self.recorder:
+            for i in range(6):
+                self.frames.append(device.screenshot())
+                if i % 2 == 1:
+                    device.click(10, 20 + i)
+            device.swipe(1, 2, 3, 4)
+        self.device = device
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_recorded(self):
+        self.assertEqual(self.recorder.frames, 3)
+        self.assertNotIn('screenshot', vars(self.device))
+        self.assertNotIn('swipe', vars(self.device))
+        self.assertEqual(self.device.click_hooks_before, [])
+        session = Session.load(self.dir)
+        self.assertEqual(session.size, (90, 160))
+        self.assertEqual([e['type'] for e in session.inputs()], ['click'] * 3 + ['swipe'])
+
+    def test_frames_lossless(self):
+        session = Session.load(self.dir)
+        decoded = list(session.frames())
+        indices = [e['index'] for e in session.events if e['type'] == 'frame']
+        for i, frame in zip(indices, self.frames):
+            self.assertTrue(np.array_equal(decoded[i], frame))
+
+    def test_replay(self):
+        d = ReplayDevice(self.dir)
+        for i in range(6):
+            self.assertTrue(np.array_equal(d.screenshot_raw(), self.frames[i]))
+            if i % 2 == 1:
+                d.click(10, 20 + i)
+        d.swipe(1, 2, 3, 4)
+        self.assertTrue(d.finished)
+        self.assertEqual(d.divergences, [])
+
+    def test_replay_skips_to_input(self):
+        d = ReplayDevice(self.dir)
+        d.screenshot_raw()
+        # 任务只截了一次图就点击，跳过录制中剩余的截图
+        d.click(10, 21)
+        self.assertTrue(np.array_equal(d.screenshot_raw(), self.frames[2]))
+
+    def test_replay_repeats_frame_until_input(self):
+        d = ReplayDevice(self.dir, max_idle_screenshots=3)
+        d.screenshot_raw()
+        d.screenshot_raw()
+        for _ in range(3):
+            self.assertTrue(np.array_equal(d.screenshot_raw(), self.frames[1]))
+        with self.assertRaises(ReplayExhaustedError):
+            d.screenshot_raw()
+
+    def test_replay_divergence(self):
+        d = ReplayDevice(self.dir, strict=True)
+        d.screenshot_raw()
+        with self.assertRaises(ReplayDivergedError):
+            d.click(500, 500)
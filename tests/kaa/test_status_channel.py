@@ -0,0 +1,121 @@
+import time
+import asyncio
+import threading
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from kaa.application.core.status_channel import StatusChannel
+
+
+class TestStatusChannel(TestCase):
+    def setUp(self):
+        self.channel = StatusChannel(heartbeat=0.2, coalesce=0)
+        self.state = {'a': 1, 'b': [1, 2]}
+        self.calls = 0
+
+    def snapshot(self):
+        self.calls += 1
+        return dict(self.state)
+
+    def test_diff(self):
+        """测试第一次产出完整状态，之后只产出变化的键"""
+        stream = self.channel.stream(self.snapshot)
+        self.assertEqual(next(stream), {'a': 1, 'b': [1, 2]})
+        self.state['a'] = 2
+        self.channel.notify()
+        self.assertEqual(next(stream), {'a': 2})
+        self.state['b'] = [1, 2]
+        self.channel.notify()
+        self.assertEqual(next(stream), {})
+
+    def test_wait_for_notify(self):
+        """测试没有通知时等待，收到通知后立即产出"""
+        stream = self.channel.stream(self.snapshot, heartbeat=10)
+        next(stream)
+
+        def change():
+            time.sleep(0.05)
+            self.state['a'] = 3
+            self.channel.notify()
+        threading.Thread(target=change).start()
+        start = time.monotonic()
+        self.assertEqual(next(stream), {'a': 3})
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_heartbeat(self):
+        """测试没有通知时按心跳间隔产出空差异"""
+        stream = self.channel.stream(self.snapshot)
+        next(stream)
+        start = time.monotonic()
+        self.assertEqual(next(stream), {})
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_notify_before_wait(self):
+        """测试计算状态与等待之间的通知不会丢失"""
+        stream = self.channel.stream(self.snapshot, heartbeat=10)
+        next(stream)
+        self.state['a'] = 4
+        self.channel.notify()
+        start = time.monotonic()
+        self.assertEqual(next(stream), {'a': 4})
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_coalesce(self):
+        """测试短时间内的多次通知只计算一次状态"""
+        channel = StatusChannel(heartbeat=10, coalesce=0.1)
+        stream = channel.stream(self.snapshot)
+        next(stream)
+
+        def burst():
+            for i in range(5):
+                self.state['a'] = 10 + i
+                channel.notify()
+                time.sleep(0.01)
+        threading.Thread(target=burst).start()
+        self.assertEqual(next(stream), {'a': 14})
+        self.assertEqual(self.calls, 2)
+
+
+class TestStatusChannelAsync(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.channel = StatusChannel(heartbeat=10, coalesce=0)
+        self.state = {'a': 1}
+
+    def snapshot(self):
+        return dict(self.state)
+
+    async def test_notify_from_thread(self):
+        """测试其他线程的通知唤醒事件循环中的等待"""
+        stream = self.channel.astream(self.snapshot)
+        self.assertEqual(await anext(stream), {'a': 1})
+
+        def change():
+            time.sleep(0.05)
+            self.state['a'] = 2
+            self.channel.notify()
+        threading.Thread(target=change).start()
+        start = time.monotonic()
+        self.assertEqual(await asyncio.wait_for(anext(stream), 2), {'a': 2})
+        self.assertLess(time.monotonic() - start, 1)
+
+    async def test_waiting_does_not_block_loop(self):
+        """测试等待期间事件循环可以处理其他任务"""
+        stream = self.channel.astream(self.snapshot)
+        await anext(stream)
+        pending = asyncio.ensure_future(anext(stream))
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        self.assertEqual(ticks, 5)
+        self.assertFalse(pending.done())
+        self.channel.notify()
+        self.assertEqual(await asyncio.wait_for(pending, 1), {})
+
+    async def test_heartbeat_callable(self):
+        """测试心跳间隔可以由函数给出（如任务运行时每秒刷新运行时间）"""
+        stream = self.channel.astream(self.snapshot, heartbeat=lambda: 0.05)
+        await anext(stream)
+        start = time.monotonic()
+        self.assertEqual(await asyncio.wait_for(anext(stream), 2), {})
+        self.assertLess(time.monotonic() - start, 1)
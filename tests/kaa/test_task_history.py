@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+
+from kaa.application.core.task_history import TaskEvent, TaskHistory
+
+
+class TestTaskHistory(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'task_history.jsonl')
+        self.history = TaskHistory(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_statuses(self):
+        """测试当前状态随事件增量更新"""
+        h = self.history
+        self.assertEqual(h.statuses(), ())
+        h.start_run()
+        h.record('a', 'queued', 100)
+        h.record('b', 'queued', 100)
+        self.assertEqual(h.statuses(), (('a', 'pending'), ('b', 'pending')))
+        h.record('a', 'started', 101)
+        self.assertEqual(h.current_task, 'a')
+        self.assertEqual(h.statuses(), (('a', 'running'), ('b', 'pending')))
+        h.record('a', 'paused', 103)
+        self.assertEqual(h.statuses()[0], ('a', 'paused'))
+        h.record('a', 'resumed', 110)
+        h.record('a', 'finished', 111)
+        self.assertIsNone(h.current_task)
+        # 暂停的 7 秒不计入耗时
+        self.assertEqual(h.events(task='a')[-1].duration, 3)
+        status = h.task('a')
+        assert status is not None
+        self.assertEqual((status.started_at, status.ended_at, status.active), (101, 111, 3))
+
+    def test_statuses_cached(self):
+        """测试读取状态不重新构建"""
+        h = self.history
+        h.start_run()
+        h.record('a', 'queued')
+        self.assertIs(h.statuses(), h.statuses())
+
+    def test_end_run(self):
+        """测试结束运行时，未报告结果的任务记为出错，未开始的任务记为取消"""
+        h = self.history
+        h.start_run()
+        self.assertTrue(h.running)
+        self.assertIsNotNone(h.run_started_at)
+        for name in ('a', 'b', 'c'):
+            h.record(name, 'queued')
+        h.record('a', 'started')
+        # a 没有报告结果就开始了 b
+        h.record('b', 'started')
+        h.end_run()
+        self.assertFalse(h.running)
+        self.assertIsNone(h.run_started_at)
+        self.assertEqual(h.statuses(), (('a', 'error'), ('b', 'error'), ('c', 'cancelled')))
+
+    def test_new_run_resets_view(self):
+        """测试新的运行清空当前状态，历史保留"""
+        h = self.history
+        self.assertEqual(h.start_run(), 1)
+        h.record('a', 'queued')
+        h.end_run()
+        self.assertEqual(h.start_run(), 2)
+        self.assertEqual(h.statuses(), ())
+        self.assertEqual([(e.run, e.kind) for e in h.events(task='a')], [(1, 'queued'), (1, 'cancelled')])
+
+    def test_persisted(self):
+        """测试事件追加到文件，重新载入后可以查询，运行序号继续递增"""
+        h = self.history
+        h.start_run()
+        h.record('a', 'started', 100)
+        h.record('a', 'finished', 130)
+        h.end_run()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['kind'] for line in lines], ['started', 'finished'])
+
+        loaded = TaskHistory(self.path, retention_days=1e6)
+        self.assertEqual(loaded.events(), h.events())
+        self.assertEqual(loaded.start_run(), 2)
+
+    def test_retention(self):
+        """测试载入时丢弃过期与无效的事件并重写文件"""
+        now = time.time()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'run': 1, 'task': 'a', 'kind': 'finished', 'at': now - 200 * 86400, 'duration': 1}) + '\n')
+            f.write('not json\n')
+            f.write(json.dumps({'run': 2, 'task': 'a', 'kind': 'finished', 'at': now, 'duration': 1}) + '\n')
+        loaded = TaskHistory(self.path)
+        self.assertEqual([e.run for e in loaded.events()], [2])
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+    def test_durations(self):
+        """测试按天汇总耗时"""
+        h = TaskHistory()
+        day1 = datetime(2025, 1, 1, 12).timestamp()
+        day2 = datetime(2025, 1, 2, 12).timestamp()
+        h.start_run()
+        h.record('a', 'started', day1)
+        h.record('a', 'finished', day1 + 60)
+        h.record('b', 'started', day1 + 60)
+        h.record('b', 'failed', day1 + 90)
+        h.start_run()
+        h.record('a', 'started', day2)
+        h.record('a', 'finished', day2 + 30)
+        h.record('a', 'started', day2 + 100)
+        h.record('a', 'finished', day2 + 190)
+
+        result = h.durations(days=7, now=day2 + 200)
+        self.assertEqual(list(result), ['2025-01-01', '2025-01-02'])
+        a1 = result['2025-01-01']['a']
+        self.assertEqual((a1.count, a1.total, a1.failed), (1, 60, 0))
+        self.assertEqual(result['2025-01-01']['b'].failed, 1)
+        a2 = result['2025-01-02']['a']
+        self.assertEqual((a2.count, a2.total, a2.mean), (2, 120, 60))
+        self.assertEqual(list(h.durations(days=0.5, now=day2 + 200)), ['2025-01-02'])
+
+    def test_event_fields(self):
+        h = TaskHistory()
+        event = h.record('a', 'queued', 5)
+        self.assertEqual(event, TaskEvent(0, 'a', 'queued', 5, None))
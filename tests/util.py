@@ -1,8 +1,10 @@
+import time
 import unittest
-from typing import Sequence, overload
+from typing import Callable, Literal, Sequence, overload
 from typing_extensions import override
 
 import cv2
+import numpy as np
 from cv2.typing import MatLike
 
 from kotonebot.client import Device
@@ -70,6 +72,96 @@ class MockDevice(Device):
         raise NotImplementedError
 
 
+class FakeScreen:
+    """按序号生成截图的截图实现。"""
+    def __init__(self, frame: Callable[[int], MatLike], size: tuple[int, int], delay: float = 0):
+        self.frame = frame
+        self.size = size
+        self.delay = delay
+        self.count = 0
+        """已截取的帧数。"""
+
+    @property
+    def screen_size(self) -> tuple[int, int]:
+        return self.size
+
+    def detect_orientation(self) -> Literal['portrait', 'landscape'] | None:
+        w, h = self.size
+        return 'portrait' if h >= w else 'landscape'
+
+    def screenshot(self) -> MatLike:
+        if self.delay:
+            time.sleep(self.delay)
+        img = self.frame(self.count)
+        self.count += 1
+        return img
+
+
+class FakeTouch:
+    """记录所有点击与滑动的触控实现。"""
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.clicks: list[tuple[int, int]] = []
+        self.swipes: list[tuple[int, int, int, int, float | None]] = []
+
+    def click(self, x: int, y: int) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        self.clicks.append((x, y))
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: float | None = None) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        self.swipes.append((x1, y1, x2, y2, duration))
+
+
+class FakeDevice(Device):
+    """
+    不连接真实设备的 `Device`。
+
+    与 `MockDevice` 不同，截图、点击与滑动都经过 `Device` 自身的实现，
+    因此 `screenshot_hook_before`、`click_hooks_before` 以及替换实例方法的包装
+    （截图预取、会话录制、飞行记录器等）都会生效。
+
+    例：
+    ```python
+    # 每两帧变化一次的 90x160 截图
+    device = FakeDevice(lambda i: solid((160, 90), (0, i // 2 * 40, 0)), size=(90, 160))
+    device.screenshot()
+    device.click(1, 2)
+    device.touch.clicks  # [(1, 2)]
+    ```
+    """
+    def __init__(
+        self,
+        frame: Callable[[int], MatLike] | None = None,
+        *,
+        size: tuple[int, int] = (720, 1280),
+        capture_delay: float = 0,
+        touch_delay: float = 0,
+    ):
+        """
+        :param frame: 根据截图序号（从 0 开始）生成截图。为 None 时总是返回黑色图像。
+        :param size: 屏幕尺寸 (w, h)。
+        :param capture_delay: 每次截图的延迟。单位秒。
+        :param touch_delay: 每次点击、滑动的延迟。单位秒。
+        """
+        super().__init__('fake')
+        if frame is None:
+            frame = lambda _: solid((size[1], size[0]))
+        self.screen = FakeScreen(frame, size, capture_delay)
+        self.touch = FakeTouch(touch_delay)
+        self._screenshot = self.screen
+        self._touch = self.touch
+
+
+def solid(shape: tuple[int, int], color: tuple[int, int, int] = (0, 0, 0)) -> MatLike:
+    """生成纯色 BGR 图像。"""
+    img = np.empty((*shape, 3), dtype=np.uint8)
+    img[:] = color
+    return img
+
+
 class BaseTestCase(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -0,0 +1,79 @@
+"""
+`extract_idols` 微基准测试。
+
+对比原先的整帧掩码 + `HsvColorsRemover` 实现与当前只处理 ROI 的实现，
+并校验两者结果一致。
+
+用法：
+    python tools/bench_extract_idols.py [图片...] [-n 次数]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from kotonebot.backend.preprocessor import HsvColorsRemover
+from kaa.tasks import R
+from kaa.game_ui.idols_overview import (
+    extract_idols, RED_DOT, ORANGE_SELECT_BORDER, WHITE_BACKGROUND
+)
+
+DEFAULT_IMAGES = [
+    'kotonebot-resource/sprites/jp/produce/produce_preparation_select_idol.png',
+    'kotonebot-resource/sprites/jp/produce/screenshot_produce_start_1_p_idol.png',
+]
+
+def extract_idols_legacy(img):
+    """原实现：整帧掩码 + 三次独立的 HSV 颜色移除。"""
+    x, y, w, h = R.Produce.BoxIdolOverviewIdols.xywh
+    mask = np.zeros_like(img)
+    mask[y:y+h, x:x+w] = img[y:y+h, x:x+w]
+    img = mask
+    remover = HsvColorsRemover([RED_DOT, ORANGE_SELECT_BORDER, WHITE_BACKGROUND])
+    img = remover.process(img)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    contours, _ = cv2.findContours(gray, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    rects = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h == 0:
+            continue
+        if abs(w / h - 140 / 190) <= 0.1 and w * h >= 140 * 190:
+            rects.append((x, y, w, h))
+    return rects
+
+def bench(func, img, n: int) -> float:
+    func(img)
+    start = time.perf_counter()
+    for _ in range(n):
+        func(img)
+    return (time.perf_counter() - start) / n * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='extract_idols 微基准测试')
+    parser.add_argument('images', nargs='*', default=DEFAULT_IMAGES, help='偶像总览截图')
+    parser.add_argument('-n', type=int, default=200, help='每张图片的重复次数')
+    args = parser.parse_args()
+
+    box = R.Produce.BoxIdolOverviewIdols
+    for path in args.images:
+        img = cv2.imread(path)
+        if img is None:
+            print(f'无法读取图片：{path}')
+            continue
+        legacy = sorted(extract_idols_legacy(img))
+        current = sorted(extract_idols(img, box))
+        t_legacy = bench(extract_idols_legacy, img, args.n)
+        t_current = bench(lambda i: extract_idols(i, box), img, args.n)
+        print(f'{Path(path).name}:')
+        print(f'  rects: {len(current)}, same as legacy: {legacy == current}')
+        print(f'  legacy:  {t_legacy:.3f} ms')
+        print(f'  current: {t_current:.3f} ms ({t_legacy / t_current:.1f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+截图飞行记录器开销基准测试。
+
+模拟识别循环：每帧截图后做一次模板匹配，对比启用与不启用 `FlightRecorder` 时的帧耗时，
+并输出记录器自身统计的调用方线程与后台线程耗时。
+
+用法：
+    python tools/bench_flight_recorder.py [-n 帧数] [--scale 缩放比例] [--format jpg|webp]
+"""
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from kotonebot.client.device import Device
+from kaa.util.flight_recorder import FlightRecorder
+from tests.util import FakeDevice
+
+
+def make_device() -> Device:
+    """每次返回不同的 720x1280 截图。"""
+    base = np.random.default_rng(0).integers(0, 256, (1280, 720, 3), dtype=np.uint8)
+    return FakeDevice(lambda i: np.roll(base, i + 1, axis=0))
+
+
+def loop(device: Device, frames: int) -> list[float]:
+    """返回每帧耗时，单位毫秒。"""
+    template = np.zeros((64, 64, 3), dtype=np.uint8)
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        img = device.screenshot()
+        cv2.matchTemplate(img[:320], template, cv2.TM_CCOEFF_NORMED)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='截图飞行记录器开销基准测试')
+    parser.add_argument('-n', '--frames', type=int, default=300, help='模拟的帧数')
+    parser.add_argument('--scale', type=float, default=0.5, help='截图缩放比例')
+    parser.add_argument('--format', choices=['jpg', 'webp'], default='jpg', help='压缩格式')
+    args = parser.parse_args()
+
+    baseline = loop(make_device(), args.frames)
+    device = make_device()
+    recorder = FlightRecorder(scale=args.scale, format=args.format).install(device)
+    recorded = loop(device, args.frames)
+    recorder.uninstall()
+
+    for name, samples in (('off', baseline), ('on', recorded)):
+        print(f'{name:>4}: mean {statistics.fmean(samples):7.3f} ms/frame  p50 {statistics.median(samples):7.3f} ms')
+    stats = recorder.stats()
+    print(
+        f'recorder: {stats["frames"]} frames, {stats["bytes"] / 1024:.0f} KiB, '
+        f'captured {stats["captured"]}, skipped {stats["skipped"]}, dropped {stats["dropped"]}, '
+        f'hook {stats["hook_ms_mean"]:.3f} ms, encode {stats["encode_ms_mean"]:.3f} ms'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+日志调用开销微基准测试。
+
+模拟出牌循环中每帧输出的几条 DEBUG 日志，对比同步写入（控制台 + 文件 + 内存缓冲区）
+与 `AsyncLogPipeline` 异步写入时，调用方每次日志调用的耗时。
+
+用法：
+    python tools/bench_logging.py [-n 帧数] [--disk-latency 毫秒]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from kaa.util.log_buffer import LogRingBuffer
+from kaa.util.log_queue import AsyncLogPipeline
+
+FORMAT = '[%(asctime)s][%(levelname)s][%(name)s:%(lineno)d] %(message)s'
+
+
+class SlowFileHandler(logging.FileHandler):
+    """每次写入后等待指定时间，模拟较慢的磁盘。"""
+
+    def __init__(self, path: str, latency: float):
+        super().__init__(path, encoding='utf-8')
+        self.latency = latency
+
+    def flush(self):
+        super().flush()
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def make_handlers(log_dir: str, latency: float) -> list[logging.Handler]:
+    formatter = logging.Formatter(FORMAT)
+    console = logging.StreamHandler(open(os.devnull, 'w', encoding='utf-8'))
+    console.setLevel(logging.INFO)
+    file = SlowFileHandler(os.path.join(log_dir, 'bench.log'), latency)
+    buffer = LogRingBuffer()
+    handlers: list[logging.Handler] = [console, file, buffer]
+    for h in handlers:
+        h.setFormatter(formatter)
+    return handlers
+
+
+def card_loop(logger: logging.Logger, frames: int) -> list[float]:
+    """返回每次日志调用的耗时，单位微秒。"""
+    samples = []
+    cards = [(120, 900, 160, 220), (300, 900, 160, 220), (480, 900, 160, 220)]
+    for i in range(frames):
+        for args in (
+            ('Current skill card count: %d', len(cards)),
+            ('Max card detect result: %s', (cards[i % 3], 0.87)),
+            ('reset break_cd',),
+        ):
+            start = time.perf_counter()
+            logger.debug(*args)
+            samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def bench(mode: str, frames: int, latency: float) -> tuple[list[float], float, int]:
+    logger = logging.getLogger(f'bench.{mode}')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    with tempfile.TemporaryDirectory() as log_dir:
+        for h in make_handlers(log_dir, latency):
+            logger.addHandler(h)
+        pipeline = None
+        if mode == 'async':
+            pipeline = AsyncLogPipeline()
+            pipeline.install(logger)
+        start = time.perf_counter()
+        samples = card_loop(logger, frames)
+        elapsed = time.perf_counter() - start
+        dropped = 0
+        if pipeline is not None:
+            dropped = pipeline.dropped
+            pipeline.uninstall()
+        for h in list(logger.handlers):
+            logger.removeHandler(h)
+            h.close()
+    return samples, elapsed, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志调用开销微基准测试')
+    parser.add_argument('-n', '--frames', type=int, default=3000, help='模拟的帧数，每帧 3 条日志')
+    parser.add_argument('--disk-latency', type=float, default=0, help='每次写入文件后的额外延迟，单位毫秒')
+    args = parser.parse_args()
+
+    latency = args.disk_latency / 1000
+    for mode in ('sync', 'async'):
+        samples, elapsed, dropped = bench(mode, args.frames, latency)
+        samples.sort()
+        p99 = samples[int(len(samples) * 0.99)]
+        print(
+            f'{mode:>5}: mean {statistics.fmean(samples):8.2f} us  p50 {statistics.median(samples):8.2f} us  '
+            f'p99 {p99:8.2f} us  loop {elapsed * 1000 / args.frames:.3f} ms/frame  dropped {dropped}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+截图预取基准测试。
+
+使用带有人为截图延迟的模拟设备，对比同步截图与启用 `ScreenshotPrefetcher`
+时识别循环的实际帧率。
+
+用法：
+    python tools/bench_screenshot_prefetch.py [--capture 毫秒] [--process 毫秒] [-n 帧数]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from kotonebot.client.device import Device
+from kaa.util.prefetch import ScreenshotPrefetcher
+from tests.util import FakeDevice
+
+
+def run_loop(d: Device, n: int, process: float, click_every: int) -> float:
+    """执行 `n` 次「截图 → 识别 → 偶尔点击」循环，返回帧率。"""
+    d.screenshot()
+    start = time.perf_counter()
+    for i in range(n):
+        d.screenshot()
+        time.sleep(process)
+        if click_every and i % click_every == click_every - 1:
+            d.click(0, 0)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='截图预取基准测试')
+    parser.add_argument('--capture', type=float, default=50, help='模拟截图耗时，单位毫秒')
+    parser.add_argument('--process', type=float, default=30, help='模拟识别耗时，单位毫秒')
+    parser.add_argument('--click-every', type=int, default=10, help='每隔多少帧点击一次，0 表示不点击')
+    parser.add_argument('-n', type=int, default=60, help='帧数')
+    args = parser.parse_args()
+    capture, process = args.capture / 1000, args.process / 1000
+
+    d = FakeDevice(capture_delay=capture)
+    fps_sync = run_loop(d, args.n, process, args.click_every)
+
+    d = FakeDevice(capture_delay=capture)
+    prefetcher = ScreenshotPrefetcher(d)
+    prefetcher.install()
+    try:
+        fps_prefetch = run_loop(d, args.n, process, args.click_every)
+    finally:
+        prefetcher.uninstall()
+
+    print(f'capture={args.capture:.0f}ms process={args.process:.0f}ms click_every={args.click_every}')
+    print(f'  sync:     {fps_sync:.1f} fps')
+    print(f'  prefetch: {fps_prefetch:.1f} fps ({fps_prefetch / fps_sync:.2f}x)')
+    print(f'  captured={prefetcher.captured} consumed={prefetcher.consumed} stale={prefetcher.discarded_stale}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+回放录制的会话，把整个任务作为端到端的性能基准与回归测试运行。
+
+会话通过 `kaa --record-session <目录> task invoke <任务>` 录制。
+回放时不需要模拟器，任务从录制的截图中识别画面，点击/滑动与录制比对。
+
+用法：
+    python tools/replay_session.py 会话目录 任务ID [任务ID...] [-c config.json]
+        [--mode input|time] [--speed 倍数] [--strict] [--json 输出文件]
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from kotonebot import KotoneBot
+from kotonebot.client.device import Device
+from kotonebot.backend.context import tasks_from_id
+from kaa.config import BaseConfig
+from kaa.errors import ReplayError
+from kaa.util.session import ReplayDevice
+
+
+class ReplayBot(KotoneBot):
+    """使用 `ReplayDevice` 运行 kaa 任务。初始化流程与 `Kaa` 一致，但不启动模拟器。"""
+
+    def __init__(self, device: ReplayDevice, config_path: str):
+        super().__init__(module='kaa.tasks', config_path=config_path, config_type=BaseConfig, debug=True)
+        self.device = device
+
+    def _on_create_device(self) -> Device:
+        return self.device
+
+    def _on_after_init_context(self):
+        from kotonebot import device
+        from kaa.util.ocr import CachedContextOcr
+        CachedContextOcr.install()
+        device.orientation = 'portrait'
+        device.target_resolution = (720, 1280)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回放录制的会话')
+    parser.add_argument('session', help='会话目录')
+    parser.add_argument('tasks', nargs='+', help='要运行的任务 ID')
+    parser.add_argument('-c', '--config', default='./config.json', help='配置文件')
+    parser.add_argument('--mode', choices=['input', 'time'], default='input', help='推进方式')
+    parser.add_argument('--speed', type=float, default=1, help='time 模式下的回放速度倍数')
+    parser.add_argument('--strict', action='store_true', help='输入与录制不一致时立即失败')
+    parser.add_argument('--json', default=None, help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    device = ReplayDevice(args.session, mode=args.mode, speed=args.speed, strict=args.strict)
+    bot = ReplayBot(device, args.config)
+    bot.initialize()
+
+    error = None
+    start = time.perf_counter()
+    try:
+        bot.run(tasks_from_id(args.tasks))
+    except ReplayError as e:
+        error = e
+    elapsed = time.perf_counter() - start
+
+    recorded = device.session.duration
+    result = {
+        'session': args.session,
+        'tasks': args.tasks,
+        'recorded_seconds': recorded,
+        'replay_seconds': elapsed,
+        'speedup': recorded / elapsed if elapsed > 0 else None,
+        'error': str(error) if error is not None else None,
+        'divergences': device.divergences,
+        **device.stats(),
+    }
+    print(f'recorded: {recorded:.1f}s, replayed: {elapsed:.1f}s ({result["speedup"] or 0:.1f}x)')
+    print(f'screenshots: {device.screenshots}, inputs: {device.inputs}/{result["recorded_inputs"]}')
+    for d in device.divergences:
+        print(f'  diverged: {d}')
+    if error is not None:
+        print(f'error: {error}')
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    sys.exit(0 if error is None and not device.divergences else 1)
+
+
+if __name__ == '__main__':
+    main()